@@ -1,3 +1,4 @@
+from coup import compact
 from coup.influence import Duke, Assassin, Contessa, Captain, Ambassador
 
 """
@@ -8,6 +9,11 @@ Action Class
         succeeds: bool (default: True)
         target (optional): Player or None
 
+    Attributes:
+        code: int
+            The compact action id of the action type (see coup/compact.py),
+            targeted actions add the seat of the target to it.
+
     Methods:
         print_action():
             Print the name of the action user, the action they are attempting to
@@ -50,6 +56,7 @@ Tax - Action
         blockable: False
         challengeable: True
         has_target: False
+        code: TAX
 
     Fields:
         user: Player
@@ -77,6 +84,7 @@ class Tax(Action):
     blockable = False
     challengeable = True
     has_target = False
+    code = compact.TAX
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -107,6 +115,7 @@ Assassinate - Action
         blockable: True
         challengeable: True
         has_target: True
+        code: ASSASSINATE + target seat
 
     Fields:
         user: Player
@@ -135,6 +144,7 @@ class Assassinate(Action):
     blockable = True
     challengeable = True
     has_target = True
+    code = compact.ASSASSINATE
 
     def __init__(self, user, target):
         super().__init__(user, self.name, target)
@@ -166,6 +176,7 @@ Steal - Action
         blockable: True
         challengeable: True
         has_target: True
+        code: STEAL + target seat
 
     Fields:
         user: Player
@@ -199,6 +210,7 @@ class Steal(Action):
     blockable = True
     challengeable = True
     has_target = True
+    code = compact.STEAL
 
     def __init__(self, user, target):
         super().__init__(user, self.name, target)
@@ -237,6 +249,7 @@ Exchange - Action
         blockable: False
         challengeable: True
         has_target: False
+        code: EXCHANGE
 
     Fields:
         user: Player
@@ -244,9 +257,10 @@ Exchange - Action
 
     Methods:
         resolve(gamestate):
-            Draw two cards from the deck, then invoke the get_player_exchange
-            function on the active player to get the cards they wish to return
-            to the deck. Then return those cards to the deck.
+            Draw two cards from the deck and tell the observers, then invoke
+            the get_exchange function on the active player to get the cards
+            they wish to return to the deck. Then return those cards to the
+            deck and tell the observers.
 
         @staticmethod
         is_legal(gamestate, user): bool
@@ -265,15 +279,20 @@ class Exchange(Action):
     blockable = False
     challengeable = True
     has_target = False
+    code = compact.EXCHANGE
 
     def __init__(self, user):
         super().__init__(user, self.name)
 
     def resolve(self, gamestate):
         exchange_cards = [gamestate.draw_card(), gamestate.draw_card()]
-        cards_to_return = self.user.get_player_exchange(gamestate, exchange_cards)
+        for observer in gamestate.observers:
+            observer.on_cards_drawn(gamestate, self.user, exchange_cards)
+        cards_to_return = self.user.get_exchange(gamestate, exchange_cards)
         for card in cards_to_return:
-            gamestate.return_card(card)
+            gamestate.return_card_to_deck(card)
+        for observer in gamestate.observers:
+            observer.on_exchange(gamestate, self.user)
 
     @staticmethod
     def is_legal(gamestate, user):
@@ -298,6 +317,7 @@ Block Assassination - Action
         blockable: True
         challengeable: True
         has_target: False
+        code: BLOCK_ASSASSINATION
 
     Fields:
         user: Player
@@ -326,6 +346,7 @@ class BlockAssassination(Action):
     blockable = True
     challengeable = True
     has_target = False
+    code = compact.BLOCK_ASSASSINATION
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -358,6 +379,7 @@ Block Foreign Aid - Action
         blockable: False
         challengeable: True
         has_target: False
+        code: BLOCK_FOREIGN_AID
     
     Fields:
         user: Player
@@ -385,6 +407,7 @@ class BlockForeignAid(Action):
     blockable = False
     challengeable = True
     has_target = False
+    code = compact.BLOCK_FOREIGN_AID
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -417,6 +440,7 @@ Block Stealing Ambassador - Action
         blockable: False
         challengeable: True
         has_target: False
+        code: BLOCK_STEALING_AMBASSADOR
 
     Fields:
         user: Player
@@ -444,6 +468,7 @@ class BlockStealingAmbassador(Action):
     blockable = False
     challengeable = True
     has_target = False
+    code = compact.BLOCK_STEALING_AMBASSADOR
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -476,6 +501,7 @@ Block Stealing Captain - Action
         blockable: False
         challengeable: True
         has_target: False
+        code: BLOCK_STEALING_CAPTAIN
 
     Fields:
         user: Player
@@ -503,6 +529,7 @@ class BlockStealingCaptain(Action):
     blockable = False
     challengeable = True
     has_target = False
+    code = compact.BLOCK_STEALING_CAPTAIN
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -533,6 +560,7 @@ Income - Action
         blockable: False
         challengeable: False
         has_target: False
+        code: INCOME
 
     Fields:
         user: Player
@@ -558,6 +586,7 @@ class Income(Action):
     blockable = False
     challengeable = False
     has_target = False
+    code = compact.INCOME
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -586,6 +615,7 @@ Foreign Aid - Action
         blockable: True
         challengeable: False
         has_target: False
+        code: FOREIGN_AID
 
     Fields:
         user: Player
@@ -611,6 +641,7 @@ class ForeignAid(Action):
     blockable = True
     challengeable = False
     has_target = False
+    code = compact.FOREIGN_AID
 
     def __init__(self, user):
         super().__init__(user, self.name)
@@ -642,6 +673,7 @@ Coup - Action
         blockable: False
         challengeable: False
         has_target: True
+        code: COUP + target seat
 
     Fields:
         user: Player
@@ -654,6 +686,7 @@ Coup - Action
         @staticmethod
         is_legal(gamestate, user, target): bool
             Checks that the user is the active player, checks that the user is
+            alive, checks that the target of the user is not the user and is
             alive and checks that the user currently has 7 or more coins.
 """
 
@@ -667,6 +700,7 @@ class Coup(Action):
     blockable = False
     challengeable = False
     has_target = True
+    code = compact.COUP
 
     def __init__(self, user, target):
         super().__init__(user, self.name, target)
@@ -679,6 +713,8 @@ class Coup(Action):
         return (
             user == gamestate.get_active_player()
             and user.is_alive()
+            and target != user
+            and target.is_alive()
             and user.coins >= 7
         )
 
@@ -703,6 +739,7 @@ Challenge - Action
         blockable: False
         challengeable: False
         has_target: False
+        code: CHALLENGE
 
     Fields:
         user: Player
@@ -719,6 +756,8 @@ Challenge - Action
             they must lose an influence and the succeeds field of the
             top action in the action stack is set to False.
 
+            The observers are told the outcome before any influence is lost.
+
         @staticmethod
         is_legal(gamestate, user): bool
             Checks that the action stack is not empty, that the user is alive,
@@ -737,14 +776,18 @@ class Challenge(Action):
     blockable = False
     challengeable = False
     has_target = False
+    code = compact.CHALLENGE
 
     def __init__(self, user):
         super().__init__(user, self.name)
 
     def resolve(self, gamestate):
-        challenged_action = self.gamestate.action_stack.peek()
+        challenged_action = gamestate.action_stack.peek()
         challenged_player = challenged_action.user
-        if challenged_player.satisfies_requirement(challenged_action):
+        held = challenged_player.satisfies_action_requirement(challenged_action)
+        for observer in gamestate.observers:
+            observer.on_challenge(gamestate, self, challenged_action, held)
+        if held:
             self.user.lose_influence(gamestate)
             challenged_player.replace_influence(
                 gamestate, challenged_action.requirement
@@ -761,3 +804,71 @@ class Challenge(Action):
             and gamestate.action_stack.peek().challengeable
             and user != gamestate.action_stack.peek().user
         )
+
+
+"""
+ACTION_CLASSES: dict of int to Action subclass
+    Maps the compact action id of each action type to its class, so that an
+    action can be built from a move code only once it has been chosen.
+"""
+
+ACTION_CLASSES = {
+    action.code: action
+    for action in (
+        Tax,
+        Assassinate,
+        Steal,
+        Exchange,
+        BlockAssassination,
+        BlockForeignAid,
+        BlockStealingAmbassador,
+        BlockStealingCaptain,
+        Income,
+        ForeignAid,
+        Coup,
+        Challenge,
+    )
+}
+
+
+"""
+RESPONSES: dict of int to tuple of Action subclass
+    The counteractions that can be played against each type of pending action
+    (keyed by its code). Blocks are further restricted to players other than
+    the active player, and BlockAssassination to the target of the
+    assassination; a Challenge to players other than the one who played the
+    pending action.
+
+RESPONSE_MASKS: dict of int to int
+    The same table as bitmasks of compact action ids.
+"""
+
+RESPONSES = {
+    Tax.code: (Challenge,),
+    Assassinate.code: (BlockAssassination, Challenge),
+    Steal.code: (BlockStealingAmbassador, BlockStealingCaptain, Challenge),
+    Exchange.code: (Challenge,),
+    BlockAssassination.code: (Challenge,),
+    BlockForeignAid.code: (Challenge,),
+    BlockStealingAmbassador.code: (Challenge,),
+    BlockStealingCaptain.code: (Challenge,),
+    Income.code: (),
+    ForeignAid.code: (BlockForeignAid,),
+    Coup.code: (),
+    Challenge.code: (),
+}
+
+RESPONSE_MASKS = {
+    code: sum(1 << response.code for response in responses)
+    for code, responses in RESPONSES.items()
+}
+
+BLOCK_MASK = sum(
+    1 << block.code
+    for block in (
+        BlockAssassination,
+        BlockForeignAid,
+        BlockStealingAmbassador,
+        BlockStealingCaptain,
+    )
+)
@@ -3,6 +3,8 @@ Action Stack Class
 
     Fields:
         - actions: list of actions
+        - resolving: the action being resolved, or None, so that strategies
+          asked to lose an influence can tell what caused the loss.
     
     Methods:
         - __init__:
@@ -18,7 +20,9 @@ Action Stack Class
             check if the stack is empty
         - resolve:
             pop actions from the stack one at a time, if the action's
-            action_succeeds field is set to true, resolve the action.
+            action_succeeds field is set to true, resolve the action. If the
+            gamestate has a Zobrist hash attached, tell it about each resolved
+            action.
         - print_state:
             iterate through the actions in the action stack, invoking their
             print_state methods.
@@ -28,6 +32,7 @@ Action Stack Class
 class ActionStack:
     def __init__(self):
         self.actions = []
+        self.resolving = None
 
     def push(self, action):
         self.actions.append(action)
@@ -49,7 +54,11 @@ class ActionStack:
         while not self.is_empty():
             action = self.pop()
             if action.succeeds:
+                self.resolving = action
                 action.resolve(gamestate)
+                if gamestate.zobrist is not None:
+                    gamestate.zobrist.on_resolve(action)
+        self.resolving = None
 
     def print_state(self):
         for action in self.actions:
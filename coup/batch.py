@@ -0,0 +1,270 @@
+import numpy as np
+
+from coup import compact
+
+"""
+Lockstep batch engine.
+
+    Plays a batch of games at once over NumPy arrays, one row per game, for
+    strategies whose decisions are simple rules that can be evaluated on
+    whole columns at a time (see HonestBatchPolicy). Every step plays one turn
+    of every unfinished game; finished games are masked out of the updates.
+
+    The engine covers the games such strategies play: the active player's
+    action is resolved unopposed, because batch policies never challenge or
+    block, and the deck is only used for the deal. The actions are the
+    compact action types INCOME, FOREIGN_AID, TAX, COUP, ASSASSINATE and
+    STEAL (Exchange needs per-card choices and is left to coup.compact).
+
+    run_batch(policies, num_games, seed, batch_size=16384, max_turns=500):
+        BatchResult
+        Play num_games games with one policy per seat, in batches of at most
+        batch_size games. All random draws come from a NumPy generator seeded
+        with seed.
+
+    deal_batch(num_games, num_players, rng): ndarray
+        Deal num_games games at once, returning the (num_games, num_players,
+        2) array of the characters dealt to each seat.
+"""
+
+DECK = np.repeat(
+    np.arange(compact.NUM_CHARACTERS, dtype=np.int8), compact.COPIES_PER_CHARACTER
+)
+
+
+def deal_batch(num_games, num_players, rng):
+    decks = rng.permuted(np.tile(DECK, (num_games, 1)), axis=1)
+    return decks[:, : 2 * num_players].reshape(num_games, num_players, 2)
+
+
+def run_batch(policies, num_games, seed, batch_size=16384, max_turns=500):
+    rng = np.random.default_rng(seed)
+    result = BatchResult(len(policies))
+    for start in range(0, num_games, batch_size):
+        size = min(batch_size, num_games - start)
+        batch = GameBatch(size, len(policies), rng)
+        batch.play(policies, max_turns)
+        result.add(batch)
+    return result
+
+
+"""
+Game Batch Class
+
+    The state of a batch of games, one row per game.
+
+    Fields:
+        cards: (games, players, 2) int8 array of the characters dealt.
+        hidden: (games, players, 2) bool array, True while a card is face down.
+        alive: (games, players) bool array.
+        num_alive: (games,) int array.
+        coins: (games, players) int array.
+        active: (games,) int array, seat of the player whose turn it is.
+        done: (games,) bool array.
+        winner: (games,) int array, -1 until the game is over (or if it ran
+            out of turns).
+        turns: (games,) int array.
+        rng: numpy Generator
+
+    Methods:
+        influences(rows): (rows, players) int array
+        holds(rows, character): (rows, players) bool array
+            True where the seat has a face-down copy of character.
+        play(policies, max_turns):
+            Play every game of the batch to the end.
+        step(policies):
+            Play one turn of every unfinished game.
+        lose_influence(rows, seats, policies):
+            Make the given seats of the given games reveal a card, chosen by
+            the seat's policy.
+"""
+
+
+class GameBatch:
+    def __init__(self, num_games, num_players, rng):
+        self.num_games = num_games
+        self.num_players = num_players
+        self.rng = rng
+        self.cards = deal_batch(num_games, num_players, rng)
+        self.hidden = np.ones((num_games, num_players, 2), dtype=bool)
+        self.alive = np.ones((num_games, num_players), dtype=bool)
+        self.num_alive = np.full(num_games, num_players, dtype=np.int8)
+        self.coins = np.full(
+            (num_games, num_players), compact.STARTING_COINS, dtype=np.int16
+        )
+        self.active = np.zeros(num_games, dtype=np.int8)
+        self.done = np.zeros(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+        self.turns = np.zeros(num_games, dtype=np.int32)
+        self.rows = np.arange(num_games)
+
+    def influences(self, rows):
+        return self.hidden[rows].sum(axis=2)
+
+    def holds(self, rows, character):
+        return ((self.cards[rows] == character) & self.hidden[rows]).any(axis=2)
+
+    def play(self, policies, max_turns):
+        while not self.done.all():
+            self.step(policies)
+            self.done |= self.turns >= max_turns
+
+    def step(self, policies):
+        live = self.rows[~self.done]
+        action = np.empty(len(live), dtype=np.int8)
+        target = np.zeros(len(live), dtype=np.int8)
+        active = self.active[live]
+        for seat, policy in enumerate(policies):
+            mine = active == seat
+            if mine.any():
+                action[mine], target[mine] = policy.choose_actions(self, live[mine])
+
+        coins = self.coins
+        coins[live, active] -= np.asarray(compact.COSTS, dtype=np.int16)[action]
+        for kind, gain in (
+            (compact.INCOME, 1),
+            (compact.FOREIGN_AID, 2),
+            (compact.TAX, 3),
+        ):
+            mine = action == kind
+            coins[live[mine], active[mine]] += gain
+        mine = action == compact.STEAL
+        if mine.any():
+            rows, thieves, victims = live[mine], active[mine], target[mine]
+            stolen = np.minimum(coins[rows, victims], 2)
+            coins[rows, victims] -= stolen
+            coins[rows, thieves] += stolen
+        mine = (action == compact.COUP) | (action == compact.ASSASSINATE)
+        if mine.any():
+            self.lose_influence(live[mine], target[mine], policies)
+
+        self._end_turn(live)
+
+    def lose_influence(self, rows, seats, policies):
+        for seat, policy in enumerate(policies):
+            mine = seats == seat
+            if mine.any():
+                lost_rows = rows[mine]
+                slot = policy.choose_losses(self, lost_rows, seat)
+                self.hidden[lost_rows, seat, slot] = False
+                knocked_out = ~self.hidden[lost_rows, seat].any(axis=1)
+                self.alive[lost_rows[knocked_out], seat] = False
+                self.num_alive[lost_rows[knocked_out]] -= 1
+
+    def _end_turn(self, live):
+        """
+        Helper function for step, finish the games with a single player left
+        and pass the turn to the next live player of the others.
+        """
+        self.turns[live] += 1
+        finished = self.num_alive[live] <= 1
+        if finished.any():
+            over = live[finished]
+            self.winner[over] = self.alive[over].argmax(axis=1)
+            self.done[over] = True
+            live = live[~finished]
+        # Move each game on to the next seat until it lands on a live player,
+        # almost every game does so on the first pass.
+        seats = (self.active[live] + 1) % self.num_players
+        dead = ~self.alive[live, seats]
+        while dead.any():
+            seats[dead] = (seats[dead] + 1) % self.num_players
+            dead[dead] = ~self.alive[live[dead], seats[dead]]
+        self.active[live] = seats
+
+
+"""
+Honest Batch Policy Class
+
+    Vectorized form of HonestStrategy for GameBatch.
+
+    Methods:
+        choose_actions(batch, rows): (action types, targets)
+            For the active players of the given games: Coup with 7 or more
+            coins, targeting the opponent with the most influences, then the
+            most coins, breaking the remaining ties at random. Otherwise Tax if
+            they hold a Duke, otherwise Income.
+
+        choose_losses(batch, rows, seat): array of card slots
+            Reveal the only face-down card if there is one, keep a single Duke
+            if there is one, otherwise reveal a random card.
+"""
+
+
+class HonestBatchPolicy:
+    def choose_actions(self, batch, rows):
+        active = batch.active[rows]
+        coins = batch.coins[rows, active]
+        has_duke = (
+            (batch.cards[rows, active] == compact.DUKE) & batch.hidden[rows, active]
+        ).any(axis=1)
+        action = np.where(has_duke, compact.TAX, compact.INCOME).astype(np.int8)
+        target = np.zeros(len(rows), dtype=np.int8)
+        coup = coins >= 7
+        if coup.any():
+            coup_rows = rows[coup]
+            influences = batch.influences(coup_rows)
+            # Influences dominate coins, which dominate the random tie break.
+            score = (
+                influences * 1024.0
+                + batch.coins[coup_rows]
+                + batch.rng.random(influences.shape)
+            )
+            score[influences == 0] = -1.0
+            score[np.arange(len(coup_rows)), active[coup]] = -1.0
+            action[coup] = compact.COUP
+            target[coup] = score.argmax(axis=1)
+        return action, target
+
+    def choose_losses(self, batch, rows, seat):
+        hidden = batch.hidden[rows, seat]
+        dukes = (batch.cards[rows, seat] == compact.DUKE) & hidden
+        slot = batch.rng.integers(0, 2, size=len(rows))
+        single_duke = hidden.all(axis=1) & (dukes.sum(axis=1) == 1)
+        slot[single_duke] = dukes[single_duke].argmin(axis=1)
+        one_left = hidden.sum(axis=1) == 1
+        slot[one_left] = hidden[one_left].argmax(axis=1)
+        return slot
+
+
+"""
+Batch Result Class
+
+    Fields:
+        games: int
+        wins: list of int, wins per seat.
+        unfinished: int, games that hit the turn limit.
+        turns: int, total turns played.
+
+    Methods:
+        add(batch):
+            Add the outcome of a finished GameBatch.
+        win_rate(seat): float
+"""
+
+
+class BatchResult:
+    def __init__(self, num_seats):
+        self.games = 0
+        self.wins = [0] * num_seats
+        self.unfinished = 0
+        self.turns = 0
+
+    def add(self, batch):
+        self.games += batch.num_games
+        counts = np.bincount(batch.winner[batch.winner >= 0], minlength=len(self.wins))
+        for seat, count in enumerate(counts):
+            self.wins[seat] += int(count)
+        self.unfinished += int((batch.winner < 0).sum())
+        self.turns += int(batch.turns.sum())
+
+    def win_rate(self, seat):
+        if not self.games:
+            return 0.0
+        return self.wins[seat] / self.games
+
+    def __repr__(self):
+        return (
+            f"BatchResult(games={self.games}, wins={self.wins}, "
+            f"unfinished={self.unfinished})"
+        )
@@ -0,0 +1,232 @@
+from itertools import combinations, combinations_with_replacement
+from math import comb
+
+from coup.compact import COPIES_PER_CHARACTER, NUM_CHARACTERS
+from coup.observer import GameObserver
+
+"""
+Belief State Class
+
+    What one player (the viewer) can infer about the hidden hands of their
+    opponents, kept up to date from the game events.
+
+    The posterior probability of an opponent's hand (a sorted tuple of
+    characters) is proportional to the number of ways it can be made from
+    the cards the viewer cannot see, times a likelihood for the evidence
+    about that opponent. The likelihoods are updated in place, in
+    O(number of hands), by each event:
+
+        - Claims: an action or block that requires a character multiplies
+          the likelihood of the hands without it by bluff_rate.
+        - Challenges: a challenged player who proves the character must hold
+          it, one who cannot must not.
+        - A revealed influence is removed from the player's hand, and from
+          the unseen cards.
+        - A proven card shuffled back is replaced by a card drawn from the
+          unseen ones.
+        - After an Exchange the player is assumed to have kept a random
+          selection of their hand and the two cards drawn.
+
+    Opponents' hands are tracked separately (as marginal distributions),
+    only sharing the count of unseen cards, which changes to the viewer's own
+    hand (exchanges, replacements) update in O(1).
+
+    Attach a BeliefState to a game as an observer, e.g.
+    Game(players, observers=[BeliefState(player)]).
+
+    Fields:
+        viewer: Player
+        bluff_rate: float, the likelihood of a claim from a player who does
+            not hold the character, relative to one who does.
+        unseen: list of int, the copies of each character the viewer cannot
+            see (opponents' hands and the deck).
+        likelihoods: dict of Player to dict of hand to float
+
+    Methods:
+        hand_distribution(player): dict of hand to float
+            The posterior probability of each hand of an opponent.
+        probability(player, character): float
+            The probability that an opponent holds at least one character.
+"""
+
+
+class BeliefState(GameObserver):
+    def __init__(self, viewer, bluff_rate=0.3):
+        self.viewer = viewer
+        self.bluff_rate = bluff_rate
+        self.unseen = []
+        self.likelihoods = {}
+        self.own = ()
+
+    def hand_distribution(self, player):
+        unseen = self.unseen
+        posterior = {
+            hand: likelihood * _ways(hand, unseen)
+            for hand, likelihood in self.likelihoods[player].items()
+        }
+        _normalize(posterior)
+        return posterior
+
+    def probability(self, player, character):
+        return sum(
+            p
+            for hand, p in self.hand_distribution(player).items()
+            if character in hand
+        )
+
+    def on_game_start(self, gamestate):
+        self.own = self.viewer.hidden_influences
+        self.unseen = [COPIES_PER_CHARACTER] * NUM_CHARACTERS
+        for player in gamestate.players:
+            for character in player.revealed_influences:
+                self.unseen[character] -= 1
+        for character in self.own:
+            self.unseen[character] -= 1
+        self.likelihoods = {
+            player: dict.fromkeys(_hands(len(player.hidden_influences)), 1.0)
+            for player in gamestate.players
+            if player is not self.viewer
+        }
+
+    def on_action(self, gamestate, action):
+        requirement = action.requirement
+        if requirement is None or action.user is self.viewer:
+            return
+        likelihoods = self.likelihoods[action.user]
+        for hand in likelihoods:
+            if requirement not in hand:
+                likelihoods[hand] *= self.bluff_rate
+
+    def on_challenge(self, gamestate, challenge, challenged_action, held):
+        player = challenged_action.user
+        if player is self.viewer:
+            return
+        requirement = challenged_action.requirement
+        likelihoods = self.likelihoods[player]
+        for hand in likelihoods:
+            if (requirement in hand) != held:
+                likelihoods[hand] = 0.0
+
+    def on_influence_lost(self, gamestate, player, influence):
+        if player is self.viewer:
+            self.own = player.hidden_influences
+            return
+        shrunk = {}
+        for hand, p in self.hand_distribution(player).items():
+            if p and influence in hand:
+                rest = _remove(hand, influence)
+                shrunk[rest] = shrunk.get(rest, 0.0) + p
+        self.unseen[influence] -= 1
+        self._set_posterior(player, shrunk)
+
+    def on_influence_replaced(self, gamestate, player, influence):
+        if player is self.viewer:
+            self._own_hand_changed()
+            return
+        # The new card came from the deck, before the proven one was returned.
+        replaced = {}
+        for hand, p in self.hand_distribution(player).items():
+            if not p or influence not in hand:
+                continue
+            rest = _remove(hand, influence)
+            deck = _deck(self.unseen, hand)
+            size = sum(deck)
+            for character in range(NUM_CHARACTERS):
+                if deck[character] > 0:
+                    new_hand = tuple(sorted(rest + (character,)))
+                    replaced[new_hand] = (
+                        replaced.get(new_hand, 0.0) + p * deck[character] / size
+                    )
+        self._set_posterior(player, replaced)
+
+    def on_exchange(self, gamestate, player):
+        if player is self.viewer:
+            self._own_hand_changed()
+            return
+        exchanged = {}
+        for hand, p in self.hand_distribution(player).items():
+            if not p:
+                continue
+            for drawn, chance in _draws(_deck(self.unseen, hand)):
+                keeps = list(combinations(sorted(hand + drawn), len(hand)))
+                share = p * chance / len(keeps)
+                for keep in keeps:
+                    exchanged[keep] = exchanged.get(keep, 0.0) + share
+        self._set_posterior(player, exchanged)
+
+    def _set_posterior(self, player, posterior):
+        """
+        Store a posterior over the hands of player as likelihoods, by
+        dividing out the ways each hand can be made from the unseen cards.
+        """
+        size = len(player.hidden_influences)
+        likelihoods = dict.fromkeys(_hands(size), 0.0)
+        for hand, p in posterior.items():
+            ways = _ways(hand, self.unseen)
+            if ways:
+                likelihoods[hand] = p / ways
+        if not any(likelihoods.values()):
+            likelihoods = dict.fromkeys(likelihoods, 1.0)
+        self.likelihoods[player] = likelihoods
+
+    def _own_hand_changed(self):
+        """
+        Move the cards the viewer gave up into the unseen cards and the cards
+        they drew out of them.
+        """
+        for character in self.own:
+            self.unseen[character] += 1
+        self.own = self.viewer.hidden_influences
+        for character in self.own:
+            self.unseen[character] -= 1
+
+
+def _hands(size):
+    return list(combinations_with_replacement(range(NUM_CHARACTERS), size))
+
+
+def _ways(hand, unseen):
+    ways = 1
+    for character in set(hand):
+        ways *= comb(unseen[character], hand.count(character))
+    return ways
+
+
+def _deck(unseen, hand):
+    """
+    The unseen cards other than those in hand.
+    """
+    deck = list(unseen)
+    for character in hand:
+        deck[character] -= 1
+    return deck
+
+
+def _draws(deck):
+    """
+    The pairs of cards that can be drawn from a deck of counts, with their
+    probabilities.
+    """
+    size = sum(deck)
+    pairs = size * (size - 1)
+    draws = []
+    for first, second in combinations_with_replacement(range(NUM_CHARACTERS), 2):
+        if first == second:
+            ways = deck[first] * (deck[first] - 1)
+        else:
+            ways = 2 * deck[first] * deck[second]
+        if ways > 0:
+            draws.append(((first, second), ways / pairs))
+    return draws
+
+
+def _remove(hand, character):
+    position = hand.index(character)
+    return hand[:position] + hand[position + 1 :]
+
+
+def _normalize(weights):
+    total = sum(weights.values())
+    if total > 0.0:
+        for hand in weights:
+            weights[hand] /= total
@@ -0,0 +1,221 @@
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+
+"""
+Matchup cache.
+
+    Aggregated results of the games between a seating of strategies, kept on
+    disk so that rerunning a tournament or a comparison only plays the games
+    of the strategies that changed (see the cache argument of
+    coup.tournament.run_tournament, coup.compare.compare and
+    coup.optimize.evolve).
+
+    An entry is addressed by the SHA-256 of everything its games depend on:
+
+        - the kind of games (e.g. "tournament" or "paired") and the seat
+          layout, i.e. the strategies in seat order;
+        - for each strategy, the source code of the modules defining its
+          class and its base classes (so module-level defaults, constants
+          and helper functions are covered), and its parameters: its repr
+          if the class defines one, else its attributes;
+        - RULES_VERSION, which must be increased whenever a change to the
+          engine changes the outcome of a seeded game;
+        - the seed and the range of game (or deal) indices.
+
+    Editing a module therefore invalidates only the matchups of the
+    strategies defined in it (or deriving from its classes). Code in other
+    modules that a strategy calls is not part of its key. A strategy whose
+    module source cannot be read (e.g. defined in an interactive session), or
+    whose parameters include an object without a stable repr, has no key,
+    and its games are never cached.
+
+    strategy_key(strategy): str or None
+        The part of a key describing one strategy.
+"""
+
+RULES_VERSION = 1
+# A default object repr such as <coup.strategy.HonestStrategy object at 0x...>
+# changes from one process to the next.
+_ADDRESS = " at 0x"
+
+
+def strategy_key(strategy):
+    cls = type(strategy)
+    sources = []
+    modules = []
+    for base in cls.__mro__:
+        module = inspect.getmodule(base)
+        if base is object or module in modules:
+            continue
+        modules.append(module)
+        try:
+            sources.append(inspect.getsource(module))
+        except (OSError, TypeError):
+            return None
+    if cls.__repr__ is not object.__repr__:
+        params = repr(strategy)
+    else:
+        params = repr(sorted(vars(strategy).items()))
+    if _ADDRESS in params:
+        return None
+    code = hashlib.sha256("\n".join(sources).encode()).hexdigest()
+    return f"{cls.__module__}.{cls.__qualname__}:{code}:{params}"
+
+
+"""
+Matchup Cache Class
+
+    Entries are small JSON files named by their key in a directory (spread
+    over 256 subdirectories by the first two hex digits of the key). A hit
+    touches the modification time of its file, and when the entries exceed
+    max_bytes or max_entries the least recently used ones are deleted, so the
+    directory can be shared between runs and is bounded in size.
+
+    The harnesses look up every entry before handing the missing games to
+    their workers. Separate runs may share the directory: every entry is
+    written to its own temporary file and renamed into place, and each
+    MatchupCache keeps its own least recently used order, read from the
+    modification times when it is created.
+
+    Fields:
+        directory: str
+        max_bytes: int
+        max_entries: int or None
+        hits, misses: int
+
+    Methods:
+        key(kind, strategies, seed, start, stop): str or None
+            The key of games start..stop-1 of a seating, None if one of the
+            strategies has no key (see strategy_key).
+        get(key): object or None
+            The value stored under key, None for a miss (or a None key).
+        put(key, value):
+            Store a JSON serializable value, nothing for a None key.
+        evict():
+            Delete the least recently used entries until the cache fits its
+            bounds.
+        clear():
+        __len__(): int
+"""
+
+
+class MatchupCache:
+    def __init__(self, directory, max_bytes=1 << 26, max_entries=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._bytes = 0
+        self._tick = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def key(self, kind, strategies, seed, start, stop):
+        seating = [strategy_key(strategy) for strategy in strategies]
+        if None in seating:
+            return None
+        content = json.dumps([RULES_VERSION, kind, seating, seed, start, stop])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, key):
+        if key is None or key not in self._entries:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._forget(key)
+            self.misses += 1
+            return None
+        self._tick += 1
+        self._entries[key] = (self._tick, self._entries[key][1])
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if key is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value)
+        # Write then rename, a reader never sees a partial entry, and every
+        # writer has its own temporary file.
+        descriptor, temporary = tempfile.mkstemp(
+            suffix=".tmp", dir=os.path.dirname(path)
+        )
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self._forget(key)
+        self._tick += 1
+        self._entries[key] = (self._tick, len(data))
+        self._bytes += len(data)
+        self.evict()
+
+    def evict(self):
+        if not self._over():
+            return
+        for key in sorted(self._entries, key=lambda key: self._entries[key][0]):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._forget(key)
+            if not self._over():
+                break
+
+    def clear(self):
+        for key in list(self._entries):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._forget(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _over(self):
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self._bytes > self.max_bytes
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _scan(self):
+        """
+        Index the entries already on disk, ordered by modification time.
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            subdirectory = os.path.join(self.directory, name)
+            if len(name) != 2 or not os.path.isdir(subdirectory):
+                continue
+            for entry in os.scandir(subdirectory):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime_ns, entry.name[:-5], stat.st_size))
+        found.sort()
+        for _, key, size in found:
+            self._tick += 1
+            self._entries[key] = (self._tick, size)
+            self._bytes += size
+        self.evict()
@@ -0,0 +1,507 @@
+from coup.influence import Character
+
+"""
+Compact game core.
+
+    An alternative representation of a game of Coup in which the whole state
+    is a flat tuple of small integers, together with a pure step function.
+    The rules are the ones implemented by coup/action.py and Game.handle_turn:
+
+        - The active player declares an action and pays its cost up front.
+        - The other players are polled in seat order, the first one to
+          respond (with a Challenge or a block) stops the polling.
+        - If the response was a block, every player other than the blocker
+          (including the active player) is polled again and may challenge it.
+        - The action stack is then resolved from the top down.
+
+    Every decision and every random event of a game is a node of the state
+    machine, the phase of a state says which one it is:
+
+        PHASE_ACTION:    the active player chooses an action (and target).
+        PHASE_RESPONSE:  TO_MOVE may respond to the top of the action stack, or
+                         PASS.
+        PHASE_LOSE:      TO_MOVE chooses which character to reveal. Losses
+                         with only one possible outcome are applied
+                         automatically.
+        PHASE_RETURN:    TO_MOVE chooses a card to return to the deck at the
+                         end of an Exchange (one decision per card).
+        PHASE_DRAW:      chance node, a card is drawn from the deck. The
+                         probability of DRAW + c is proportional to the number
+                         of copies of c left in the deck (see chance_weights).
+        PHASE_GAME_OVER: the game is finished.
+
+    Characters are numbered as in coup.influence.Character and seats
+    0 .. num_players - 1. There is room for MAX_PLAYERS seats, unused seats
+    are simply dead.
+
+    State layout (indices into the tuple):
+        NUM_PLAYERS, ACTIVE, PHASE, TO_MOVE (-1 at chance and terminal nodes),
+        TURN,
+        STACK_SIZE, STACK: up to three (action id, user seat, succeeds)
+            entries, bottom first,
+        TASK_COUNT, TASKS: up to two (kind, seat, argument) entries, the work
+            left over from resolving a stack entry (influence losses, card
+            replacements and exchanges),
+        COINS: one per seat,
+        HIDDEN, REVEALED: per seat counts of each character,
+        DECK: counts of each character left in the Court deck.
+
+    Action ids:
+        INCOME, FOREIGN_AID, TAX, EXCHANGE,
+        COUP + target, ASSASSINATE + target, STEAL + target,
+        PASS, CHALLENGE, BLOCK_FOREIGN_AID, BLOCK_ASSASSINATION,
+        BLOCK_STEALING_AMBASSADOR, BLOCK_STEALING_CAPTAIN,
+        LOSE + character, RETURN + character, DRAW + character.
+    There are NUM_ACTIONS < 64 of them, so the legal actions of a state fit in
+    a single integer bitmask.
+
+    Functions:
+        new_state(hands): tuple
+            Build the state at the start of a game, hands holds the two
+            characters dealt to each seat.
+        deal(num_players, rng): tuple
+            Shuffle a full deck with rng (e.g. a random.Random) and deal it.
+        legal_actions(state): int
+            Bitmask of the action ids that are legal in the state.
+        step(state, action_id): tuple
+            Return the state reached by taking a legal action id in state. The
+            argument is not modified.
+        chance_weights(state): tuple of int
+            Number of copies of each character in the deck, the weights of the
+            DRAW actions at a chance node.
+        iter_actions(mask): generator of int
+            The action ids set in a bitmask, in increasing order.
+        is_alive(state, seat), num_influences(state, seat), winner(state)
+"""
+
+DUKE = int(Character.DUKE)
+ASSASSIN = int(Character.ASSASSIN)
+CAPTAIN = int(Character.CAPTAIN)
+AMBASSADOR = int(Character.AMBASSADOR)
+CONTESSA = int(Character.CONTESSA)
+NUM_CHARACTERS = len(Character)
+COPIES_PER_CHARACTER = 3
+
+MAX_PLAYERS = 6
+STARTING_COINS = 3
+STACK_DEPTH = 3
+MAX_TASKS = 2
+
+# Action ids.
+INCOME = 0
+FOREIGN_AID = 1
+TAX = 2
+EXCHANGE = 3
+COUP = 4
+ASSASSINATE = COUP + MAX_PLAYERS
+STEAL = ASSASSINATE + MAX_PLAYERS
+PASS = STEAL + MAX_PLAYERS
+CHALLENGE = PASS + 1
+BLOCK_FOREIGN_AID = PASS + 2
+BLOCK_ASSASSINATION = PASS + 3
+BLOCK_STEALING_AMBASSADOR = PASS + 4
+BLOCK_STEALING_CAPTAIN = PASS + 5
+LOSE = PASS + 6
+RETURN = LOSE + NUM_CHARACTERS
+DRAW = RETURN + NUM_CHARACTERS
+NUM_ACTIONS = DRAW + NUM_CHARACTERS
+
+# Phases.
+PHASE_ACTION = 0
+PHASE_RESPONSE = 1
+PHASE_LOSE = 2
+PHASE_RETURN = 3
+PHASE_DRAW = 4
+PHASE_GAME_OVER = 5
+
+# Pending task kinds.
+TASK_LOSE = 1
+TASK_REPLACE = 2
+TASK_EXCHANGE_DRAW = 3
+TASK_EXCHANGE_RETURN = 4
+
+# State layout.
+NUM_PLAYERS = 0
+ACTIVE = 1
+PHASE = 2
+TO_MOVE = 3
+TURN = 4
+STACK_SIZE = 5
+STACK = 6
+TASK_COUNT = STACK + 3 * STACK_DEPTH
+TASKS = TASK_COUNT + 1
+COINS = TASKS + 3 * MAX_TASKS
+HIDDEN = COINS + MAX_PLAYERS
+REVEALED = HIDDEN + NUM_CHARACTERS * MAX_PLAYERS
+DECK = REVEALED + NUM_CHARACTERS * MAX_PLAYERS
+STATE_SIZE = DECK + NUM_CHARACTERS
+
+NO_REQUIREMENT = -1
+
+# Character an action (by action type) claims, or NO_REQUIREMENT.
+REQUIREMENTS = [NO_REQUIREMENT] * NUM_ACTIONS
+REQUIREMENTS[TAX] = DUKE
+REQUIREMENTS[EXCHANGE] = AMBASSADOR
+REQUIREMENTS[ASSASSINATE] = ASSASSIN
+REQUIREMENTS[STEAL] = CAPTAIN
+REQUIREMENTS[BLOCK_FOREIGN_AID] = DUKE
+REQUIREMENTS[BLOCK_ASSASSINATION] = CONTESSA
+REQUIREMENTS[BLOCK_STEALING_AMBASSADOR] = AMBASSADOR
+REQUIREMENTS[BLOCK_STEALING_CAPTAIN] = CAPTAIN
+REQUIREMENTS = tuple(REQUIREMENTS)
+
+COSTS = [0] * NUM_ACTIONS
+COSTS[COUP] = 7
+COSTS[ASSASSINATE] = 3
+COSTS = tuple(COSTS)
+
+BLOCKS = (
+    BLOCK_FOREIGN_AID,
+    BLOCK_ASSASSINATION,
+    BLOCK_STEALING_AMBASSADOR,
+    BLOCK_STEALING_CAPTAIN,
+)
+
+
+def action_type(action_id):
+    """
+    Strip the target from a targeted action id, e.g. COUP + 2 -> COUP.
+    """
+    if COUP <= action_id < PASS:
+        return action_id - (action_id - COUP) % MAX_PLAYERS
+    return action_id
+
+
+def action_target(action_id):
+    """
+    Return the target seat of a targeted action id, or -1.
+    """
+    if COUP <= action_id < PASS:
+        return (action_id - COUP) % MAX_PLAYERS
+    return -1
+
+
+def is_challengeable(action_id):
+    return REQUIREMENTS[action_type(action_id)] != NO_REQUIREMENT
+
+
+def iter_actions(mask):
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
+def new_state(hands):
+    num_players = len(hands)
+    if not 2 <= num_players <= MAX_PLAYERS:
+        raise ValueError("Coup is played by 2 to " + str(MAX_PLAYERS) + " players")
+    state = [0] * STATE_SIZE
+    state[NUM_PLAYERS] = num_players
+    state[PHASE] = PHASE_ACTION
+    for character in range(NUM_CHARACTERS):
+        state[DECK + character] = COPIES_PER_CHARACTER
+    for seat, hand in enumerate(hands):
+        state[COINS + seat] = STARTING_COINS
+        for character in hand:
+            state[HIDDEN + seat * NUM_CHARACTERS + character] += 1
+            state[DECK + character] -= 1
+    if min(state[DECK : DECK + NUM_CHARACTERS]) < 0:
+        raise ValueError("More than three copies of a character were dealt")
+    return tuple(state)
+
+
+def deal(num_players, rng):
+    deck = [
+        character
+        for character in range(NUM_CHARACTERS)
+        for _ in range(COPIES_PER_CHARACTER)
+    ]
+    rng.shuffle(deck)
+    return new_state([deck[2 * seat : 2 * seat + 2] for seat in range(num_players)])
+
+
+def num_influences(state, seat):
+    start = HIDDEN + seat * NUM_CHARACTERS
+    return sum(state[start : start + NUM_CHARACTERS])
+
+
+def is_alive(state, seat):
+    return num_influences(state, seat) > 0
+
+
+def is_terminal(state):
+    return state[PHASE] == PHASE_GAME_OVER
+
+
+def winner(state):
+    """
+    Return the seat of the last player with influence, or -1 if the game is
+    not over.
+    """
+    if state[PHASE] != PHASE_GAME_OVER:
+        return -1
+    for seat in range(state[NUM_PLAYERS]):
+        if is_alive(state, seat):
+            return seat
+    return -1
+
+
+def chance_weights(state):
+    return state[DECK : DECK + NUM_CHARACTERS]
+
+
+def legal_actions(state):
+    phase = state[PHASE]
+    if phase == PHASE_ACTION:
+        return _action_mask(state)
+    if phase == PHASE_RESPONSE:
+        return (1 << PASS) | _response_mask(state, state[TO_MOVE])
+    if phase == PHASE_LOSE or phase == PHASE_RETURN:
+        base = LOSE if phase == PHASE_LOSE else RETURN
+        start = HIDDEN + state[TO_MOVE] * NUM_CHARACTERS
+        mask = 0
+        for character in range(NUM_CHARACTERS):
+            if state[start + character]:
+                mask |= 1 << (base + character)
+        return mask
+    if phase == PHASE_DRAW:
+        mask = 0
+        for character in range(NUM_CHARACTERS):
+            if state[DECK + character]:
+                mask |= 1 << (DRAW + character)
+        return mask
+    return 0
+
+
+def _action_mask(state):
+    """
+    Helper function for legal_actions, the actions available to the active
+    player at the start of their turn.
+    """
+    active = state[ACTIVE]
+    coins = state[COINS + active]
+    mask = 0
+    if coins < 10:
+        mask = (1 << INCOME) | (1 << FOREIGN_AID) | (1 << TAX) | (1 << EXCHANGE)
+    for target in range(state[NUM_PLAYERS]):
+        if target == active or not is_alive(state, target):
+            continue
+        if coins >= 7:
+            mask |= 1 << (COUP + target)
+        if coins < 10:
+            if coins >= 3:
+                mask |= 1 << (ASSASSINATE + target)
+            if state[COINS + target] > 0:
+                mask |= 1 << (STEAL + target)
+    return mask
+
+
+def _response_mask(state, seat):
+    """
+    Helper function for legal_actions, the responses (other than PASS) that
+    seat can make to the top of the action stack.
+    """
+    size = state[STACK_SIZE]
+    if size == 0 or size == STACK_DEPTH or not is_alive(state, seat):
+        return 0
+    top = STACK + 3 * (size - 1)
+    top_action = state[top]
+    if seat == state[top + 1]:
+        return 0
+    mask = 0
+    if is_challengeable(top_action):
+        mask |= 1 << CHALLENGE
+    if size == 1 and seat != state[ACTIVE]:
+        top_type = action_type(top_action)
+        if top_type == FOREIGN_AID:
+            mask |= 1 << BLOCK_FOREIGN_AID
+        elif top_type == ASSASSINATE and action_target(top_action) == seat:
+            mask |= 1 << BLOCK_ASSASSINATION
+        elif top_type == STEAL:
+            mask |= (1 << BLOCK_STEALING_AMBASSADOR) | (1 << BLOCK_STEALING_CAPTAIN)
+    return mask
+
+
+def step(state, action_id):
+    s = list(state)
+    phase = s[PHASE]
+    if phase == PHASE_ACTION:
+        active = s[ACTIVE]
+        s[COINS + active] -= COSTS[action_type(action_id)]
+        _push(s, action_id, active)
+        _next_responder(s, -1)
+    elif phase == PHASE_RESPONSE:
+        if action_id == PASS:
+            _next_responder(s, s[TO_MOVE])
+        else:
+            _push(s, action_id, s[TO_MOVE])
+            _next_responder(s, -1)
+    elif phase == PHASE_LOSE:
+        seat = s[TO_MOVE]
+        character = action_id - LOSE
+        s[HIDDEN + seat * NUM_CHARACTERS + character] -= 1
+        s[REVEALED + seat * NUM_CHARACTERS + character] += 1
+        _pop_task(s)
+        _advance(s)
+    elif phase == PHASE_RETURN:
+        seat = s[TO_MOVE]
+        character = action_id - RETURN
+        s[HIDDEN + seat * NUM_CHARACTERS + character] -= 1
+        s[DECK + character] += 1
+        s[TASKS + 2] -= 1
+        if s[TASKS + 2] == 0:
+            _pop_task(s)
+        _advance(s)
+    elif phase == PHASE_DRAW:
+        character = action_id - DRAW
+        kind, seat, argument = s[TASKS], s[TASKS + 1], s[TASKS + 2]
+        s[DECK + character] -= 1
+        s[HIDDEN + seat * NUM_CHARACTERS + character] += 1
+        if kind == TASK_REPLACE:
+            # The revealed character goes back only after the new card has
+            # been drawn, as in Player.replace_influence.
+            s[HIDDEN + seat * NUM_CHARACTERS + argument] -= 1
+            s[DECK + argument] += 1
+            _pop_task(s)
+        elif argument == 1:
+            s[TASKS] = TASK_EXCHANGE_RETURN
+            s[TASKS + 2] = 2
+        else:
+            s[TASKS + 2] = argument - 1
+        _advance(s)
+    return tuple(s)
+
+
+def _push(s, action_id, seat):
+    entry = STACK + 3 * s[STACK_SIZE]
+    s[entry] = action_id
+    s[entry + 1] = seat
+    s[entry + 2] = 1
+    s[STACK_SIZE] += 1
+
+
+def _next_responder(s, after):
+    """
+    Poll the players with a seat greater than after, in seat order, and stop
+    at the first one that has a legal response. If there is none the
+    response phase is over and the action stack is resolved.
+    """
+    size = s[STACK_SIZE]
+    if size < STACK_DEPTH:
+        for seat in range(after + 1, s[NUM_PLAYERS]):
+            if _response_mask(s, seat):
+                s[PHASE] = PHASE_RESPONSE
+                s[TO_MOVE] = seat
+                return
+    _advance(s)
+
+
+def _add_task(s, kind, seat, argument):
+    task = TASKS + 3 * s[TASK_COUNT]
+    s[task] = kind
+    s[task + 1] = seat
+    s[task + 2] = argument
+    s[TASK_COUNT] += 1
+
+
+def _pop_task(s):
+    s[TASKS : TASKS + 3] = s[TASKS + 3 : TASKS + 6]
+    s[TASKS + 3 : TASKS + 6] = (0, 0, 0)
+    s[TASK_COUNT] -= 1
+
+
+def _advance(s):
+    """
+    Resolve pending tasks and action stack entries until a decision or a
+    chance node is reached, ending the turn once everything is resolved.
+    """
+    while True:
+        if s[TASK_COUNT]:
+            kind, seat = s[TASKS], s[TASKS + 1]
+            if kind == TASK_LOSE:
+                start = HIDDEN + seat * NUM_CHARACTERS
+                held = [c for c in range(NUM_CHARACTERS) if s[start + c]]
+                if not held:
+                    _pop_task(s)
+                elif len(held) == 1:
+                    s[start + held[0]] -= 1
+                    s[REVEALED + seat * NUM_CHARACTERS + held[0]] += 1
+                    _pop_task(s)
+                else:
+                    s[PHASE] = PHASE_LOSE
+                    s[TO_MOVE] = seat
+                    return
+            elif kind == TASK_EXCHANGE_RETURN:
+                s[PHASE] = PHASE_RETURN
+                s[TO_MOVE] = seat
+                return
+            else:
+                s[PHASE] = PHASE_DRAW
+                s[TO_MOVE] = -1
+                return
+        elif s[STACK_SIZE]:
+            _resolve_top(s)
+        else:
+            _end_turn(s)
+            return
+
+
+def _resolve_top(s):
+    """
+    Pop the top entry of the action stack and resolve it if it succeeds,
+    following the resolve methods in coup/action.py.
+    """
+    s[STACK_SIZE] -= 1
+    entry = STACK + 3 * s[STACK_SIZE]
+    action_id, user, succeeds = s[entry], s[entry + 1], s[entry + 2]
+    s[entry : entry + 3] = (0, 0, 0)
+    if not succeeds:
+        return
+    below = entry - 3
+    if action_id == CHALLENGE:
+        challenged_id, challenged = s[below], s[below + 1]
+        requirement = REQUIREMENTS[action_type(challenged_id)]
+        if s[HIDDEN + challenged * NUM_CHARACTERS + requirement]:
+            _add_task(s, TASK_LOSE, user, 0)
+            _add_task(s, TASK_REPLACE, challenged, requirement)
+        else:
+            s[below + 2] = 0
+            _add_task(s, TASK_LOSE, challenged, 0)
+    elif action_id in BLOCKS:
+        s[below + 2] = 0
+    elif action_id == INCOME:
+        s[COINS + user] += 1
+    elif action_id == FOREIGN_AID:
+        s[COINS + user] += 2
+    elif action_id == TAX:
+        s[COINS + user] += 3
+    elif action_id == EXCHANGE:
+        _add_task(s, TASK_EXCHANGE_DRAW, user, 2)
+    else:
+        kind = action_type(action_id)
+        target = action_target(action_id)
+        if kind == STEAL:
+            stolen = min(2, s[COINS + target])
+            s[COINS + target] -= stolen
+            s[COINS + user] += stolen
+        else:
+            _add_task(s, TASK_LOSE, target, 0)
+
+
+def _end_turn(s):
+    num_players = s[NUM_PLAYERS]
+    alive = [seat for seat in range(num_players) if is_alive(s, seat)]
+    if len(alive) <= 1:
+        s[PHASE] = PHASE_GAME_OVER
+        s[TO_MOVE] = -1
+        return
+    active = s[ACTIVE]
+    for offset in range(1, num_players + 1):
+        seat = (active + offset) % num_players
+        if seat in alive:
+            break
+    s[ACTIVE] = seat
+    s[TO_MOVE] = seat
+    s[PHASE] = PHASE_ACTION
+    s[TURN] += 1
@@ -0,0 +1,330 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from coup.simulate import run_paired_games
+
+"""
+Sequential strategy comparison.
+
+    compare(strategy_a, strategy_b, seed=0, delta=0.05, alpha=0.05, beta=0.05,
+            method="sprt", batch_size=200, max_games=100000, workers=1,
+            cache=None): CompareResult
+        Play 2-player games between two strategies in batches of batch_size
+        deals until the stopping rule is met, or max_games have been played
+        (only whole deals are played, so an odd max_games stops one game
+        short of it).
+        Every deal is played twice, once with each strategy in the first
+        seat, with common random numbers (see coup.simulate.run_paired_games):
+        both games are dealt the same cards, which cancels the advantage of
+        the first seat and of the better hand, so fewer games are needed. The
+        rule is checked after every batch, so the earliest decision comes
+        after 2 * batch_size games. The batches are split over worker
+        processes when workers > 1, the games played and the result do not
+        depend on the number of workers. With a cache (see coup/cache.py) the
+        outcomes of every batch are looked up before it is played, and
+        stored after.
+
+    The two games of a deal are positively correlated (the same cards often
+    win both), so they are not independent trials. The stopping rules work
+    on deals instead: the score of a deal is (wins of strategy_a - wins of
+    strategy_b) / 2 over its two games, one of -1, -1/2, 0, 1/2 or 1, and its
+    mean is 2p - 1 where p is the win rate of strategy_a. Deals are
+    independent, and a deal split one game each, the common case between
+    close strategies, scores 0 and only adds to the evidence of no
+    difference. The mean and variance of the score are estimated from the
+    deals, plus one virtual deal won by each strategy so that the variance
+    is never 0:
+
+        "sprt": two one-sided generalized sequential probability ratio tests
+            on the deal scores with a normal approximation (as used for chess
+            engine testing), p = 1/2 against p = 1/2 + delta and p = 1/2
+            against p = 1/2 - delta, with error rates alpha (false
+            difference) and beta (missed difference). The comparison stops
+            when either test accepts a difference, or both accept p = 1/2.
+        "bayes": the normal approximation of the posterior of the mean
+            score. The comparison stops when the posterior probability that
+            one strategy is better exceeds 1 - alpha, or the probability that
+            |p - 1/2| < delta exceeds 1 - beta. These are posterior
+            thresholds, not error rates: checked after every batch, equal
+            strategies are declared different far more often than alpha.
+
+    The decision is one of A_BETTER, B_BETTER, EQUIVALENT (the difference is
+    smaller than delta) or INCONCLUSIVE (max_games were played first).
+
+    wilson_interval(wins, games, confidence=0.95): (float, float)
+        The Wilson score interval of a win rate.
+"""
+
+A_BETTER = "a_better"
+B_BETTER = "b_better"
+EQUIVALENT = "equivalent"
+INCONCLUSIVE = "inconclusive"
+# The deal scores, indexed by wins of strategy_a - wins of strategy_b + 2.
+DEAL_SCORES = (-1.0, -0.5, 0.0, 0.5, 1.0)
+
+
+def compare(
+    strategy_a,
+    strategy_b,
+    seed=0,
+    delta=0.05,
+    alpha=0.05,
+    beta=0.05,
+    method="sprt",
+    batch_size=200,
+    max_games=100000,
+    workers=1,
+    cache=None,
+):
+    if method == "sprt":
+        rule = SPRT(delta, alpha, beta)
+    elif method == "bayes":
+        rule = BayesRule(delta, alpha, beta)
+    else:
+        raise ValueError("unknown stopping rule " + str(method))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    result = CompareResult(delta)
+    strategies = (strategy_a, strategy_b)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        deal = 0
+        while result.games < max_games:
+            deals = min(batch_size, (max_games - result.games) // 2)
+            if not deals:
+                break
+            key = None
+            counts = None
+            if cache is not None:
+                key = cache.key("paired-deals", strategies, seed, deal, deal + deals)
+                counts = cache.get(key)
+            if counts is None:
+                tasks = _batch_tasks(strategy_a, strategy_b, seed, deal, deals, workers)
+                if executor is None:
+                    played = [_play_task(task) for task in tasks]
+                else:
+                    played = list(executor.map(_play_task, tasks))
+                counts = [
+                    sum(task[0] for task in played),
+                    sum(task[1] for task in played),
+                    [sum(counts) for counts in zip(*(task[2] for task in played))],
+                ]
+                if cache is not None:
+                    cache.put(key, counts)
+            result.add(*counts)
+            deal += deals
+            result.decision = rule.decide(result.outcomes)
+            if result.decision != INCONCLUSIVE:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return result
+
+
+def _batch_tasks(strategy_a, strategy_b, seed, start, deals, workers):
+    """
+    Helper function for compare, deals start..start+deals-1 split in about
+    one shard per worker.
+    """
+    shards = max(1, min(workers, deals))
+    cuts = [start + deals * shard // shards for shard in range(shards + 1)]
+    return [
+        ((strategy_a, strategy_b), seed, cuts[shard], cuts[shard + 1])
+        for shard in range(shards)
+    ]
+
+
+def _play_task(task):
+    """
+    Play the paired games of a shard of deals, return the wins of
+    strategy_a and strategy_b and the number of deals of each score (see
+    DEAL_SCORES).
+    """
+    strategies, seed, start, stop = task
+    wins = [0, 0]
+    outcomes = [0] * len(DEAL_SCORES)
+    results = run_paired_games(strategies, stop - start, seed, start=start)
+    # The games of a deal are consecutive, one per seating.
+    for first in range(0, len(results), 2):
+        difference = 0
+        for result in results[first : first + 2]:
+            if result.winner is not None:
+                wins[result.winner] += 1
+                difference += 1 if result.winner == 0 else -1
+        outcomes[difference + 2] += 1
+    return wins[0], wins[1], outcomes
+
+
+def _deal_moments(outcomes):
+    """
+    The number of deals and the mean and variance of their score, counting
+    one virtual deal won by each strategy.
+    """
+    deals = sum(outcomes) + 2
+    total = sum(count * score for count, score in zip(outcomes, DEAL_SCORES))
+    squares = sum(count * score * score for count, score in zip(outcomes, DEAL_SCORES))
+    mean = total / deals
+    return deals, mean, (squares + 2) / deals - mean * mean
+
+
+def wilson_interval(wins, games, confidence=0.95):
+    if not games:
+        return 0.0, 1.0
+    z = _normal_quantile(0.5 + confidence / 2)
+    p = wins / games
+    denominator = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games))
+    spread /= denominator
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def _normal_cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def _normal_quantile(p):
+    """
+    The inverse of _normal_cdf, by bisection.
+    """
+    low, high = -10.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if _normal_cdf(middle) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+"""
+Compare Result Class
+
+    Fields:
+        delta: float
+        games: int, the games played, including any without a winner.
+        deals: int
+        wins_a, wins_b: int
+        outcomes: list of int, the number of deals of each score (see
+            DEAL_SCORES).
+        decision: str, see compare.
+
+    Methods:
+        add(wins_a, wins_b, outcomes):
+        win_rate(): float
+            The win rate of strategy_a.
+        interval(confidence=0.95): (float, float)
+            The Wilson interval of the win rate of strategy_a. It treats the
+            games as independent, so it is somewhat too wide for paired
+            games (see compare).
+"""
+
+
+class CompareResult:
+    def __init__(self, delta):
+        self.delta = delta
+        self.games = 0
+        self.deals = 0
+        self.wins_a = 0
+        self.wins_b = 0
+        self.outcomes = [0] * len(DEAL_SCORES)
+        self.decision = INCONCLUSIVE
+
+    def add(self, wins_a, wins_b, outcomes):
+        self.wins_a += wins_a
+        self.wins_b += wins_b
+        deals = sum(outcomes)
+        self.deals += deals
+        self.games += 2 * deals
+        for index, count in enumerate(outcomes):
+            self.outcomes[index] += count
+
+    def win_rate(self):
+        if not self.games:
+            return 0.0
+        return self.wins_a / self.games
+
+    def interval(self, confidence=0.95):
+        return wilson_interval(self.wins_a, self.games, confidence)
+
+    def __repr__(self):
+        low, high = self.interval()
+        return (
+            f"CompareResult(decision={self.decision}, games={self.games}, "
+            f"win_rate={self.win_rate():.3f}, interval=({low:.3f}, {high:.3f}))"
+        )
+
+
+"""
+SPRT Class
+
+    The "sprt" stopping rule of compare.
+
+    Fields:
+        shift: float, the mean deal score 2 * delta of the alternatives.
+        lower, upper: float, the log likelihood ratio bounds at which a test
+            accepts p = 1/2 or the difference.
+
+    Methods:
+        decide(outcomes): str
+        llr(outcomes, mean): float
+            The log likelihood ratio of a mean deal score of mean against 0,
+            for normally distributed scores with the observed variance.
+"""
+
+
+class SPRT:
+    def __init__(self, delta, alpha, beta):
+        self.shift = 2 * delta
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+
+    def llr(self, outcomes, mean):
+        deals, observed, variance = _deal_moments(outcomes)
+        return deals * (mean * observed - mean * mean / 2) / variance
+
+    def decide(self, outcomes):
+        better = self.llr(outcomes, self.shift)
+        worse = self.llr(outcomes, -self.shift)
+        if better >= self.upper:
+            return A_BETTER
+        if worse >= self.upper:
+            return B_BETTER
+        if better <= self.lower and worse <= self.lower:
+            return EQUIVALENT
+        return INCONCLUSIVE
+
+
+"""
+Bayes Rule Class
+
+    The "bayes" stopping rule of compare.
+
+    Methods:
+        decide(outcomes): str
+"""
+
+
+class BayesRule:
+    def __init__(self, delta, alpha, beta):
+        self.delta = delta
+        self.alpha = alpha
+        self.beta = beta
+
+    def decide(self, outcomes):
+        deals, mean, variance = _deal_moments(outcomes)
+        deviation = math.sqrt(variance / deals)
+        better = 1 - _normal_cdf(-mean / deviation)
+        if better > 1 - self.alpha:
+            return A_BETTER
+        if better < self.alpha:
+            return B_BETTER
+        shift = 2 * self.delta
+        equivalent = _normal_cdf((shift - mean) / deviation) - _normal_cdf(
+            (-shift - mean) / deviation
+        )
+        if equivalent > 1 - self.beta:
+            return EQUIVALENT
+        return INCONCLUSIVE
@@ -1,33 +1,50 @@
-from random import shuffle
-from coup.influence import Duke, Ambassador, Captain, Assassin, Contessa
+import random
+
+from coup.influence import Character
 
 """
 Deck Class
     
     Fields:
-        deck: list of cards
+        deck: list of Character
+        rng: random.Random, or the random module (the default) to share the
+            global stream.
 
     Methods:
-        __init__():
+        __init__(rng=None):
         shuffle():
         draw_card():
         draw_cards(num):
         return_cards(cards):
         reset():
+        composition(): list of int
+            Number of cards of each character left in the deck, in the order
+            Duke, Assassin, Captain, Ambassador, Contessa.
+        get_state(): tuple
+            An immutable copy of the order of the cards in the deck.
+        set_state(state):
+            Restore the deck to a state returned by get_state.
 
     Description:
         The deck contains three of each type of card (Duke, Assassin, Captain,
         Ambassador, Contessa).
 """
 
+CHARACTERS = tuple(Character)
+COPIES_PER_CHARACTER = 3
+FULL_DECK = tuple(
+    character for character in CHARACTERS for _ in range(COPIES_PER_CHARACTER)
+)
+
 
 class Deck:
-    def __init__(self):
+    def __init__(self, rng=None):
         self.deck = []
+        self.rng = rng if rng is not None else random
         self.reset()
 
     def shuffle(self):
-        shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
     def draw_card(self):
         return self.deck.pop()
@@ -44,21 +61,86 @@ class Deck:
         self.shuffle()
 
     def reset(self):
-        self.deck = [
-            Duke(),
-            Duke(),
-            Duke(),
-            Assassin(),
-            Assassin(),
-            Assassin(),
-            Captain(),
-            Captain(),
-            Captain(),
-            Ambassador(),
-            Ambassador(),
-            Ambassador(),
-            Contessa(),
-            Contessa(),
-            Contessa(),
-        ]
+        self.deck = list(FULL_DECK)
         self.shuffle()
+
+    def composition(self):
+        counts = [0] * len(CHARACTERS)
+        for card in self.deck:
+            counts[card] += 1
+        return counts
+
+    def get_state(self):
+        return tuple(self.deck)
+
+    def set_state(self, state):
+        self.deck[:] = state
+
+
+"""
+Counted Deck Class
+
+    Fields:
+        counts: list of int
+            Number of cards of each character left in the deck, in the order
+            of CHARACTERS.
+        size: int
+        rng: random.Random or the random module.
+
+    Methods:
+        Same as the Deck class, get_state returns a tuple of the counts.
+
+    Description:
+        A drop-in replacement for Deck that stores the Court as five counts
+        rather than a list of cards. A draw picks a uniformly random card of
+        the remaining Court (a character with probability proportional to its
+        count), which is exactly what drawing from a freshly shuffled list
+        gives, so returning a card is a single increment instead of a
+        reshuffle of the whole deck. Resetting the deck allocates nothing.
+"""
+
+
+class CountedDeck:
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random
+        self.counts = [COPIES_PER_CHARACTER] * len(CHARACTERS)
+        self.size = COPIES_PER_CHARACTER * len(CHARACTERS)
+
+    def shuffle(self):
+        pass
+
+    def draw_card(self):
+        pick = self.rng.randrange(self.size)
+        counts = self.counts
+        character = 0
+        while pick >= counts[character]:
+            pick -= counts[character]
+            character += 1
+        counts[character] -= 1
+        self.size -= 1
+        return CHARACTERS[character]
+
+    def draw_cards(self, num):
+        return [self.draw_card() for _ in range(num)]
+
+    def return_cards(self, cards):
+        for card in cards:
+            self.return_card(card)
+
+    def return_card(self, card):
+        self.counts[card] += 1
+        self.size += 1
+
+    def reset(self):
+        self.counts[:] = [COPIES_PER_CHARACTER] * len(CHARACTERS)
+        self.size = COPIES_PER_CHARACTER * len(CHARACTERS)
+
+    def composition(self):
+        return self.counts[:]
+
+    def get_state(self):
+        return tuple(self.counts)
+
+    def set_state(self, state):
+        self.counts[:] = state
+        self.size = sum(state)
@@ -0,0 +1,218 @@
+import random
+from bisect import bisect
+from itertools import accumulate, combinations_with_replacement
+from math import comb
+
+from coup.compact import DECK, HIDDEN, NUM_CHARACTERS, NUM_PLAYERS
+
+"""
+Determinization Sampler Class
+
+    Deals the cards a player cannot see, consistently with everything they
+    can: the hidden hands of the opponents (whose sizes are known) and the
+    rest of the Court deck, out of the unseen copies of each character (three
+    of each, minus the player's own hand and every revealed card).
+
+    Rather than dealing at random and rejecting the deals that break a
+    constraint, the sampler enumerates every feasible assignment of hands
+    (as multisets) to the opponents, a world, once for each combination of
+    unseen cards and hand sizes. Each world is weighted by the number of
+    ways to deal it, so sampling from the weights is exactly the same as
+    shuffling the unseen cards and dealing them, and the cumulative weights
+    are cached, so drawing a world is a binary search. Optionally each
+    opponent's hand is also weighted by a likelihood, such as the
+    likelihoods of a BeliefState (see coup/belief.py), which gives exact
+    samples from the posterior.
+
+    Without likelihoods, games with more than MAX_ENUMERATED opponents (whose
+    worlds run into the hundreds of thousands) are dealt by shuffling the
+    unseen cards instead, which is just as exact.
+
+    Fields:
+        rng: random.Random
+        max_cached: int, the number of combinations of unseen cards and hand
+            sizes kept, the cache is emptied when it is full.
+
+    Methods:
+        worlds(unseen, sizes): (list of worlds, list of float)
+            The feasible worlds and their cumulative weights. A world is a
+            tuple with one hand (a sorted tuple of characters) per size.
+        sample(unseen, sizes, k, likelihoods=None): list of worlds
+            Draw k worlds. likelihoods has one dict of hand to weight (or
+            None) per opponent.
+        sample_states(state, seat, k, known=(), likelihoods=None):
+            list of tuple
+            Draw k compact states in which the opponents' hands and the deck
+            of state have been redealt from what seat cannot see. known lists
+            (seat, character) pairs of cards other players are known to hold.
+            likelihoods is a dict of opponent seat to likelihoods.
+        deck_order(deck): list of Character values
+            A shuffled deck with the given counts, for engines that keep the
+            deck in order.
+"""
+
+
+MAX_ENUMERATED = 3
+
+
+class DeterminizationSampler:
+    def __init__(self, rng=None, max_cached=256):
+        self.rng = rng if rng is not None else random.Random()
+        self.max_cached = max_cached
+        self._cache = {}
+
+    def worlds(self, unseen, sizes):
+        key = (tuple(unseen), tuple(sizes))
+        cached = self._cache.get(key)
+        if cached is None:
+            if len(self._cache) >= self.max_cached:
+                self._cache.clear()
+            worlds, weights = _enumerate(list(unseen), sizes)
+            cached = self._cache[key] = (worlds, weights, list(accumulate(weights)))
+        return cached[0], cached[2]
+
+    def sample(self, unseen, sizes, k, likelihoods=None):
+        weighted = likelihoods is not None and any(
+            likelihood is not None for likelihood in likelihoods
+        )
+        if not weighted and len(sizes) > MAX_ENUMERATED:
+            return self._shuffled(unseen, sizes, k)
+        worlds, cumulative = self.worlds(unseen, sizes)
+        if weighted:
+            cumulative = self._weighted(unseen, sizes, likelihoods)
+        total = cumulative[-1]
+        random_value = self.rng.random
+        return [worlds[bisect(cumulative, random_value() * total)] for _ in range(k)]
+
+    def sample_states(self, state, seat, k, known=(), likelihoods=None):
+        opponents = []
+        sizes = []
+        unseen = list(state[DECK : DECK + NUM_CHARACTERS])
+        for other in range(state[NUM_PLAYERS]):
+            if other == seat:
+                continue
+            start = HIDDEN + other * NUM_CHARACTERS
+            hand = state[start : start + NUM_CHARACTERS]
+            if sum(hand):
+                opponents.append(other)
+                sizes.append(sum(hand))
+                for character in range(NUM_CHARACTERS):
+                    unseen[character] += hand[character]
+        weights = [None] * len(opponents)
+        if likelihoods:
+            for index, other in enumerate(opponents):
+                weights[index] = likelihoods.get(other)
+        for other, character in known:
+            if other in opponents:
+                index = opponents.index(other)
+                weights[index] = _require(weights[index], sizes[index], character)
+
+        base = list(state)
+        for other in opponents:
+            start = HIDDEN + other * NUM_CHARACTERS
+            base[start : start + NUM_CHARACTERS] = [0] * NUM_CHARACTERS
+        states = []
+        for world in self.sample(unseen, sizes, k, weights):
+            s = list(base)
+            deck = list(unseen)
+            for other, hand in zip(opponents, world):
+                start = HIDDEN + other * NUM_CHARACTERS
+                for character in hand:
+                    s[start + character] += 1
+                    deck[character] -= 1
+            s[DECK : DECK + NUM_CHARACTERS] = deck
+            states.append(tuple(s))
+        return states
+
+    def deck_order(self, deck):
+        cards = [
+            character
+            for character in range(NUM_CHARACTERS)
+            for _ in range(deck[character])
+        ]
+        self.rng.shuffle(cards)
+        return cards
+
+    def _shuffled(self, unseen, sizes, k):
+        """
+        Helper function for sample, deal k worlds from shuffled cards.
+        """
+        cards = self.deck_order(unseen)
+        shuffle = self.rng.shuffle
+        worlds = []
+        for _ in range(k):
+            shuffle(cards)
+            world = []
+            position = 0
+            for size in sizes:
+                world.append(tuple(sorted(cards[position : position + size])))
+                position += size
+            worlds.append(tuple(world))
+        return worlds
+
+    def _weighted(self, unseen, sizes, likelihoods):
+        """
+        Helper function for sample, the cumulative weights of the worlds
+        times the likelihood of every opponent's hand.
+        """
+        worlds, cumulative = self.worlds(unseen, sizes)
+        weights = self._cache[(tuple(unseen), tuple(sizes))][1]
+        combined = []
+        for world, weight in zip(worlds, weights):
+            for hand, likelihood in zip(world, likelihoods):
+                if likelihood is not None:
+                    weight *= likelihood.get(hand, 0.0)
+            combined.append(weight)
+        combined = list(accumulate(combined))
+        if combined[-1] <= 0.0:
+            # The likelihoods rule out every world, fall back to the deal.
+            return cumulative
+        return combined
+
+
+def _enumerate(unseen, sizes):
+    """
+    Helper function for DeterminizationSampler.worlds, every feasible world
+    and the number of ways to deal it.
+    """
+    worlds = []
+    weights = []
+    hands_by_size = {
+        size: list(combinations_with_replacement(range(NUM_CHARACTERS), size))
+        for size in set(sizes)
+    }
+
+    def deal(index, world, weight):
+        if index == len(sizes):
+            worlds.append(tuple(world))
+            weights.append(float(weight))
+            return
+        for hand in hands_by_size[sizes[index]]:
+            ways = 1
+            for character in set(hand):
+                ways *= comb(unseen[character], hand.count(character))
+                if not ways:
+                    break
+            if not ways:
+                continue
+            for character in hand:
+                unseen[character] -= 1
+            world.append(hand)
+            deal(index + 1, world, weight * ways)
+            world.pop()
+            for character in hand:
+                unseen[character] += 1
+
+    deal(0, [], 1)
+    return worlds, weights
+
+
+def _require(likelihood, size, character):
+    """
+    Likelihoods for a hand known to hold character, on top of likelihood.
+    """
+    required = {}
+    for hand in combinations_with_replacement(range(NUM_CHARACTERS), size):
+        if character in hand:
+            required[hand] = 1.0 if likelihood is None else likelihood.get(hand, 0.0)
+    return required
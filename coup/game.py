@@ -1,3 +1,4 @@
+from coup.action import RESPONSE_MASKS
 from coup.gamestate import GameState
 
 """
@@ -8,12 +9,14 @@ Game Class
 
     
     Methods:
-        __init__(players):
+        __init__(players, observers=None, deck=None, rng=None):
         reset():
             Resets the initial game state.
-        play():
+        play(): Player
             Iterate through the players calling handle_turn until the game is
-            over. 
+            over, then return the winner. Observers are notified at the start
+            of the game, at the end of every turn and when the game is over,
+            nothing is printed unless an observer does so.
         handle_turn():
             Get the active player's action, if the action has a cost this is
             where the player must pay it. If the player chooses an action which
@@ -28,24 +31,33 @@ Game Class
             Iterate through the players not including the acting_player, and
             check if any of them wish to make a counteraction. If so  return the
             counteraction and the player who played it otherwise return None,
-            None.
+            None. Players without a legal counteraction are not asked, and if
+            nothing can be played against the top of the action stack nobody
+            is.
 """
 
 
 class Game:
-    def __init__(self, players):
-        self.gamestate = GameState(players)
+    def __init__(self, players, observers=None, deck=None, rng=None):
+        self.gamestate = GameState(players, observers, deck, rng)
         self.reset()
 
     def reset(self):
         self.gamestate.reset()
 
     def play(self):
+        observers = self.gamestate.observers
+        for observer in observers:
+            observer.on_game_start(self.gamestate)
         while not self.gamestate.is_game_over():
             self.handle_turn()
             self.gamestate.next_turn()
+            for observer in observers:
+                observer.on_turn_end(self.gamestate)
         winner = self.gamestate.get_winner()
-        print(f"The winner is {winner.name}!")
+        for observer in observers:
+            observer.on_game_over(self.gamestate, winner)
+        return winner
 
     def handle_turn(self):
         """
@@ -85,11 +97,14 @@ class Game:
         Iterate through the players not including the acting_player, and
         check if any of them wish to make a counteraction. If so  return the
         counteraction and the player who played it otherwise return None,
-        None.
+        None. Players without a legal counteraction are not asked.
         """
-        for player in self.gamestate.players:
-            if player != acting_player:
-                counteraction = player.get_counteraction(self.gamestate)
+        gamestate = self.gamestate
+        if not RESPONSE_MASKS[gamestate.action_stack.peek().code]:
+            return None, None
+        for player in gamestate.players:
+            if player != acting_player and gamestate.legal_response_mask(player):
+                counteraction = player.get_counteraction(gamestate)
                 if counteraction:
                     return counteraction, player
         return None, None
@@ -1,6 +1,11 @@
+import random
+
 from coup.action_stack import ActionStack
-from coup.deck import Deck
+from coup.deck import CHARACTERS, CountedDeck, Deck
 from coup.action import *
+from coup import compact
+from coup.compact import action_target, action_type, iter_actions
+from coup.snapshot import DECK_CARDS, DECK_COUNTS, Snapshot
 
 """
 GameState Class
@@ -11,19 +16,27 @@ GameState Class
         - players: list of Player objects
         - player_turn_tracker: list of Player objects
         - action_stack: ActionStack
-        - deck: Deck
+        - deck: Deck or CountedDeck
+        - rng: RandomStream (see coup/rng.py), random.Random or the random
+          module (the default), the source of the strategies' random choices.
+        - observers: list of GameObserver objects
+        - turn_number: int
+        - zobrist: ZobristHash or None, kept up to date when attached (see
+          coup/zobrist.py).
     
     Methods:
-        __init__(self, players):
+        __init__(self, players, observers=None, deck=None, rng=None):
+            A new Deck drawing from rng is created unless one is given, a
+            given deck keeps its own rng.
         is_game_over(): bool
             Returns True if the number of players in the player_turn_tracker is
             less than or equal to 1.
         reset():
-            Reset the deck, set the player_turn_tracker equal to a copy of the
-            players list.
+            Reset the deck and the turn number, set the player_turn_tracker
+            equal to a copy of the players list.
             Iterate through the players, invoking the reset_player method on
-            each of them, and setting their hidden_influences to a list of 
-            two cards popped from the deck.
+            each of them, and setting their hidden_influences to a sorted
+            tuple of two cards drawn from the deck.
         get_active_player(): Player or None
             Return the first element of the player_turn_tracker, or none if the
             player_turn_tracker is empty.
@@ -35,24 +48,86 @@ GameState Class
         next_turn():
             Move the first player to the back of the player_turn_tracker, then
             iterate through the player_turn_tracker only keeping the players
-            who are still alive.
-        get_legal_actions(player): list(Action, Target or None)
-            Iterate through all of the actions, checking whether they are legal
-            for the active player. Return a list of tuples of the form (action,
-            target), where target is a different player or None. 
+            who are still alive. Increment the turn number.
+        get_legal_actions(player): list of Action
+            Build an Action object for every action that is legal for the
+            player, targeted actions are built once per legal target.
+        legal_action_mask(player): int
+            Bitmask of the compact action ids that are legal for the player.
+            Search strategies should use this and only build the action they
+            choose with build_action.
+        legal_response_mask(player): int
+            Bitmask of the compact action ids of the counteractions the player
+            can make against the top of the action stack.
+        get_legal_responses(player): list of Action
+        build_action(action_id, player): Action
+        get_action_id(action): int
         draw_card(): Influence
         return_card_to_deck(card):
         play(action):
-            Add the action to the action_stack.
+            Add the action to the action_stack and notify the observers.
+        apply(action): tuple
+            Make a move for tree search: push the action onto the action stack,
+            paying its cost if it is the turn's action, without notifying the
+            observers. A player who cannot pay the cost is disqualified, as in
+            Game.handle_turn. Returns an undo record.
+        apply_resolution(): tuple
+            Resolve the action stack and move on to the next turn, returning
+            an undo record.
+        undo(record):
+            Take back the move that returned record, restoring exactly the
+            previous coins, hidden and revealed influences, deck, turn order
+            and action stack. Moves must be undone in reverse order.
+
+        snapshot(): Snapshot
+            Copy the mutable core of the game state (coins, influences, deck,
+            turn order and action stack) into a compact, picklable Snapshot.
+        restore(snapshot):
+            Put the game state back to a snapshot, which may have been taken
+            from another GameState with the same number of players and the
+            same kind of deck (Deck or CountedDeck), else ValueError is
+            raised and the game state is left unchanged.
+        to_compact(phase=PHASE_ACTION, to_move=None, tasks=()): tuple
+            The state as a coup/compact.py state tuple, at a decision of
+            to_move (by default the active player). tasks lists the
+            (kind, player, argument) work still pending in the middle of
+            resolving the action stack, e.g. ((TASK_LOSE, player, 0),) when a
+            player is about to lose an influence.
+
+    Undo records are small tuples: hands are immutable tuples and actions are
+    never modified apart from their succeeds flag, so a record holds
+    references to them rather than copies. A resolution can only change the
+    players on the action stack (users and targets), the turn order and, if
+    an Exchange or a Challenge is on the stack, the deck, so its record holds
+    the previous values of those alone: the coins and hands of at most three
+    players, the turn order, the stack and a tuple of at most fifteen cards
+    (or five counts for a CountedDeck) when the deck is involved.
 """
 
+APPLY_PLAY = 0
+APPLY_RESOLUTION = 1
+
+# Only a resolved Exchange or Challenge (through the challenged player's
+# replacement card) draws from or returns to the deck.
+DECK_ACTIONS = (1 << Exchange.code) | (1 << Challenge.code)
+UNTARGETED_ACTIONS = (
+    (1 << Income.code)
+    | (1 << ForeignAid.code)
+    | (1 << Tax.code)
+    | (1 << Exchange.code)
+)
+
 
 class GameState:
-    def __init__(self, players):
+    def __init__(self, players, observers=None, deck=None, rng=None):
         self.players = players
         self.player_turn_tracker = players[:]
         self.action_stack = ActionStack()
-        self.deck = Deck()
+        self.rng = rng if rng is not None else random
+        self.deck = deck if deck is not None else Deck(self.rng)
+        self.observers = list(observers) if observers else []
+        self.turn_number = 0
+        self.zobrist = None
         self.reset()
 
     def is_game_over(self):
@@ -60,10 +135,12 @@ class GameState:
 
     def reset(self):
         self.deck.reset()
+        self.turn_number = 0
         self.player_turn_tracker = self.players[:]
         for player in self.players:
             player.reset_player()
-            player.hidden_influences = self.deck.draw_cards(2)
+            player.hidden_influences = tuple(sorted(self.deck.draw_cards(2)))
+        self._refresh_zobrist()
 
     def get_active_player(self):
         if not self.is_game_over():
@@ -83,36 +160,83 @@ class GameState:
         self.player_turn_tracker = [
             player for player in self.player_turn_tracker if player.is_alive()
         ]
+        self.turn_number += 1
 
     def get_legal_actions(self, player):
-        actions_with_targets = [Assassinate, Coup, Steal]
-        actions_without_targets = [
-            Tax,
-            Exchange,
-            BlockAssassination,
-            BlockForeignAid,
-            BlockStealingAmbassador,
-            BlockStealingCaptain,
-            Income,
-            ForeignAid,
-            Challenge,
+        return [
+            self.build_action(action_id, player)
+            for action_id in iter_actions(self.legal_action_mask(player))
         ]
-        opposing_players = [p for p in self.players if p != player]
-        legal_actions = [
-            action(player)
-            for action in actions_without_targets
-            if action.is_legal(self, player)
+
+    def legal_action_mask(self, player):
+        """
+        Return the legal actions of the player as a bitmask of compact action
+        ids (see coup/compact.py), computed from the coins, which players are
+        alive and the top of the action stack. It agrees with the is_legal
+        methods of the action classes, without building any Action objects.
+        """
+        if not player.is_alive():
+            return 0
+        mask = 0
+        top = self.action_stack.peek()
+        if player is self.get_active_player():
+            coins = player.coins
+            if coins < 10:
+                mask = UNTARGETED_ACTIONS
+            for seat, target in enumerate(self.players):
+                if target is player or not target.is_alive():
+                    continue
+                if coins >= 7:
+                    mask |= 1 << (Coup.code + seat)
+                if coins < 10:
+                    if coins >= 3:
+                        mask |= 1 << (Assassinate.code + seat)
+                    if target.coins > 0:
+                        mask |= 1 << (Steal.code + seat)
+        if top is not None:
+            mask |= self.legal_response_mask(player)
+        return mask
+
+    def legal_response_mask(self, player):
+        """
+        Return the bitmask of the counteractions the player can make against
+        the top of the action stack, looked up in RESPONSE_MASKS by the type
+        of the pending action.
+        """
+        top = self.action_stack.peek()
+        if top is None or top.user is player or not player.is_alive():
+            return 0
+        mask = RESPONSE_MASKS[top.code]
+        if mask & BLOCK_MASK:
+            if player is self.get_active_player():
+                mask &= ~BLOCK_MASK
+            elif top.code == Assassinate.code and top.target is not player:
+                mask &= ~(1 << BlockAssassination.code)
+        return mask
+
+    def get_legal_responses(self, player):
+        return [
+            self.build_action(action_id, player)
+            for action_id in iter_actions(self.legal_response_mask(player))
         ]
-        for target in opposing_players:
-            legal_actions.extend(
-                [
-                    action(player, target)
-                    for action in actions_with_targets
-                    if action.is_legal(self, player, target)
-                ]
-            )
 
-        return legal_actions
+    def build_action(self, action_id, player):
+        """
+        Build the Action object for a compact action id chosen by player.
+        """
+        action = ACTION_CLASSES[action_type(action_id)]
+        if action.has_target:
+            return action(player, self.players[action_target(action_id)])
+        return action(player)
+
+    def get_action_id(self, action):
+        """
+        Return the compact action id of an Action object, the inverse of
+        build_action.
+        """
+        if action.has_target:
+            return action.code + self.players.index(action.target)
+        return action.code
 
     def draw_card(self):
         return self.deck.draw_card()
@@ -122,8 +246,196 @@ class GameState:
 
     def play(self, action):
         self.action_stack.push(action)
+        if self.zobrist is not None:
+            self.zobrist.refresh(action.user)
+        for observer in self.observers:
+            observer.on_action(self, action)
 
     def get_winner(self):
         if len(self.player_turn_tracker) == 1:
             return self.player_turn_tracker[0]
         return None
+
+    def apply(self, action):
+        paid = 0
+        hands = None
+        if action.cost and self.action_stack.is_empty():
+            user = action.user
+            if user.pay_cost(action.cost):
+                paid = action.cost
+            else:
+                # Like Game.handle_turn, a player who cannot pay is out.
+                hands = user.hidden_influences, user.revealed_influences
+                user.disqualify()
+        self.action_stack.push(action)
+        if self.zobrist is not None:
+            self.zobrist.refresh(action.user)
+        return APPLY_PLAY, action, paid, hands
+
+    def apply_resolution(self):
+        actions = self.action_stack.actions
+        players = []
+        uses_deck = False
+        for action in actions:
+            uses_deck = uses_deck or (1 << action.code) & DECK_ACTIONS
+            for player in (action.user, action.target):
+                if player is not None and player not in players:
+                    players.append(player)
+        record = (
+            APPLY_RESOLUTION,
+            self.turn_number,
+            tuple(self.player_turn_tracker),
+            tuple(
+                (
+                    player,
+                    player.coins,
+                    player.hidden_influences,
+                    player.revealed_influences,
+                )
+                for player in players
+            ),
+            self.deck.get_state() if uses_deck else None,
+            tuple((action, action.succeeds) for action in actions),
+        )
+        self.resolve_action_stack()
+        self.next_turn()
+        return record
+
+    def undo(self, record):
+        zobrist = self.zobrist
+        if record[0] == APPLY_PLAY:
+            _, action, paid, hands = record
+            self.action_stack.pop()
+            user = action.user
+            user.coins += paid
+            if hands is not None:
+                user.hidden_influences, user.revealed_influences = hands
+            if zobrist is not None:
+                zobrist.refresh(user)
+            return
+        _, turn_number, tracker, player_states, deck_state, stack = record
+        self.turn_number = turn_number
+        self.player_turn_tracker = list(tracker)
+        for player, coins, hidden, revealed in player_states:
+            player.coins = coins
+            player.hidden_influences = hidden
+            player.revealed_influences = revealed
+            if zobrist is not None:
+                zobrist.refresh(player)
+        if deck_state is not None:
+            self.deck.set_state(deck_state)
+        self.action_stack.actions = [action for action, _ in stack]
+        for action, succeeds in stack:
+            action.succeeds = succeeds
+
+    def snapshot(self):
+        seats = {player: seat for seat, player in enumerate(self.players)}
+        data = [self.turn_number, len(self.player_turn_tracker)]
+        data.extend(seats[player] for player in self.player_turn_tracker)
+        for player in self.players:
+            data.append(player.coins)
+            data.append(len(player.hidden_influences))
+            data.extend(player.hidden_influences)
+            data.append(len(player.revealed_influences))
+            data.extend(player.revealed_influences)
+        deck_state = self.deck.get_state()
+        data.append(DECK_COUNTS if isinstance(self.deck, CountedDeck) else DECK_CARDS)
+        data.append(len(deck_state))
+        data.extend(deck_state)
+        data.append(len(self.action_stack.actions))
+        for action in self.action_stack.actions:
+            data.append(self.get_action_id(action))
+            data.append(seats[action.user])
+            data.append(int(action.succeeds))
+        return Snapshot(data)
+
+    def restore(self, snapshot):
+        data = snapshot.data
+        position = 2 + data[1]
+        tracker = [self.players[seat] for seat in data[2:position]]
+        player_states = []
+        for _ in self.players:
+            coins = data[position]
+            count = data[position + 1]
+            position += 2 + count
+            hidden = tuple(
+                CHARACTERS[character] for character in data[position - count : position]
+            )
+            count = data[position]
+            position += 1 + count
+            revealed = tuple(
+                CHARACTERS[character] for character in data[position - count : position]
+            )
+            player_states.append((coins, hidden, revealed))
+        deck_kind, count = data[position], data[position + 1]
+        expected = DECK_COUNTS if isinstance(self.deck, CountedDeck) else DECK_CARDS
+        if deck_kind != expected:
+            raise ValueError(
+                "the snapshot was taken with a "
+                + ("CountedDeck" if deck_kind == DECK_COUNTS else "Deck")
+                + ", it cannot be restored into a "
+                + type(self.deck).__name__
+            )
+        position += 2 + count
+        deck_state = data[position - count : position]
+        if deck_kind == DECK_CARDS:
+            deck_state = [CHARACTERS[character] for character in deck_state]
+        self.turn_number = data[0]
+        self.player_turn_tracker = tracker
+        for player, (coins, hidden, revealed) in zip(self.players, player_states):
+            player.coins = coins
+            player.hidden_influences = hidden
+            player.revealed_influences = revealed
+        self.deck.set_state(deck_state)
+        actions = []
+        for _ in range(data[position]):
+            action_id, seat, succeeds = data[position + 1 : position + 4]
+            action = self.build_action(action_id, self.players[seat])
+            action.succeeds = bool(succeeds)
+            actions.append(action)
+            position += 3
+        self.action_stack.actions = actions
+        self._refresh_zobrist()
+
+    def _refresh_zobrist(self):
+        """
+        Helper function for reset and restore, recompute the Zobrist
+        hash of every player after the whole state has been replaced.
+        """
+        if self.zobrist is not None:
+            self.zobrist.refresh_all()
+
+    def to_compact(self, phase=compact.PHASE_ACTION, to_move=None, tasks=()):
+        seats = {player: seat for seat, player in enumerate(self.players)}
+        s = [0] * compact.STATE_SIZE
+        s[compact.NUM_PLAYERS] = len(self.players)
+        active = self.get_active_player()
+        if active is None:
+            phase = compact.PHASE_GAME_OVER
+        else:
+            s[compact.ACTIVE] = seats[active]
+        s[compact.PHASE] = phase
+        if phase == compact.PHASE_GAME_OVER or phase == compact.PHASE_DRAW:
+            s[compact.TO_MOVE] = -1
+        else:
+            s[compact.TO_MOVE] = seats[to_move if to_move is not None else active]
+        s[compact.TURN] = self.turn_number
+        s[compact.STACK_SIZE] = len(self.action_stack.actions)
+        for depth, action in enumerate(self.action_stack.actions):
+            entry = compact.STACK + 3 * depth
+            s[entry] = self.get_action_id(action)
+            s[entry + 1] = seats[action.user]
+            s[entry + 2] = int(action.succeeds)
+        s[compact.TASK_COUNT] = len(tasks)
+        for index, (kind, player, argument) in enumerate(tasks):
+            task = compact.TASKS + 3 * index
+            s[task : task + 3] = kind, seats[player], argument
+        for seat, player in enumerate(self.players):
+            s[compact.COINS + seat] = player.coins
+            for character in player.hidden_influences:
+                s[compact.HIDDEN + seat * compact.NUM_CHARACTERS + character] += 1
+            for character in player.revealed_influences:
+                s[compact.REVEALED + seat * compact.NUM_CHARACTERS + character] += 1
+        deck = self.deck.composition()
+        s[compact.DECK : compact.DECK + compact.NUM_CHARACTERS] = deck
+        return tuple(s)
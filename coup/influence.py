@@ -1,63 +1,47 @@
-"""
-Duke:
-    name: Duke
-"""
-
-
-class Duke:
-    name = "Duke"
-
-    def __str__(self):
-        return "Duke"
-
-
-"""
-Assassin:
-    name: Assassin
-"""
-
+from enum import IntEnum
 
-class Assassin:
-    name = "Assassin"
-
-    def __str__(self):
-        return "Assassin"
-
-
-"""
-Captain:
-    name: Captain
 """
+Character Enum
 
+    The five characters of the Court. Every influence card is one of these
+    interned members, so cards are never instantiated, comparing or hashing
+    them is an integer operation and a hand can be stored as a sorted tuple
+    of characters, usable as a dict key.
 
-class Captain:
-    name = "Captain"
+    Values:
+        DUKE: 0
+        ASSASSIN: 1
+        CAPTAIN: 2
+        AMBASSADOR: 3
+        CONTESSA: 4
 
-    def __str__(self):
-        return "Captain"
+    The values match the character codes of coup.compact.
 
-
-"""
-Ambassador:
-    name: Ambassador
+    Methods:
+        __str__():
+            Returns the character's name, e.g. "Duke".
 """
 
 
-class Ambassador:
-    name = "Ambassador"
+class Character(IntEnum):
+    DUKE = 0
+    ASSASSIN = 1
+    CAPTAIN = 2
+    AMBASSADOR = 3
+    CONTESSA = 4
 
     def __str__(self):
-        return "Ambassador"
+        return self.name.capitalize()
 
 
 """
-Contessa:
-    name: Contessa
+Duke, Assassin, Captain, Ambassador, Contessa:
+    Aliases for the Character members, used as the influence cards and as the
+    requirements of the actions.
 """
 
-
-class Contessa:
-    name = "Contessa"
-
-    def __str__(self):
-        return "Contessa"
+Duke = Character.DUKE
+Assassin = Character.ASSASSIN
+Captain = Character.CAPTAIN
+Ambassador = Character.AMBASSADOR
+Contessa = Character.CONTESSA
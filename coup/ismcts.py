@@ -0,0 +1,318 @@
+import math
+import random
+from time import perf_counter
+
+from coup.compact import (
+    ACTIVE,
+    DECK,
+    DRAW,
+    HIDDEN,
+    NUM_CHARACTERS,
+    NUM_PLAYERS,
+    PASS,
+    PHASE,
+    PHASE_ACTION,
+    PHASE_DRAW,
+    PHASE_GAME_OVER,
+    PHASE_RESPONSE,
+    PHASE_RETURN,
+    REVEALED,
+    TASKS,
+    TO_MOVE,
+    TURN,
+    iter_actions,
+    legal_actions,
+    num_influences,
+    step,
+    winner,
+)
+from coup.determinize import DeterminizationSampler
+from coup.strategy import CompactStrategy
+
+"""
+Information Set Monte Carlo Tree Search Strategy Class
+
+    A strategy that chooses every decision by single observer ISMCTS over the
+    compact game core (see coup/compact.py). Each iteration deals the cards
+    the player cannot see (the opponents' hands and the deck) at random,
+    consistently with everything that has been revealed and, if the strategy
+    has a BeliefState, weighted by its likelihoods (see coup/determinize.py),
+    and then walks one tree shared by all these determinizations:
+
+        - Edges are the actions the player can observe. Opponents' exchange
+          returns and the cards drawn by opponents are hidden moves, they all
+          lead to a single child, so the tree is a tree of the player's
+          information sets.
+        - A child is chosen by UCB1, using how often it was available rather
+          than how often its parent was visited, since different
+          determinizations allow different moves.
+        - Below the tree the game is played out at random (responding with
+          probability 1 - pass_rate), for at most rollout_depth moves after
+          which each live player scores their share of the influences left.
+          With a 2-player endgame Tablebase (see coup/solver/endgame.py) the
+          playout stops at the first turn it covers and scores its value.
+
+    Trees are kept for the rest of the turn: every node at which the player
+    is to move is indexed by its information set, so the search of a later
+    decision in the same turn (a response to a block, the influence lost to
+    a challenge, the cards returned from an Exchange) starts from the
+    statistics gathered while searching the earlier ones.
+
+    Fields:
+        iterations: int, iterations per decision.
+        time_limit: float or None, seconds per decision. When set the search
+            stops at whichever of the two budgets runs out first.
+        exploration: float, the UCB1 exploration constant.
+        rollout_depth: int
+        pass_rate: float
+        tablebase: Tablebase or None
+        belief: BeliefState or None, attached to the game as an observer.
+        rng: random.Random
+
+    The strategy methods come from CompactStrategy (see coup/strategy.py).
+
+    Methods:
+        search(gamestate, state, seat, known=()): int
+            Search from a compact state in which seat is to move and return
+            the action id with the most visits. known lists (seat, character)
+            pairs of cards other players are known to hold.
+
+    info_key(state, seat): tuple
+        The part of a compact state that seat can observe.
+"""
+
+
+class ISMCTSStrategy(CompactStrategy):
+    def __init__(
+        self,
+        iterations=1000,
+        time_limit=None,
+        exploration=0.7,
+        rollout_depth=40,
+        pass_rate=0.8,
+        seed=None,
+        tablebase=None,
+        belief=None,
+    ):
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.pass_rate = pass_rate
+        self.tablebase = tablebase
+        self.belief = belief
+        self.rng = random.Random(seed)
+        self.sampler = DeterminizationSampler(self.rng)
+        self._turn = None
+        self._nodes = {}
+
+    def choose_action_id(self, gamestate, state, seat, known):
+        return self.search(gamestate, state, seat, known)
+
+    def search(self, gamestate, state, seat, known=()):
+        moves = list(iter_actions(legal_actions(state)))
+        if len(moves) == 1:
+            return moves[0]
+        turn = (id(gamestate), state[TURN])
+        if turn != self._turn:
+            self._turn = turn
+            self._nodes = {}
+        root = self._nodes.get(info_key(state, seat))
+        if root is None:
+            root = self._nodes[info_key(state, seat)] = Node(-1)
+        likelihoods = None
+        if self.belief is not None:
+            likelihoods = {
+                gamestate.players.index(player): weights
+                for player, weights in self.belief.likelihoods.items()
+            }
+        deadline = None
+        if self.time_limit is not None:
+            deadline = perf_counter() + self.time_limit
+        remaining = self.iterations
+        while remaining > 0:
+            batch = min(remaining, BATCH_SIZE)
+            worlds = self.sampler.sample_states(state, seat, batch, known, likelihoods)
+            for world in worlds:
+                self._iterate(root, world, seat)
+            remaining -= batch
+            if deadline is not None and perf_counter() > deadline:
+                break
+        children = root.children
+        return max(
+            moves,
+            key=lambda move: children[move].visits if move in children else -1,
+        )
+
+    def _iterate(self, node, state, seat):
+        """
+        Helper function for search, run one iteration from node on the
+        determinized state: select down the tree, add one node, play out the
+        rest of the game and back the result up the path.
+        """
+        rng = self.rng
+        exploration = self.exploration
+        path = [node]
+        while True:
+            phase = state[PHASE]
+            if phase == PHASE_GAME_OVER:
+                break
+            if phase == PHASE_DRAW:
+                move = _draw(state, rng)
+                key = move if state[TASKS + 1] == seat else HIDDEN_MOVE
+            elif phase == PHASE_RETURN and state[TO_MOVE] != seat:
+                move = rng.choice(list(iter_actions(legal_actions(state))))
+                key = HIDDEN_MOVE
+            else:
+                children = node.children
+                untried = []
+                best = None
+                best_score = -1.0
+                for move in iter_actions(legal_actions(state)):
+                    child = children.get(move)
+                    if child is None:
+                        untried.append(move)
+                        continue
+                    child.available += 1
+                    if untried:
+                        continue
+                    score = child.reward / child.visits + exploration * math.sqrt(
+                        math.log(child.available) / child.visits
+                    )
+                    if score > best_score:
+                        best, best_score = move, score
+                if untried:
+                    move = rng.choice(untried)
+                    child = children[move] = Node(state[TO_MOVE])
+                    child.available = 1
+                    path.append(child)
+                    state = step(state, move)
+                    self._index(child, state, seat)
+                    break
+                node = children[best]
+                path.append(node)
+                state = step(state, best)
+                continue
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = Node(-1)
+                state = step(state, move)
+                self._index(child, state, seat)
+            else:
+                state = step(state, move)
+            node = child
+            path.append(node)
+
+        result = self._rollout(state)
+        for node in path:
+            node.visits += 1
+            if node.mover >= 0:
+                node.reward += result[node.mover]
+
+    def _index(self, node, state, seat):
+        """
+        Helper function for _iterate, remember a new node at which seat is to
+        move later in the current turn.
+        """
+        if (
+            state[TO_MOVE] == seat
+            and state[PHASE] != PHASE_ACTION
+            and state[TURN] == self._turn[1]
+        ):
+            self._nodes.setdefault(info_key(state, seat), node)
+
+    def _rollout(self, state):
+        """
+        Helper function for _iterate, play the state out at random and return
+        the score of each seat.
+        """
+        rng = self.rng
+        pass_rate = self.pass_rate
+        tablebase = self.tablebase
+        for _ in range(self.rollout_depth):
+            phase = state[PHASE]
+            if phase == PHASE_GAME_OVER:
+                break
+            if phase == PHASE_ACTION and tablebase is not None:
+                probe = tablebase.probe(state)
+                if probe is not None:
+                    value = probe[0]
+                    if state[ACTIVE]:
+                        return [1.0 - value, value]
+                    return [value, 1.0 - value]
+            if phase == PHASE_DRAW:
+                move = _draw(state, rng)
+            elif phase == PHASE_RESPONSE and rng.random() < pass_rate:
+                move = PASS
+            else:
+                move = rng.choice(list(iter_actions(legal_actions(state))))
+            state = step(state, move)
+        return evaluate(state)
+
+
+"""
+Node Class
+
+    A node of the ISMCTS tree.
+
+    Fields:
+        mover: int, the seat whose move led to the node (-1 for hidden moves,
+            chance nodes and the root).
+        visits: int
+        reward: float, the total score of mover over the visits.
+        available: int, the number of visits to the parent in which the move
+            was legal.
+        children: dict of action id (or HIDDEN_MOVE) to Node
+"""
+
+HIDDEN_MOVE = -1
+# Iterations per batch of determinizations, the time limit is checked between
+# batches.
+BATCH_SIZE = 64
+
+
+class Node:
+    __slots__ = ("mover", "visits", "reward", "available", "children")
+
+    def __init__(self, mover):
+        self.mover = mover
+        self.visits = 0
+        self.reward = 0.0
+        self.available = 0
+        self.children = {}
+
+
+def info_key(state, seat):
+    start = HIDDEN + seat * NUM_CHARACTERS
+    return (
+        (seat,)
+        + state[:HIDDEN]
+        + state[start : start + NUM_CHARACTERS]
+        + tuple(num_influences(state, other) for other in range(state[NUM_PLAYERS]))
+        + state[REVEALED:DECK]
+    )
+
+
+def evaluate(state):
+    """
+    Score each seat of a state: 1 for the winner of a finished game, otherwise
+    each seat's share of the influences left in play.
+    """
+    num_players = state[NUM_PLAYERS]
+    if state[PHASE] == PHASE_GAME_OVER:
+        won = winner(state)
+        return [1.0 if seat == won else 0.0 for seat in range(num_players)]
+    influences = [num_influences(state, seat) for seat in range(num_players)]
+    total = sum(influences)
+    return [count / total for count in influences]
+
+
+def _draw(state, rng):
+    """
+    Draw a card at a chance node, weighted by the copies left in the deck.
+    """
+    remaining = rng.randrange(sum(state[DECK : DECK + NUM_CHARACTERS]))
+    for character in range(NUM_CHARACTERS):
+        remaining -= state[DECK + character]
+        if remaining < 0:
+            return DRAW + character
@@ -0,0 +1,220 @@
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from coup.simulate import game_seed, run_games
+
+"""
+Strategy league.
+
+    Ranks a pool of strategies by playing them against each other in
+    multi-player games and keeping an Elo-scale rating for each, saved to a JSON
+    file between runs.
+
+    schedule(names, seats): list of tuple of str
+        Every seating of the league: each combination of seats strategies,
+        once in each of its seat rotations (so every strategy of a combination
+        plays from every seat, in the same order around the table).
+
+    A multi-player game is rated as the pairwise results between its
+    players: the placement of a player is given by the order of the
+    eliminations (the winner first, the last player knocked out second, ...)
+    and every player has beaten each player placed below them. The league
+    keeps the pairwise win counts and after every match (the games of one
+    seating) refits Bradley-Terry strengths to all of them, starting from
+    the previous fit, by minorization-maximization; the ratings are the
+    strengths on the Elo scale (a 400 point gap is 10 to 1 odds), with a mean
+    of INITIAL_RATING. Unlike sequential Elo updates the ratings do not
+    depend on the order in which games were played, and every pair of
+    strategies that has met is given one virtual win each way, so a strategy
+    that never won still has a finite rating.
+
+    The games of a seating are seeded from the seed of the league and the
+    combination, not the rotation (see coup.simulate.game_seed), so every
+    rotation of a combination is dealt the same cards.
+"""
+
+INITIAL_RATING = 1500.0
+
+
+def schedule(names, seats):
+    seatings = []
+    for combination in combinations(sorted(names), seats):
+        for rotation in range(seats):
+            seatings.append(combination[rotation:] + combination[:rotation])
+    return seatings
+
+
+"""
+League Class
+
+    Fields:
+        seed: int
+        ratings: dict of str to float
+        games: dict of str to int, the number of games each strategy played.
+        wins: dict of str to dict of str to int, wins[a][b] is the number of
+            games in which a was placed above b.
+        played: set of str, the seatings already played (the names joined by
+            "|"), which later runs skip.
+
+    Methods:
+        run(pool, seats=3, games=100, workers=1): int
+            Play every seating of the strategies in pool (a dict of name to
+            strategy) that has not been played yet, games games each, and
+            update the ratings after each one. Return the number of matches
+            played. Adding a strategy to the pool and running again only plays
+            the seatings it is part of.
+        update(seating, placements):
+            Add the games of one seating, placements holds one tuple of
+            seats per game, from the winner to the first player knocked out,
+            and refit the ratings. A game that ended without a winner (see
+            _play_match) is an empty tuple: it counts towards the games of
+            every strategy of the seating but not towards any win count.
+        fit(iterations=100, tolerance=1e-6):
+            Refit the ratings to the win counts.
+        standings(): list of (str, float, int)
+            (name, rating, games) from the highest rating down.
+        save(path):
+        load(path): League
+            @staticmethod, a new league if the file does not exist.
+"""
+
+
+class League:
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.ratings = {}
+        self.games = {}
+        self.wins = {}
+        self.played = set()
+
+    def run(self, pool, seats=3, games=100, workers=1):
+        matches = [
+            seating
+            for seating in schedule(pool, seats)
+            if "|".join(seating) not in self.played
+        ]
+        tasks = [
+            (
+                tuple(pool[name] for name in seating),
+                game_seed(self.seed, _combination_key(seating)),
+                games,
+            )
+            for seating in matches
+        ]
+        if workers is not None and workers <= 1:
+            placements = map(_play_match, tasks)
+            for seating, match in zip(matches, placements):
+                self.update(seating, match)
+            return len(matches)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for seating, match in zip(matches, executor.map(_play_match, tasks)):
+                self.update(seating, match)
+        return len(matches)
+
+    def update(self, seating, placements):
+        for name in seating:
+            self.ratings.setdefault(name, INITIAL_RATING)
+            self.games[name] = self.games.get(name, 0) + len(placements)
+            wins = self.wins.setdefault(name, {})
+            for other in seating:
+                if other != name:
+                    wins.setdefault(other, 0)
+        for placement in placements:
+            for position, seat in enumerate(placement):
+                wins = self.wins[seating[seat]]
+                for other in placement[position + 1 :]:
+                    wins[seating[other]] += 1
+        self.played.add("|".join(seating))
+        self.fit()
+
+    def fit(self, iterations=100, tolerance=1e-6):
+        names = list(self.wins)
+        if not names:
+            return
+        strengths = {
+            name: 10 ** ((self.ratings[name] - INITIAL_RATING) / 400) for name in names
+        }
+        for _ in range(iterations):
+            change = 0.0
+            for name in names:
+                won = 0.0
+                weight = 0.0
+                for other, count in self.wins[name].items():
+                    # One virtual win each way for every pair that has met.
+                    games = count + self.wins[other][name] + 2
+                    won += count + 1
+                    weight += games / (strengths[name] + strengths[other])
+                strength = won / weight
+                change = max(change, abs(strength / strengths[name] - 1))
+                strengths[name] = strength
+            # Fix the scale, the geometric mean strength is 1.
+            mean = sum(math.log10(strength) for strength in strengths.values())
+            mean /= len(names)
+            for name in names:
+                strengths[name] /= 10**mean
+            if change < tolerance:
+                break
+        for name in names:
+            self.ratings[name] = INITIAL_RATING + 400 * math.log10(strengths[name])
+
+    def standings(self):
+        return sorted(
+            ((name, rating, self.games[name]) for name, rating in self.ratings.items()),
+            key=lambda standing: -standing[1],
+        )
+
+    def save(self, path):
+        data = {
+            "seed": self.seed,
+            "ratings": self.ratings,
+            "games": self.games,
+            "wins": self.wins,
+            "played": sorted(self.played),
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return League()
+        with open(path) as f:
+            data = json.load(f)
+        league = League(data["seed"])
+        league.ratings = data["ratings"]
+        league.games = data["games"]
+        league.wins = data["wins"]
+        league.played = set(data["played"])
+        return league
+
+
+def _combination_key(seating):
+    """
+    Helper function for League.run, a number identifying the combination of
+    a seating whatever its rotation.
+    """
+    key = 0
+    for character in "|".join(sorted(seating)).encode():
+        key = (key * 131 + character) & 0xFFFFFFFF
+    return key
+
+
+def _play_match(task):
+    """
+    Play the games of one seating, return the placements of every game.
+    A game without a winner (e.g. every remaining player was disqualified)
+    places nobody above anybody else and is returned as an empty tuple.
+    """
+    strategies, seed, games = task
+    placements = []
+    for result in run_games(strategies, games, seed):
+        if result.winner is None:
+            placements.append(())
+            continue
+        order = [seat for seat, _ in result.eliminations]
+        order.reverse()
+        placements.append((result.winner,) + tuple(order))
+    return placements
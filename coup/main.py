@@ -1,5 +1,6 @@
 from coup.player import Player
 from coup.game import Game
+from coup.observer import PrintObserver
 from coup.strategy import HonestStrategy, ManualInputStrategy
 
 
@@ -11,7 +12,7 @@ def main():
         Player("Honest Player 2", honest_strategy),
         Player("Honest Player 3", honest_strategy),
     ]
-    new_game = Game(players)
+    new_game = Game(players, observers=[PrintObserver()])
     new_game.play()
 
 
@@ -0,0 +1,88 @@
+"""
+Game Observer Class
+
+    Base class for objects that want to be told about the progress of a game.
+    Every hook is a no-op, so observers only override the events they care
+    about. The engine only calls the hooks when at least one observer is
+    attached to the GameState, so headless games do no extra work.
+
+    Methods:
+        on_game_start(gamestate):
+            Called once the players have been dealt their influences.
+        on_action(gamestate, action):
+            Called whenever an action or counteraction is played onto the
+            action stack.
+        on_influence_lost(gamestate, player, influence):
+            Called when a player reveals an influence.
+        on_challenge(gamestate, challenge, challenged_action, held):
+            Called when a challenge resolves, before any influence is lost.
+            held is True if the challenged player had the character claimed.
+        on_cards_drawn(gamestate, player, cards):
+            Called when a player draws cards from the Court deck during the
+            game: the replacement for a proven influence, or the two cards of
+            an Exchange before any are returned.
+        on_influence_replaced(gamestate, player, influence):
+            Called when a player who won a challenge has shuffled the proven
+            influence back into the deck and drawn a replacement.
+        on_exchange(gamestate, player):
+            Called once a player has finished an Exchange.
+        on_turn_end(gamestate):
+            Called after a turn has been resolved and the turn order has been
+            advanced.
+        on_game_over(gamestate, winner):
+            Called once the game has finished.
+"""
+
+
+class GameObserver:
+    def on_game_start(self, gamestate):
+        pass
+
+    def on_action(self, gamestate, action):
+        pass
+
+    def on_influence_lost(self, gamestate, player, influence):
+        pass
+
+    def on_challenge(self, gamestate, challenge, challenged_action, held):
+        pass
+
+    def on_cards_drawn(self, gamestate, player, cards):
+        pass
+
+    def on_influence_replaced(self, gamestate, player, influence):
+        pass
+
+    def on_exchange(self, gamestate, player):
+        pass
+
+    def on_turn_end(self, gamestate):
+        pass
+
+    def on_game_over(self, gamestate, winner):
+        pass
+
+
+"""
+Print Observer Class
+
+    Prints the progress of a game to the console, this is what an interactive
+    game (see coup/main.py) uses to report the actions taken and the winner.
+
+    Methods:
+        on_action(gamestate, action):
+            Print the action that was played.
+        on_game_over(gamestate, winner):
+            Print the name of the winner, if there is one.
+"""
+
+
+class PrintObserver(GameObserver):
+    def on_action(self, gamestate, action):
+        action.print_action()
+
+    def on_game_over(self, gamestate, winner):
+        if winner is None:
+            print("The game ended without a winner.")
+        else:
+            print(f"The winner is {winner.name}!")
@@ -0,0 +1,167 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from coup.parametric import PARAMETERS, ParametricStrategy
+from coup.simulate import run_paired_games
+
+"""
+Evolutionary search over ParametricStrategy.
+
+    evolve(opponents, generations=20, population=16, parents=4, sigma=0.15,
+           blocks=4, block_size=100, seed=0, workers=1, cache=None,
+           start=None): (list of float, float, list of float)
+        A (parents + population) evolution strategy over the parameter
+        vectors of ParametricStrategy (see coup/parametric.py). Every
+        generation, population children are made by taking a random parent,
+        averaging it with a second one with probability 1/2 and adding normal
+        noise of sigma times the range of each parameter; the parents of the
+        next generation are the best of the parents and children. start is
+        the first parent (the defaults, i.e. HonestStrategy, if None).
+        Returns the best vector, its fitness and the best fitness of each
+        generation.
+
+    The fitness of a vector is its win rate against the opponents (a list of
+    strategies, one per other seat) over the deals of blocks seed blocks of
+    block_size deals each, played with common random numbers in every seating
+    (see coup.simulate.run_paired_games), so every candidate is scored on the
+    same deals and a small difference in fitness is a real one. The
+    candidates of a generation are scored by a pool of worker processes, one
+    task per (vector, block), and the (wins, games) of every block played are
+    kept for the rest of the search, so no vector is ever played twice on the
+    same block: surviving parents, and vectors rounded to the same values,
+    cost nothing. With a cache (a MatchupCache, see coup/cache.py) the blocks
+    are also looked up in it before being played and stored in it after, so
+    later searches against the same opponents reuse them.
+
+    fitness(vector, opponents, seed, blocks, block_size, cache=None,
+            executor=None): float
+        Score one vector, through the cache if there is one.
+"""
+
+# The kind of the MatchupCache entries, the (wins, games) of the first
+# strategy over a block of paired deals.
+CACHE_KIND = "evolve-block"
+
+
+def evolve(
+    opponents,
+    generations=20,
+    population=16,
+    parents=4,
+    sigma=0.15,
+    blocks=4,
+    block_size=100,
+    seed=0,
+    workers=1,
+    cache=None,
+    start=None,
+):
+    rng = random.Random(seed)
+    scores = {}
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        first = _clip(start if start is not None else ParametricStrategy().vector())
+        scored = _score(
+            [first], opponents, seed, blocks, block_size, cache, executor, scores
+        )
+        history = []
+        for _ in range(generations):
+            elite = [vector for vector, _ in scored[:parents]]
+            children = []
+            for _ in range(population):
+                child = list(rng.choice(elite))
+                if len(elite) > 1 and rng.random() < 0.5:
+                    other = rng.choice(elite)
+                    child = [(a + b) / 2 for a, b in zip(child, other)]
+                child = [
+                    value + rng.gauss(0.0, sigma * (high - low))
+                    for value, (_, _, low, high) in zip(child, PARAMETERS)
+                ]
+                children.append(_clip(child))
+            scored = _score(
+                elite + children,
+                opponents,
+                seed,
+                blocks,
+                block_size,
+                cache,
+                executor,
+                scores,
+            )
+            history.append(scored[0][1])
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    best, best_fitness = scored[0]
+    return best, best_fitness, history
+
+
+def fitness(vector, opponents, seed, blocks, block_size, cache=None, executor=None):
+    scored = _score([vector], opponents, seed, blocks, block_size, cache, executor, {})
+    return scored[0][1]
+
+
+def _score(vectors, opponents, seed, blocks, block_size, cache, executor, scores):
+    """
+    Helper function for evolve, the (vector, fitness) pairs of vectors from
+    the best down. scores maps (vector, block) to the (wins, games) already
+    known, only the pairs missing from it and from the cache are played.
+    """
+    vectors = [_clip(vector) for vector in vectors]
+    missing = {}
+    for vector in vectors:
+        for block in range(blocks):
+            entry = (tuple(vector), block)
+            if entry in scores or entry in missing:
+                continue
+            key = None
+            if cache is not None:
+                strategies = [ParametricStrategy.from_vector(vector)] + list(opponents)
+                start = block * block_size
+                key = cache.key(CACHE_KIND, strategies, seed, start, start + block_size)
+                outcome = cache.get(key)
+                if outcome is not None:
+                    scores[entry] = tuple(outcome)
+                    continue
+            missing[entry] = (key, (vector, opponents, seed, block, block_size))
+    tasks = [task for _, task in missing.values()]
+    if executor is None:
+        outcomes = [_play_block(task) for task in tasks]
+    else:
+        outcomes = list(executor.map(_play_block, tasks))
+    for (entry, (key, _)), outcome in zip(missing.items(), outcomes):
+        scores[entry] = outcome
+        if cache is not None:
+            cache.put(key, list(outcome))
+    scored = []
+    for vector in vectors:
+        wins = games = 0
+        for block in range(blocks):
+            block_wins, block_games = scores[(tuple(vector), block)]
+            wins += block_wins
+            games += block_games
+        scored.append((vector, wins / games if games else 0.0))
+    scored.sort(key=lambda pair: -pair[1])
+    return scored
+
+
+def _play_block(task):
+    """
+    Play one seed block of a vector, return (wins, games) of the vector.
+    """
+    vector, opponents, seed, block, block_size = task
+    strategies = [ParametricStrategy.from_vector(vector)] + list(opponents)
+    results = run_paired_games(strategies, block_size, seed, start=block * block_size)
+    wins = sum(1 for result in results if result.winner == 0)
+    return wins, len(results)
+
+
+def _clip(vector):
+    """
+    Keep every parameter in its range, rounded so that vectors that only
+    differ by noise share their cache entries.
+    """
+    return [
+        round(min(max(value, low), high), 4)
+        for value, (_, _, low, high) in zip(vector, PARAMETERS)
+    ]
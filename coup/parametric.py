@@ -0,0 +1,230 @@
+from coup.compact import (
+    ASSASSINATE,
+    BLOCKS,
+    CHALLENGE,
+    COPIES_PER_CHARACTER,
+    COUP,
+    EXCHANGE,
+    FOREIGN_AID,
+    INCOME,
+    REQUIREMENTS,
+    STEAL,
+    TAX,
+)
+from coup.influence import Ambassador, Assassin, Captain, Duke
+
+"""
+Parametric Strategy Class
+
+    A rule-based strategy like HonestStrategy whose thresholds and
+    probabilities are parameters, so that a family of strategies can be
+    searched (see coup/optimize.py). With the default parameters it plays
+    like HonestStrategy.
+
+    PARAMETERS lists (name, default, low, high) for every parameter:
+
+        coup_threshold: Coup (the player with the most influences, then the
+            most coins) once the player has this many coins.
+        assassinate_rate, tax_rate, steal_rate, exchange_rate: the
+            probability of claiming the action when holding its character.
+        bluff_assassinate, bluff_tax, bluff_steal, bluff_exchange: the
+            probability of claiming it without the character.
+        steal_min_coins: only Steal from players with at least this many
+            coins.
+        steal_richest: the probability of stealing from (and assassinating)
+            the richest target rather than a random one.
+        foreign_aid_rate: the probability of Foreign Aid rather than Income,
+            when no claim was made.
+        block_rate, bluff_block: the probability of blocking with and
+            without the blocking character.
+        challenge_rate: the probability of challenging a claim when at most
+            challenge_copies copies of the character are unaccounted for (not
+            in the player's hand or revealed), e.g. challenge_copies = 0 and
+            challenge_rate = 1 challenges every claim that must be a bluff.
+        keep_duke ... keep_contessa: the value of holding each character,
+            the most valuable cards are kept by an Exchange and the least
+            valuable one is lost first.
+
+    Fields:
+        params: dict of str to float
+
+    Methods:
+        __init__(params=None):
+            params overrides some of the defaults.
+        from_vector(vector): ParametricStrategy
+            @staticmethod, the parameters in the order of PARAMETERS.
+        vector(): list of float
+        The four strategy methods of HonestStrategy.
+"""
+
+PARAMETERS = (
+    ("coup_threshold", 7, 7, 10),
+    ("assassinate_rate", 0.0, 0.0, 1.0),
+    ("bluff_assassinate", 0.0, 0.0, 1.0),
+    ("tax_rate", 1.0, 0.0, 1.0),
+    ("bluff_tax", 0.0, 0.0, 1.0),
+    ("steal_rate", 0.0, 0.0, 1.0),
+    ("bluff_steal", 0.0, 0.0, 1.0),
+    ("steal_min_coins", 2, 1, 6),
+    ("steal_richest", 1.0, 0.0, 1.0),
+    ("exchange_rate", 0.0, 0.0, 1.0),
+    ("bluff_exchange", 0.0, 0.0, 1.0),
+    ("foreign_aid_rate", 0.0, 0.0, 1.0),
+    ("block_rate", 0.0, 0.0, 1.0),
+    ("bluff_block", 0.0, 0.0, 1.0),
+    ("challenge_rate", 0.0, 0.0, 1.0),
+    ("challenge_copies", 0, 0, 3),
+    ("keep_duke", 1.0, 0.0, 1.0),
+    ("keep_assassin", 0.5, 0.0, 1.0),
+    ("keep_captain", 0.5, 0.0, 1.0),
+    ("keep_ambassador", 0.5, 0.0, 1.0),
+    ("keep_contessa", 0.5, 0.0, 1.0),
+)
+DEFAULTS = {name: default for name, default, _, _ in PARAMETERS}
+KEEP = (
+    "keep_duke",
+    "keep_assassin",
+    "keep_captain",
+    "keep_ambassador",
+    "keep_contessa",
+)
+
+
+class ParametricStrategy:
+    def __init__(self, params=None):
+        self.params = dict(DEFAULTS)
+        if params:
+            unknown = set(params) - set(DEFAULTS)
+            if unknown:
+                raise ValueError("unknown parameters " + ", ".join(sorted(unknown)))
+            self.params.update(params)
+        self._keep = [self.params[name] for name in KEEP]
+
+    @staticmethod
+    def from_vector(vector):
+        return ParametricStrategy(
+            {name: value for (name, _, _, _), value in zip(PARAMETERS, vector)}
+        )
+
+    def vector(self):
+        return [self.params[name] for name, _, _, _ in PARAMETERS]
+
+    def action_strategy(self, gamestate):
+        p = self.params
+        rng = gamestate.rng
+        player = gamestate.get_active_player()
+        hand = player.hidden_influences
+        mask = gamestate.legal_action_mask(player)
+        targets = [
+            seat
+            for seat, other in enumerate(gamestate.players)
+            if other is not player and other.is_alive()
+        ]
+        if player.coins >= max(p["coup_threshold"], 7) or player.coins >= 10:
+            return self._build(gamestate, COUP + self._coup_target(gamestate, targets))
+        if player.coins >= 3 and self._claims(rng, hand, Assassin, "assassinate"):
+            target = self._rich_target(gamestate, targets)
+            return self._build(gamestate, ASSASSINATE + target)
+        if self._claims(rng, hand, Duke, "tax"):
+            return self._build(gamestate, TAX)
+        victims = [
+            seat
+            for seat in targets
+            if gamestate.players[seat].coins >= p["steal_min_coins"]
+            and mask >> (STEAL + seat) & 1
+        ]
+        if victims and self._claims(rng, hand, Captain, "steal"):
+            return self._build(gamestate, STEAL + self._rich_target(gamestate, victims))
+        if self._claims(rng, hand, Ambassador, "exchange"):
+            return self._build(gamestate, EXCHANGE)
+        if rng.random() < p["foreign_aid_rate"]:
+            return self._build(gamestate, FOREIGN_AID)
+        return self._build(gamestate, INCOME)
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        p = self.params
+        rng = gamestate.rng
+        mask = gamestate.legal_response_mask(countering_player)
+        hand = countering_player.hidden_influences
+        for block in BLOCKS:
+            if mask >> block & 1:
+                held = REQUIREMENTS[block] in hand
+                if rng.random() < (p["block_rate"] if held else p["bluff_block"]):
+                    return gamestate.build_action(block, countering_player)
+        if mask >> CHALLENGE & 1:
+            claimed = gamestate.action_stack.peek().requirement
+            unseen = _unseen(gamestate, countering_player, claimed)
+            if unseen <= p["challenge_copies"] and rng.random() < p["challenge_rate"]:
+                return gamestate.build_action(CHALLENGE, countering_player)
+        return None
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return self._ranked(gamestate.rng, target_player.hidden_influences)[-1]
+
+    def player_exchange_strategy(self, gamestate):
+        ranked = self._ranked(
+            gamestate.rng, gamestate.get_active_player().hidden_influences
+        )
+        return ranked[:-2], ranked[-2:]
+
+    def _claims(self, rng, hand, character, action):
+        """
+        Decide whether to claim the action of character.
+        """
+        if character in hand:
+            return rng.random() < self.params[action + "_rate"]
+        return rng.random() < self.params["bluff_" + action]
+
+    def _ranked(self, rng, hand):
+        """
+        The cards of hand from the most to the least valuable, ties broken at
+        random.
+        """
+        cards = list(hand)
+        rng.shuffle(cards)
+        cards.sort(key=lambda card: -self._keep[card])
+        return cards
+
+    def _coup_target(self, gamestate, targets):
+        """
+        The target with the most influences, then the most coins, then at
+        random, like HonestStrategy.
+        """
+        players = gamestate.players
+        best = max(
+            (len(players[seat].hidden_influences), players[seat].coins)
+            for seat in targets
+        )
+        tied = [
+            seat
+            for seat in targets
+            if (len(players[seat].hidden_influences), players[seat].coins) == best
+        ]
+        return gamestate.rng.choice(tied)
+
+    def _rich_target(self, gamestate, targets):
+        rng = gamestate.rng
+        if rng.random() < self.params["steal_richest"]:
+            return max(targets, key=lambda seat: gamestate.players[seat].coins)
+        return rng.choice(targets)
+
+    def _build(self, gamestate, action_id):
+        return gamestate.build_action(action_id, gamestate.get_active_player())
+
+    def __repr__(self):
+        changed = {
+            name: value
+            for name, value in self.params.items()
+            if value != DEFAULTS[name]
+        }
+        return f"ParametricStrategy({changed})"
+
+
+def _unseen(gamestate, player, character):
+    """
+    The copies of character that player cannot account for.
+    """
+    unseen = COPIES_PER_CHARACTER - player.hidden_influences.count(character)
+    for other in gamestate.players:
+        unseen -= other.revealed_influences.count(character)
+    return unseen
@@ -4,8 +4,8 @@ Player Class
     Fields:
         name: string
         coins (initially 3): int
-        hidden_influences: list of influences
-        revealed_influences: list of influences
+        hidden_influences: sorted tuple of Character
+        revealed_influences: sorted tuple of Character
         player_strategy: Strategy
 
     Methods:
@@ -17,20 +17,22 @@ Player Class
             Invokes the counteraction strategy function with 'self' as the
             countering player.
         lose_influence(gamestate):
-            Invoke the influence loss strategy function, to select which
-            influence to lose, then remove the first instance of that influence
+            If the player has no hidden influences left (e.g. they were knocked
+            out by a challenge earlier in the same turn) do nothing. Otherwise
+            invoke the influence loss strategy function, to select which
+            influence to lose, then remove one instance of that influence
             from the player's hidden_influences and add it to the player's
-            revealed_influences.
+            revealed_influences. Observers are told which influence was lost.
         get_exchange(gamestate, cards):
-            Append the player's hidden influences to the list of cards, then
-            invoke the player exchange strategy function, this will return a
-            list of cards to keep and a list of cards to return to the deck.
-            Then set the player's hidden_influences to the list of cards to keep
-            and return the list of cards to return to the deck. 
+            Add the cards to the player's hidden influences, then invoke the
+            player exchange strategy function, this will return a list of
+            cards to keep and a list of cards to return to the deck. Then set
+            the player's hidden_influences to the cards to keep and return the
+            list of cards to return to the deck.
         satisfies_action_requirement(action): bool
             If the action isn't challengeable return true. If the action is 
-            challengeable, return true if an instance of the action's action
-            requirement is in the player's hidden influences.
+            challengeable, return true if the action's requirement is in the
+            player's hidden influences.
         get_num_influences(): int
             Returns the number of hidden influences the player has.
         pay_cost(cost):
@@ -41,10 +43,13 @@ Player Class
             influences. If the hidden tag is set to true, additionally print
             their hidden influences.
         replace_influence(gamestate, influence):
-            Draw a card from the deck.
-            Then remove the first instance of the influence from the player's
-            hidden_influences and return it to the deck.
-            Then add the new influence to the player's hidden_influences.
+            Draw a card from the deck and tell the observers.
+            Then remove one instance of the influence from the player's
+            hidden_influences, add the new influence to them and return the
+            removed influence to the deck, then tell the observers.
+
+    Hands are kept as sorted tuples of characters so that two players holding
+    the same cards have equal (and hashable) hands.
 """
 
 
@@ -52,8 +57,8 @@ class Player:
     def __init__(self, name, strategy):
         self.name = name
         self.coins = 3
-        self.hidden_influences = []
-        self.revealed_influences = []
+        self.hidden_influences = ()
+        self.revealed_influences = ()
         self.player_strategy = strategy
 
     def is_alive(self):
@@ -61,8 +66,8 @@ class Player:
 
     def reset_player(self):
         self.coins = 3
-        self.hidden_influences = []
-        self.revealed_influences = []
+        self.hidden_influences = ()
+        self.revealed_influences = ()
 
     def get_action(self, gamestate):
         return self.player_strategy.action_strategy(gamestate)
@@ -71,32 +76,39 @@ class Player:
         return self.player_strategy.counteraction_strategy(gamestate, self)
 
     def lose_influence(self, gamestate):
+        if not self.hidden_influences:
+            return
         influence_to_lose = self.player_strategy.influence_loss_strategy(
             gamestate, self
         )
-        lose_ind = self.hidden_influences.index(influence_to_lose)
-        self.revealed_influences.append(self.hidden_influences.pop(lose_ind))
+        self.hidden_influences = remove_influence(
+            self.hidden_influences, influence_to_lose
+        )
+        self.revealed_influences = add_influences(
+            self.revealed_influences, (influence_to_lose,)
+        )
+        for observer in gamestate.observers:
+            observer.on_influence_lost(gamestate, self, influence_to_lose)
 
     def disqualify(self):
         # Add all of the players hidden influences to their revealed influences.
-        self.revealed_influences.extend(self.hidden_influences)
-        self.hidden_influences = []
+        self.revealed_influences = add_influences(
+            self.revealed_influences, self.hidden_influences
+        )
+        self.hidden_influences = ()
 
     def get_exchange(self, gamestate, cards):
-        self.hidden_influences.append(cards)
-        cards_to_keep, cards_to_return = self.player_strategy.exchange_strategy(
+        self.hidden_influences = add_influences(self.hidden_influences, cards)
+        cards_to_keep, cards_to_return = self.player_strategy.player_exchange_strategy(
             gamestate
         )
-        self.hidden_influences = cards_to_keep
+        self.hidden_influences = tuple(sorted(cards_to_keep))
         return cards_to_return
 
     def satisfies_action_requirement(self, action):
         if not action.challengeable:
             return True
-        return any(
-            isinstance(influence, action.requirement)
-            for influence in self.hidden_influences
-        )
+        return action.requirement in self.hidden_influences
 
     def get_num_influences(self):
         return len(self.hidden_influences)
@@ -122,18 +134,26 @@ class Player:
 
     def replace_influence(self, gamestate, influence):
         card = gamestate.deck.draw_card()
-        self.hidden_influences.append(card)
-        replace_ind = self._find_influence_to_replace(influence)
-        gamestate.return_card_to_deck(self.hidden_influences.pop(replace_ind))
-
-    def _find_influence_to_replace(self, influence):
-        """
-        Helper function for replace_influence.
-
-        Iterate through the player's hidden influences, and return the index
-        of the first element that is an instance of influence.
-        """
-        for i, hidden_influence in enumerate(self.hidden_influences):
-            if isinstance(hidden_influence, influence):
-                return i
-        return None
+        for observer in gamestate.observers:
+            observer.on_cards_drawn(gamestate, self, (card,))
+        self.hidden_influences = add_influences(
+            remove_influence(self.hidden_influences, influence), (card,)
+        )
+        gamestate.return_card_to_deck(influence)
+        for observer in gamestate.observers:
+            observer.on_influence_replaced(gamestate, self, influence)
+
+
+def add_influences(hand, influences):
+    """
+    Return the sorted tuple hand with the influences added.
+    """
+    return tuple(sorted(hand + tuple(influences)))
+
+
+def remove_influence(hand, influence):
+    """
+    Return the sorted tuple hand with one instance of influence removed.
+    """
+    i = hand.index(influence)
+    return hand[:i] + hand[i + 1 :]
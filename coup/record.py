@@ -0,0 +1,677 @@
+import mmap
+import os
+import zlib
+from array import array
+from bisect import bisect
+
+from coup.compact import (
+    CHALLENGE,
+    DRAW,
+    LOSE,
+    NUM_ACTIONS,
+    NUM_CHARACTERS,
+    PASS,
+    RETURN,
+)
+from coup.deck import CHARACTERS, CountedDeck
+from coup.game import Game
+from coup.observer import GameObserver
+from coup.player import Player
+
+"""
+Compact binary game records.
+
+    Every game is stored as a record of a few tens of bytes:
+
+        length:  varint, the number of bytes that follow.
+        seed:    8 bytes, little endian, the seed the game was played with
+                 (see coup/simulate.py game_seed), 0 if unknown.
+        players: 1 byte, the number of seats.
+        deal:    1 byte per seat, the two characters dealt, as
+                 first * NUM_CHARACTERS + second.
+        events:  one byte per event, a compact action id (see
+                 coup/compact.py), in the order the events happened:
+                     - the action of the turn, by the active player,
+                     - a response (CHALLENGE or a block) followed by the seat
+                       of the player who made it,
+                     - LOSE + character followed by the seat of the player
+                       who revealed it,
+                     - DRAW + character for every card drawn from the deck
+                       during the game (replacements and exchanges),
+                     - RETURN + character for every card returned at the end
+                       of an Exchange,
+                     - DISQUALIFIED followed by the seat of the active player,
+                       right after an action they could not pay for (see
+                       coup/game.py handle_turn). Their hidden influences are
+                       revealed without LOSE events.
+
+    The deal and the draws fix every random event, and the events every
+    decision, so a record is enough to replay a game exactly without the
+    strategies that played it.
+
+    Records are appended to shard files in a directory, each starting with
+    MAGIC. A record never spans two shards.
+
+    Functions:
+        encode_varint(value, out):
+            Append value to the bytearray out.
+        decode_varint(data, position): (int, int)
+            The value starting at position and the position after it.
+        has_seat(code): bool
+            True for the events followed by a seat (responses, losses and
+            disqualifications).
+        shard_name(prefix, index): str
+        list_shards(directory, prefix="games"): list of str
+"""
+
+MAGIC = b"COUPREC1"
+INDEX_MAGIC = b"COUPIDX1"
+# The index checks this many bytes before the end of the part of the shard
+# it covers, to tell a shard that grew from one that was rewritten.
+INDEX_TAIL = 4096
+SHARD_SUFFIX = ".rec"
+SEED_BYTES = 8
+# Event codes past the compact action ids, DISQUALIFIED is stored in records,
+# END is what the replay sees after the last event.
+DISQUALIFIED = NUM_ACTIONS
+END = NUM_ACTIONS + 1
+
+
+def encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, position):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def shard_name(prefix, index):
+    return f"{prefix}-{index:05d}{SHARD_SUFFIX}"
+
+
+def list_shards(directory, prefix="games"):
+    """
+    The paths of the shards of prefix in directory, in order.
+    """
+    start = prefix + "-"
+    names = sorted(
+        name
+        for name in os.listdir(directory)
+        if name.startswith(start) and name.endswith(SHARD_SUFFIX)
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+"""
+Record Writer Class
+
+    Appends records to the shard files of a directory. Records are collected
+    in a buffer and written in one call once it holds buffer_bytes, and a
+    new shard is started once the current one holds shard_bytes. Opening a
+    directory that already has shards appends to the last one.
+
+    Fields:
+        directory: str
+        prefix: str, shards are named prefix-00000.rec, prefix-00001.rec, ...
+        shard_bytes: int
+        buffer_bytes: int
+        games: int, the number of records written by this writer.
+
+    Methods:
+        write(record):
+            Append the bytes of a record (with its length prefix).
+        write_events(events):
+            Append a record given without its length prefix.
+        flush():
+        close():
+            Flush and close the current shard. Writers are also context
+            managers.
+"""
+
+
+class RecordWriter:
+    def __init__(
+        self, directory, prefix="games", shard_bytes=1 << 28, buffer_bytes=1 << 16
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_bytes = shard_bytes
+        self.buffer_bytes = buffer_bytes
+        self.games = 0
+        self._buffer = bytearray()
+        os.makedirs(directory, exist_ok=True)
+        shards = list_shards(directory, prefix)
+        self._index = len(shards) - 1 if shards else 0
+        self._file = None
+        self._size = 0
+        self._open_shard()
+
+    def write(self, record):
+        buffer = self._buffer
+        buffer += record
+        self.games += 1
+        if len(buffer) >= self.buffer_bytes:
+            self.flush()
+
+    def write_events(self, events):
+        buffer = self._buffer
+        size = len(events)
+        if size < 0x80:
+            buffer.append(size)
+        else:
+            encode_varint(size, buffer)
+        buffer += events
+        self.games += 1
+        if len(buffer) >= self.buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        size = len(self._buffer)
+        if self._size > len(MAGIC) and self._size + size > self.shard_bytes:
+            self._file.close()
+            self._index += 1
+            self._open_shard()
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._size += size
+        self._buffer.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_shard(self):
+        """
+        Open the current shard for appending, writing MAGIC if it is new.
+        """
+        path = os.path.join(self.directory, shard_name(self.prefix, self._index))
+        self._file = open(path, "ab")
+        self._size = self._file.tell()
+        if not self._size:
+            self._file.write(MAGIC)
+            self._size = len(MAGIC)
+
+
+"""
+Game Recorder Class
+
+    Observer that encodes the game it watches as a record and hands it to a
+    RecordWriter when the game is over. The events are appended to a
+    bytearray as they happen, so recording costs a few list operations per
+    event.
+
+    Fields:
+        writer: RecordWriter, or anything with a write_events(bytes) method.
+        seed: int, stored in the next record, run_games sets it before every
+            game.
+"""
+
+
+class GameRecorder(GameObserver):
+    def __init__(self, writer):
+        self.writer = writer
+        self.seed = 0
+        self._players = None
+        self._seats = {}
+        self._events = bytearray()
+        self._pool = ()
+
+    def on_game_start(self, gamestate):
+        if gamestate.players is not self._players:
+            self._players = gamestate.players
+            self._seats = {
+                player: seat for seat, player in enumerate(gamestate.players)
+            }
+        events = self._events
+        events.clear()
+        events += self.seed.to_bytes(SEED_BYTES, "little")
+        events.append(len(gamestate.players))
+        for player in gamestate.players:
+            first, second = player.hidden_influences
+            events.append(first * NUM_CHARACTERS + second)
+
+    def on_action(self, gamestate, action):
+        code = action.code
+        if code > PASS:
+            self._events += bytes((code, self._seats[action.user]))
+            return
+        if action.has_target:
+            self._events.append(code + self._seats[action.target])
+        else:
+            self._events.append(code)
+        # The active player starts the turn alive, so no hidden influences
+        # left after paying means they could not pay.
+        if action.cost and not action.user.hidden_influences:
+            self._events += bytes((DISQUALIFIED, self._seats[action.user]))
+
+    def on_influence_lost(self, gamestate, player, influence):
+        events = self._events
+        events.append(LOSE + influence)
+        events.append(self._seats[player])
+
+    def on_cards_drawn(self, gamestate, player, cards):
+        events = self._events
+        for card in cards:
+            events.append(DRAW + card)
+        if len(cards) > 1:
+            self._pool = player.hidden_influences + tuple(cards)
+
+    def on_exchange(self, gamestate, player):
+        returned = list(self._pool)
+        for card in player.hidden_influences:
+            returned.remove(card)
+        for card in returned:
+            self._events.append(RETURN + card)
+
+    def on_game_over(self, gamestate, winner):
+        self.writer.write_events(self._events)
+
+
+def has_seat(code):
+    """
+    True if an event code is followed by the seat of the player who made it.
+    """
+    return CHALLENGE <= code < RETURN or code == DISQUALIFIED
+
+
+"""
+Game Record Class
+
+    One game read back from a record.
+
+    Fields:
+        index: int, the number of the game in its RecordReader.
+        data: bytes, the record without its length prefix.
+        seed: int
+        num_players: int
+        hands: list of tuple of Character, the hand dealt to each seat.
+
+    Methods:
+        events(): generator of (int, int)
+            Every event as (code, seat), seat is -1 for the events not
+            followed by one.
+        replay(stop=None, observers=None): Game
+            Play the game again from the record, with strategies and a deck
+            that repeat the recorded decisions and draws, and return the Game.
+            If stop is given the replay stops just before the event with that
+            number (counting from 0, as in events()), so the game state is
+            exactly the position at that point, possibly in the middle of a
+            turn. Observers (e.g. a BeliefState) see the replay as a normal
+            game.
+"""
+
+
+class GameRecord:
+    def __init__(self, index, data):
+        self.index = index
+        self.data = data
+        self.seed = int.from_bytes(data[:SEED_BYTES], "little")
+        self.num_players = data[SEED_BYTES]
+        start = SEED_BYTES + 1
+        self.hands = [
+            (CHARACTERS[byte // NUM_CHARACTERS], CHARACTERS[byte % NUM_CHARACTERS])
+            for byte in data[start : start + self.num_players]
+        ]
+
+    def events(self):
+        data = self.data
+        position = SEED_BYTES + 1 + self.num_players
+        end = len(data)
+        while position < end:
+            code = data[position]
+            if CHALLENGE <= code < RETURN or code == DISQUALIFIED:
+                yield code, data[position + 1]
+                position += 2
+            else:
+                yield code, -1
+                position += 1
+
+    def replay(self, stop=None, observers=None):
+        cursor = _Cursor(self, stop)
+        players = [
+            Player("Player " + str(seat), ReplayStrategy(cursor))
+            for seat in range(self.num_players)
+        ]
+        game = Game(players, observers=observers, deck=ReplayDeck(cursor))
+        try:
+            game.play()
+        except _ReplayStopped:
+            pass
+        return game
+
+    def __repr__(self):
+        return f"GameRecord(index={self.index}, seed={self.seed}, hands={self.hands})"
+
+
+class _ReplayStopped(Exception):
+    pass
+
+
+"""
+Cursor Class
+
+    Helper for GameRecord.replay, the position in the events of a record
+    shared by the replay strategies and deck.
+"""
+
+
+class _Cursor:
+    def __init__(self, record, stop):
+        self.record = record
+        self.events = list(record.events())
+        self.position = 0
+        self.stop = stop
+
+    def peek(self):
+        if self.position == self.stop:
+            raise _ReplayStopped()
+        return self.lookahead()
+
+    def lookahead(self):
+        """
+        The next event, like peek but ignoring stop.
+        """
+        if self.position == len(self.events):
+            return END, -1
+        return self.events[self.position]
+
+    def take(self, low, high, seat=-1):
+        """
+        Consume the next event, which must have a code in [low, high) and
+        the given seat.
+        """
+        code, event_seat = self.peek()
+        if not low <= code < high or event_seat != seat:
+            self.mismatch()
+        self.position += 1
+        return code
+
+    def mismatch(self):
+        raise ValueError(
+            f"game {self.record.index} does not match its replay at event "
+            f"{self.position}"
+        )
+
+
+"""
+Replay Strategy Class
+
+    Strategy that repeats the decisions of a record, see GameRecord.replay.
+"""
+
+
+class ReplayStrategy:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def action_strategy(self, gamestate):
+        cursor = self.cursor
+        code = cursor.take(0, PASS)
+        player = gamestate.get_active_player()
+        action = gamestate.build_action(code, player)
+        seat = gamestate.players.index(player)
+        # Game.handle_turn disqualifies the player itself, the event only
+        # has to agree with it. At the stop it is left for the next peek.
+        disqualified = cursor.lookahead() == (DISQUALIFIED, seat)
+        if disqualified != (player.coins < action.cost):
+            cursor.mismatch()
+        if disqualified and cursor.position != cursor.stop:
+            cursor.position += 1
+        return action
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        code, seat = self.cursor.peek()
+        if not PASS < code < LOSE or gamestate.players[seat] is not countering_player:
+            return None
+        self.cursor.take(PASS + 1, LOSE, seat)
+        return gamestate.build_action(code, countering_player)
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        seat = gamestate.players.index(target_player)
+        return CHARACTERS[self.cursor.take(LOSE, RETURN, seat) - LOSE]
+
+    def player_exchange_strategy(self, gamestate):
+        cards_to_keep = list(gamestate.get_active_player().hidden_influences)
+        cards_to_return = []
+        for _ in range(2):
+            card = CHARACTERS[self.cursor.take(RETURN, DRAW) - RETURN]
+            cards_to_return.append(card)
+            cards_to_keep.remove(card)
+        return cards_to_keep, cards_to_return
+
+
+"""
+Replay Deck Class
+
+    A CountedDeck that deals the hands of a record and then draws the
+    recorded cards, see GameRecord.replay.
+"""
+
+
+class ReplayDeck(CountedDeck):
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.deal = []
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.deal = [card for hand in self.cursor.record.hands for card in hand]
+        self.deal.reverse()
+
+    def draw_card(self):
+        if self.deal:
+            card = self.deal.pop()
+        else:
+            card = CHARACTERS[self.cursor.take(DRAW, NUM_ACTIONS) - DRAW]
+        self.counts[card] -= 1
+        self.size -= 1
+        return card
+
+
+"""
+Record Reader Class
+
+    Reads the shards written by a RecordWriter. Every shard is memory-mapped
+    and has an offset index (a .idx file next to it with the array of the
+    offsets of its records followed by the offset of the end of the last one),
+    built on first use and extended when the shard has grown since. Finding
+    game number n is then a bisect over the shards and a lookup in the
+    index, and iterating over the games reads the shards in order through
+    the map, so neither loads a shard into memory.
+
+    An index starts with INDEX_MAGIC and the size, modification time and
+    CRC-32 of the last INDEX_TAIL bytes of the part of the shard it covers.
+    It is used as is if the shard's size and modification time are
+    unchanged, extended if the shard is larger and still has the same tail
+    (it was appended to, as RecordWriter does), and rebuilt otherwise. When
+    the index cannot be written (e.g. read-only storage) it is only kept in
+    memory.
+
+    Fields:
+        directory: str
+        prefix: str
+
+    Methods:
+        __len__(): int
+        __getitem__(n): GameRecord
+        __iter__(): iterator of GameRecord
+        select(predicate): generator of GameRecord
+            The games for which predicate(record) is true, e.g.
+            reader.select(lambda record: record.num_players == 2).
+        close():
+            Readers are also context managers.
+
+    Most questions can be answered from GameRecord.events() alone, without
+    replaying: seat 2 losing a challenge to a bluffed Duke claim is a TAX
+    (or BLOCK_FOREIGN_AID by seat 2) followed by a CHALLENGE and a LOSE by
+    seat 2, since the loser of a challenge reveals an influence before
+    anything else happens. Questions about hidden hands need a replay with
+    an observer attached.
+"""
+
+
+class RecordReader:
+    def __init__(self, directory, prefix="games"):
+        self.directory = directory
+        self.prefix = prefix
+        self._shards = []
+        self._starts = []
+        total = 0
+        for path in list_shards(directory, prefix):
+            shard = _Shard(path)
+            self._shards.append(shard)
+            self._starts.append(total)
+            total += len(shard)
+        self._total = total
+
+    def __len__(self):
+        return self._total
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += self._total
+        if not 0 <= n < self._total:
+            raise IndexError("game index out of range")
+        shard_index = bisect(self._starts, n) - 1
+        shard = self._shards[shard_index]
+        return GameRecord(n, shard.record(n - self._starts[shard_index]))
+
+    def __iter__(self):
+        for shard, start in zip(self._shards, self._starts):
+            for offset, data in enumerate(shard.records()):
+                yield GameRecord(start + offset, data)
+
+    def select(self, predicate):
+        for record in self:
+            if predicate(record):
+                yield record
+
+    def close(self):
+        for shard in self._shards:
+            shard.close()
+        self._shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+"""
+Shard Class
+
+    Helper for RecordReader, one memory-mapped shard and its offset index.
+"""
+
+
+class _Shard:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        stat = os.fstat(self._file.fileno())
+        size = stat.st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(path + " is not a game record shard")
+        self.offsets = _load_index(path + ".idx", self._map, size, stat.st_mtime_ns)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def record(self, n):
+        _, start = decode_varint(self._map, self.offsets[n])
+        return self._map[start : self.offsets[n + 1]]
+
+    def records(self):
+        data = self._map
+        offsets = self.offsets
+        for n in range(len(offsets) - 1):
+            _, start = decode_varint(data, offsets[n])
+            yield data[start : offsets[n + 1]]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _load_index(path, data, size, mtime):
+    """
+    Helper function for _Shard, read the offset index of a shard if it is
+    still valid (see RecordReader), scan the part of the shard it does not
+    cover yet and save it if it changed and the directory is writable.
+    """
+    offsets = _read_index(path, data, size, mtime)
+    position = offsets[-1]
+    if position == size and len(offsets) > 1:
+        return offsets
+    while position < size:
+        length, start = decode_varint(data, position)
+        if start + length > size:
+            # A record cut short by a writer that was stopped.
+            break
+        position = start + length
+        offsets.append(position)
+    header = array("Q", [size, mtime, _tail_crc(data, offsets[-1])])
+    try:
+        with open(path, "wb") as f:
+            f.write(INDEX_MAGIC)
+            header.tofile(f)
+            offsets.tofile(f)
+    except OSError:
+        pass
+    return offsets
+
+
+def _read_index(path, data, size, mtime):
+    """
+    Helper function for _load_index, the offsets of a valid index file, or
+    just the offset of the first record.
+    """
+    fresh = array("Q", [len(MAGIC)])
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return fresh
+    if content[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+        return fresh
+    header = array("Q")
+    header.frombytes(content[len(INDEX_MAGIC) : len(INDEX_MAGIC) + 24])
+    offsets = array("Q")
+    offsets.frombytes(content[len(INDEX_MAGIC) + 24 :])
+    if len(header) != 3 or not offsets:
+        return fresh
+    indexed_size, indexed_mtime, tail = header
+    if (indexed_size, indexed_mtime) == (size, mtime):
+        return offsets
+    end = offsets[-1]
+    if indexed_size <= size and end <= size and _tail_crc(data, end) == tail:
+        return offsets
+    return fresh
+
+
+def _tail_crc(data, end):
+    return zlib.crc32(data[max(0, end - INDEX_TAIL) : end])
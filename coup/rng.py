@@ -0,0 +1,129 @@
+import numpy as np
+
+"""
+Random Stream Class
+
+    A seeded source of random numbers that can stand in for random.Random
+    wherever the engine draws them (Deck, CountedDeck, GameState.rng and the
+    strategies that use it), instead of the hidden global state of the
+    random module.
+
+    Values come from a NumPy PCG64 generator, in blocks: the raw 64 bit
+    outputs are generated in bulk and kept in a list, so handing one out is
+    an index into the list, and the generator is only called once per block.
+    After a seed or a jump the blocks start small (MIN_BLOCK values) and
+    double up to block, so that a stream that is moved for every game does
+    not pay for values it never uses.
+
+    PCG64 can jump ahead in O(1), which gives every game its own substream
+    of a single stream: game i starts at value i * GAME_STRIDE (see
+    start_game), so it draws the same numbers whichever process plays it and
+    whatever was played before, without reseeding.
+
+    randrange(n) maps a 64 bit value v to (v * n) >> 64, which is biased by
+    less than n / 2**64. random() uses the top 53 bits.
+
+    Fields:
+        block: int, the largest number of values generated at once.
+
+    Methods:
+        __init__(seed=0, block=4096):
+            seed is an int or a tuple of ints.
+        seed(seed):
+            Restart the stream from a new seed.
+        start_game(index):
+            Move to the start of the substream of game index.
+        jump(count):
+            Skip count values.
+        substream(index): RandomStream
+            An independent stream derived from the seed and index, e.g. for a
+            worker process, seeded with the seed tuple extended by index, so
+            substreams have substreams of their own (e.g. worker, then game).
+        random(): float in [0, 1)
+        randrange(n): int in [0, n)
+        choice(seq):
+        shuffle(x):
+            Shuffle a list in place (Fisher-Yates).
+"""
+
+MIN_BLOCK = 64
+GAME_STRIDE = 1 << 32
+SHIFT_64 = 64
+FLOAT_SCALE = 2.0**-53
+
+
+class RandomStream:
+    def __init__(self, seed=0, block=4096):
+        self.block = block
+        self._values = []
+        self._position = 0
+        self._size = 0
+        self._next_block = MIN_BLOCK
+        self._seed = ()
+        self._generator = None
+        self._start = None
+        self.seed(seed)
+
+    def seed(self, seed):
+        self._seed = tuple(seed) if isinstance(seed, (tuple, list)) else (seed,)
+        self._generator = np.random.PCG64(np.random.SeedSequence(self._seed))
+        self._start = self._generator.state
+        self._discard()
+
+    def start_game(self, index):
+        self._generator.state = self._start
+        self._generator.advance(index * GAME_STRIDE)
+        self._discard()
+
+    def jump(self, count):
+        remaining = self._size - self._position
+        if count < remaining:
+            self._position += count
+            return
+        self._generator.advance(count - remaining)
+        self._discard()
+
+    def substream(self, index):
+        return RandomStream(self._seed + (index,), self.block)
+
+    def random(self):
+        position = self._position
+        if position == self._size:
+            self._refill()
+            position = 0
+        self._position = position + 1
+        return (self._values[position] >> 11) * FLOAT_SCALE
+
+    def randrange(self, n):
+        position = self._position
+        if position == self._size:
+            self._refill()
+            position = 0
+        self._position = position + 1
+        return (self._values[position] * n) >> SHIFT_64
+
+    def choice(self, seq):
+        return seq[self.randrange(len(seq))]
+
+    def shuffle(self, x):
+        randrange = self.randrange
+        for i in range(len(x) - 1, 0, -1):
+            j = randrange(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+    def _discard(self):
+        """
+        Drop the buffered values, after the generator has been moved.
+        """
+        self._values = []
+        self._position = 0
+        self._size = 0
+        self._next_block = MIN_BLOCK
+
+    def _refill(self):
+        size = self._next_block
+        self._values = self._generator.random_raw(size).tolist()
+        self._position = 0
+        self._size = size
+        if size < self.block:
+            self._next_block = min(2 * size, self.block)
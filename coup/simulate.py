@@ -0,0 +1,263 @@
+import random
+from itertools import permutations
+
+from coup.deck import Deck
+from coup.game import Game
+from coup.observer import GameObserver
+from coup.player import Player
+from coup.record import GameRecorder
+from coup.rng import RandomStream
+
+"""
+Headless batch simulation.
+
+    run_games(strategies, n, seed, observers=None, start=0, deck=None,
+              writer=None, streams=False): list of GameResult
+        Seat one player per strategy (in the order given), then play n games
+        without any console I/O and return one GameResult per game. Game i is
+        seeded with game_seed(seed, i), so any single game can be replayed on
+        its own; start offsets the game indices so that a run can be split
+        into shards that give the same games as one long run. Extra observers
+        (e.g. a PrintObserver) can be attached, they are notified alongside
+        the result recorder. A deck (e.g. a CountedDeck) can be given, it is
+        reset before every game. If a writer (a RecordWriter, see
+        coup/record.py) is given every game is also recorded to it.
+        With streams=True the deck and the strategies draw from a
+        RandomStream (see coup/rng.py) seeded with seed instead of the global
+        random module, and game i from its substream (start_game(i)), which
+        avoids reseeding the global state for every game. A given deck draws
+        from the stream during the run and gets its own rng back after.
+        Without streams game i reseeds the global random module instead, its
+        state is saved before the run and restored after it, so the random
+        numbers of the caller are not disturbed.
+
+    run_paired_games(strategies, n, seed, observers=None, start=0,
+                     deck=None): list of GameResult
+        Play n deals, each once with every permutation of the strategies
+        over the seats (so len(strategies)! games per deal), with common
+        random numbers: the deck and the strategies draw from two separate
+        RandomStreams (see coup/rng.py), and both are moved to the substream
+        of the deal, not the seating (as is the global random module, for
+        strategies that use it directly). Every seating is then dealt the same cards,
+        and the strategies see the same random numbers until their games
+        diverge, so the difference between two strategies is measured on the
+        same deals and has a much smaller variance than over independent
+        games. The results are indexed by strategy rather than seat, and in
+        the order of the deals; GameResult.seating gives the strategy that
+        sat in each seat. A given deck gets its own rng back after the run,
+        and the global random module its state.
+
+    game_seed(master_seed, game_index): int
+        Derive a 64 bit seed for a single game from a master seed and the
+        index of the game, using the SplitMix64 finalizer so that
+        neighbouring indices give unrelated seeds.
+"""
+
+MASK_64 = (1 << 64) - 1
+
+
+def game_seed(master_seed, game_index):
+    z = (master_seed + (game_index + 1) * 0x9E3779B97F4A7C15) & MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return z ^ (z >> 31)
+
+
+def run_games(
+    strategies, n, seed, observers=None, start=0, deck=None, writer=None, streams=False
+):
+    players = [
+        Player("Player " + str(seat), strategy)
+        for seat, strategy in enumerate(strategies)
+    ]
+    recorder = ResultRecorder()
+    observers = [recorder] + list(observers or [])
+    game_recorder = None
+    if writer is not None:
+        game_recorder = GameRecorder(writer)
+        observers.append(game_recorder)
+    rng = RandomStream(seed) if streams else None
+    previous_rng = deck.rng if deck is not None else None
+    if rng is not None and deck is not None:
+        deck.rng = rng
+    global_state = random.getstate()
+    try:
+        game = Game(players, observers=observers, deck=deck, rng=rng)
+        results = []
+        for game_index in range(start, start + n):
+            seed_i = game_seed(seed, game_index)
+            if rng is None:
+                random.seed(seed_i)
+            else:
+                rng.start_game(game_index)
+            if game_recorder is not None:
+                game_recorder.seed = seed_i
+            game.reset()
+            game.play()
+            results.append(recorder.result(seed_i))
+    finally:
+        if deck is not None:
+            deck.rng = previous_rng
+        random.setstate(global_state)
+    return results
+
+
+def run_paired_games(strategies, n, seed, observers=None, start=0, deck=None):
+    # Saved first, a new Deck shuffles with the global random module.
+    global_state = random.getstate()
+    num_seats = len(strategies)
+    seatings = list(permutations(range(num_seats)))
+    recorder = ResultRecorder()
+    base = RandomStream(seed)
+    deck_rng = base.substream(0)
+    strategy_rng = base.substream(1)
+    deck = deck if deck is not None else Deck()
+    previous_rng = deck.rng
+    deck.rng = deck_rng
+    try:
+        games = []
+        for seating in seatings:
+            players = [
+                Player("Player " + str(seat), strategies[strategy])
+                for seat, strategy in enumerate(seating)
+            ]
+            observers_i = [recorder] + list(observers or [])
+            games.append(
+                Game(players, observers=observers_i, deck=deck, rng=strategy_rng)
+            )
+        results = []
+        for deal in range(start, start + n):
+            deal_seed = game_seed(seed, deal)
+            for seating, game in zip(seatings, games):
+                deck_rng.start_game(deal)
+                strategy_rng.start_game(deal)
+                random.seed(deal_seed)
+                game.reset()
+                game.play()
+                results.append(recorder.result(deal_seed).by_strategy(seating))
+    finally:
+        deck.rng = previous_rng
+        random.setstate(global_state)
+    return results
+
+
+"""
+Game Result Class
+
+    Structured summary of a single finished game. Seats are indices into the
+    list of strategies passed to run_games.
+
+    Fields:
+        seed: int
+        winner: int
+            Seat of the winning player.
+        turns: int
+            Number of turns played.
+        eliminations: tuple of (seat, turn)
+            The players that were knocked out, in the order they were knocked
+            out, with the turn number at the end of which it happened.
+        max_coins: tuple of int
+            Most coins each seat held at the end of any turn.
+        final_coins: tuple of int
+            Coins each seat held when the game finished.
+        seating: tuple of int or None
+            For results indexed by strategy (see run_paired_games), the
+            strategy that sat in each seat.
+
+    Methods:
+        by_strategy(seating): GameResult
+            The same result indexed by strategy, for a game in which seat i
+            was taken by strategy seating[i].
+"""
+
+
+class GameResult:
+    def __init__(
+        self, seed, winner, turns, eliminations, max_coins, final_coins, seating=None
+    ):
+        self.seed = seed
+        self.winner = winner
+        self.turns = turns
+        self.eliminations = eliminations
+        self.max_coins = max_coins
+        self.final_coins = final_coins
+        self.seating = seating
+
+    def by_strategy(self, seating):
+        order = sorted(range(len(seating)), key=seating.__getitem__)
+        return GameResult(
+            self.seed,
+            seating[self.winner] if self.winner is not None else None,
+            self.turns,
+            tuple((seating[seat], turn) for seat, turn in self.eliminations),
+            tuple(self.max_coins[seat] for seat in order),
+            tuple(self.final_coins[seat] for seat in order),
+            tuple(seating),
+        )
+
+    def __repr__(self):
+        return (
+            f"GameResult(seed={self.seed}, winner={self.winner}, "
+            f"turns={self.turns}, eliminations={self.eliminations})"
+        )
+
+
+"""
+Result Recorder Class
+
+    Observer used by run_games to collect the information for a GameResult
+    while a game is played. It only does integer bookkeeping, so it adds no
+    string formatting to the hot loop.
+
+    Methods:
+        on_game_start(gamestate):
+            Reset the per-game tallies.
+        on_turn_end(gamestate):
+            Update the coin maxima and record newly eliminated players.
+        on_game_over(gamestate, winner):
+            Store the winner's seat and the final coins.
+        result(seed): GameResult
+"""
+
+
+class ResultRecorder(GameObserver):
+    def __init__(self):
+        self.players = []
+        self.alive = []
+        self.eliminations = []
+        self.max_coins = []
+        self.final_coins = ()
+        self.winner = None
+        self.turns = 0
+
+    def on_game_start(self, gamestate):
+        self.players = gamestate.players
+        self.alive = [True] * len(self.players)
+        self.eliminations = []
+        self.max_coins = [player.coins for player in self.players]
+        self.winner = None
+        self.turns = 0
+
+    def on_turn_end(self, gamestate):
+        max_coins = self.max_coins
+        for seat, player in enumerate(self.players):
+            if player.coins > max_coins[seat]:
+                max_coins[seat] = player.coins
+            if self.alive[seat] and not player.is_alive():
+                self.alive[seat] = False
+                self.eliminations.append((seat, gamestate.turn_number))
+        self.turns = gamestate.turn_number
+
+    def on_game_over(self, gamestate, winner):
+        self.winner = self.players.index(winner) if winner is not None else None
+        self.final_coins = tuple(player.coins for player in self.players)
+
+    def result(self, seed):
+        return GameResult(
+            seed,
+            self.winner,
+            self.turns,
+            tuple(self.eliminations),
+            tuple(self.max_coins),
+            self.final_coins,
+        )
@@ -0,0 +1,74 @@
+import sys
+from array import array
+
+"""
+Snapshot Class
+
+    An immutable copy of the mutable core of a GameState, made by
+    GameState.snapshot() and put back with GameState.restore(snapshot). Only
+    small integers are stored: players are referred to by seat, influences by
+    their Character value and actions by their compact action id, so a
+    snapshot shares the player names, strategies and action classes with the
+    GameState it is restored into rather than copying them. The same snapshot
+    can be restored any number of times, e.g. once per rollout, and into any
+    GameState with the same number of players, including one in another
+    process.
+
+    Fields:
+        data: tuple of int
+            The encoded state, laid out as:
+                turn number,
+                number of players in the turn tracker, their seats,
+                for each player: coins, number of hidden influences, the hidden
+                    influences, number of revealed influences, the revealed
+                    influences,
+                deck kind (DECK_CARDS or DECK_COUNTS), length of the deck
+                    state, the deck state,
+                number of actions on the stack, then (action id, user seat,
+                    succeeds) for each of them.
+
+    Methods:
+        to_bytes(): bytes
+            Two bytes per integer, little endian whatever the machine, so the
+            bytes can be read on another one.
+        from_bytes(data): Snapshot
+            @staticmethod, the inverse of to_bytes.
+
+    Snapshots pickle as their byte form.
+"""
+
+DECK_CARDS = 0
+DECK_COUNTS = 1
+
+
+class Snapshot:
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = tuple(data)
+
+    def to_bytes(self):
+        values = array("H", self.data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values.tobytes()
+
+    @staticmethod
+    def from_bytes(data):
+        values = array("H")
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return Snapshot(values)
+
+    def __reduce__(self):
+        return Snapshot.from_bytes, (self.to_bytes(),)
+
+    def __eq__(self, other):
+        return isinstance(other, Snapshot) and self.data == other.data
+
+    def __hash__(self):
+        return hash(self.data)
+
+    def __len__(self):
+        return len(self.data)
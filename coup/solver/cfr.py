@@ -0,0 +1,477 @@
+import random
+from array import array
+
+from coup.compact import (
+    ACTIVE,
+    COINS,
+    DECK,
+    DRAW,
+    HIDDEN,
+    NUM_CHARACTERS,
+    PHASE,
+    PHASE_DRAW,
+    PHASE_GAME_OVER,
+    REVEALED,
+    STACK,
+    STACK_SIZE,
+    TASK_COUNT,
+    TASKS,
+    TO_MOVE,
+    action_type,
+    deal,
+    iter_actions,
+    legal_actions,
+    num_influences,
+    step,
+    winner,
+)
+from coup.strategy import CompactStrategy
+
+"""
+Monte Carlo counterfactual regret minimization for 2-player Coup.
+
+    Outcome sampling MCCFR over the compact game core (see coup/compact.py,
+    which follows coup/action.py and Game.handle_turn, and CompactGame): each
+    iteration deals a game, samples a single trajectory through it and
+    updates the regrets of the traversing player's information sets along
+    it, alternating the traversing player between iterations.
+
+    Information sets are abstracted (see infoset_key): a player remembers
+    their own hand, the coins (capped at MAX_COINS), the revealed cards, how
+    many influences the opponent has, the action stack and the pending
+    tasks, but not the rest of the history. Each key is hashed to 64 bits
+    and stored in an InfoSetTable; a move is stored under its rank among the
+    legal moves, which the key determines.
+
+    Average strategies can be played with CFRStrategy.
+"""
+
+MAX_COINS = 12
+MASK_64 = (1 << 64) - 1
+
+
+def infoset_key(state, seat):
+    """
+    Return the 64 bit hash of the abstracted information set of seat, who is
+    to move in state. Seats are stored relative to seat, so both players
+    share one table.
+    """
+    other = 1 - seat
+    own = HIDDEN + seat * NUM_CHARACTERS
+    own_revealed = REVEALED + seat * NUM_CHARACTERS
+    other_revealed = REVEALED + other * NUM_CHARACTERS
+    stack = []
+    for entry in range(STACK, STACK + 3 * state[STACK_SIZE], 3):
+        stack.append(action_type(state[entry]))
+        stack.append(state[entry + 1] == seat)
+        stack.append(state[entry + 2])
+    tasks = []
+    for task in range(TASKS, TASKS + 3 * state[TASK_COUNT], 3):
+        tasks.append(state[task])
+        tasks.append(state[task + 1] == seat)
+        tasks.append(state[task + 2])
+    key = (
+        state[PHASE],
+        state[ACTIVE] == seat,
+        min(state[COINS + seat], MAX_COINS),
+        min(state[COINS + other], MAX_COINS),
+        num_influences(state, other),
+        tuple(state[own : own + NUM_CHARACTERS]),
+        tuple(state[own_revealed : own_revealed + NUM_CHARACTERS]),
+        tuple(state[other_revealed : other_revealed + NUM_CHARACTERS]),
+        tuple(stack),
+        tuple(tasks),
+    )
+    return hash(key) & MASK_64
+
+
+"""
+Info Set Table Class
+
+    Regrets and average strategy sums of up to 2 ** bits information sets,
+    in flat arrays. Each slot holds a 64 bit key and WIDTH float32 regrets and
+    strategy sums, indexed by the rank of a move among the legal moves, so an
+    information set takes BYTES_PER_INFOSET bytes. Keys are placed by linear
+    probing over at most PROBES slots, when all of them are taken the first
+    one is cleared and reused.
+
+    Fields:
+        bits: int
+        keys: array of uint64, 0 for an empty slot.
+        regrets: array of float32
+        strategy_sums: array of float32
+        used: int, the number of slots taken.
+        iterations: int, the iterations of the solver that filled the table.
+
+    Methods:
+        find(key): int
+            The slot of key, or -1.
+        slot(key): int
+            The slot of key, taking a new one if needed.
+        current_strategy(slot, num_moves): list of float
+            Regret matching over the first num_moves regrets.
+        average_strategy(slot, num_moves): list of float
+        save(path):
+        load(path): InfoSetTable
+            @staticmethod
+        from_buffers(bits, keys, regrets, strategy_sums): InfoSetTable
+            @staticmethod, a table over existing arrays or memoryviews, e.g.
+            views of shared memory (see coup/solver/parallel.py).
+"""
+
+WIDTH = 8
+PROBES = 8
+BYTES_PER_INFOSET = 8 + 2 * 4 * WIDTH
+MAGIC = b"COUPCFR1"
+
+
+class InfoSetTable:
+    def __init__(self, bits=20):
+        self.bits = bits
+        self.size = 1 << bits
+        self.mask = self.size - 1
+        self.keys = array("Q", bytes(8 * self.size))
+        self.regrets = array("f", bytes(4 * WIDTH * self.size))
+        self.strategy_sums = array("f", bytes(4 * WIDTH * self.size))
+        self.used = 0
+        self.iterations = 0
+
+    def find(self, key):
+        key = key or 1
+        keys = self.keys
+        for probe in range(PROBES):
+            slot = (key + probe) & self.mask
+            if keys[slot] == key:
+                return slot
+            if keys[slot] == 0:
+                return -1
+        return -1
+
+    def slot(self, key):
+        key = key or 1
+        keys = self.keys
+        for probe in range(PROBES):
+            slot = (key + probe) & self.mask
+            if keys[slot] == key:
+                return slot
+            if keys[slot] == 0:
+                keys[slot] = key
+                self.used += 1
+                return slot
+        slot = key & self.mask
+        keys[slot] = key
+        start = slot * WIDTH
+        for index in range(start, start + WIDTH):
+            self.regrets[index] = 0.0
+            self.strategy_sums[index] = 0.0
+        return slot
+
+    def current_strategy(self, slot, num_moves):
+        start = slot * WIDTH
+        positive = [
+            regret if regret > 0.0 else 0.0
+            for regret in self.regrets[start : start + num_moves]
+        ]
+        total = sum(positive)
+        if total <= 0.0:
+            return [1.0 / num_moves] * num_moves
+        return [regret / total for regret in positive]
+
+    def average_strategy(self, slot, num_moves):
+        start = slot * WIDTH
+        sums = self.strategy_sums[start : start + num_moves]
+        total = sum(sums)
+        if total <= 0.0:
+            return [1.0 / num_moves] * num_moves
+        return [value / total for value in sums]
+
+    def save(self, path):
+        header = array("Q", [self.bits, self.used, self.iterations])
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            header.tofile(f)
+            f.write(self.keys)
+            f.write(self.regrets)
+            f.write(self.strategy_sums)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(path + " is not a CFR checkpoint")
+            header = array("Q")
+            header.fromfile(f, 3)
+            bits, used, iterations = header
+            keys = array("Q")
+            keys.fromfile(f, 1 << bits)
+            regrets = array("f")
+            regrets.fromfile(f, WIDTH << bits)
+            strategy_sums = array("f")
+            strategy_sums.fromfile(f, WIDTH << bits)
+        table = InfoSetTable.from_buffers(bits, keys, regrets, strategy_sums)
+        table.used = used
+        table.iterations = iterations
+        return table
+
+    @staticmethod
+    def from_buffers(bits, keys, regrets, strategy_sums):
+        table = InfoSetTable.__new__(InfoSetTable)
+        table.bits = bits
+        table.size = 1 << bits
+        table.mask = table.size - 1
+        table.keys = keys
+        table.regrets = regrets
+        table.strategy_sums = strategy_sums
+        table.used = 0
+        table.iterations = 0
+        return table
+
+
+"""
+Compact Game Class
+
+    The game CFRSolver samples: 2-player Coup over the compact core. The
+    solver only goes through these methods, so another 2-player zero-sum game
+    with the same methods can be solved as well (the tests solve Kuhn poker).
+
+    Methods:
+        deal(rng): state
+        chance(state, rng): move or None
+            A move sampled with its probability if state is a chance node,
+            else None.
+        is_over(state): bool
+        moves(state): list of moves
+        to_move(state): int
+        key(state, seat): int, the 64 bit key of the information set.
+        step(state, move): state
+        utility(state, seat): float, the payoff of seat once the game is over.
+"""
+
+
+class CompactGame:
+    def deal(self, rng):
+        return deal(2, rng)
+
+    def chance(self, state, rng):
+        if state[PHASE] == PHASE_DRAW:
+            return _draw(state, rng)
+        return None
+
+    def is_over(self, state):
+        return state[PHASE] == PHASE_GAME_OVER
+
+    def moves(self, state):
+        return list(iter_actions(legal_actions(state)))
+
+    def to_move(self, state):
+        return state[TO_MOVE]
+
+    def key(self, state, seat):
+        return infoset_key(state, seat)
+
+    def step(self, state, move):
+        return step(state, move)
+
+    def utility(self, state, seat):
+        return 1.0 if winner(state) == seat else -1.0
+
+
+"""
+CFR Solver Class
+
+    Fields:
+        table: InfoSetTable
+        game: CompactGame, or another game with its methods.
+        epsilon: float, how much of the traversing player's sampling policy
+            is uniform exploration.
+        max_moves: int, trajectories longer than this are scored as draws.
+        rng: random.Random
+        deltas: None, or an object with regrets and strategy_sums arrays and
+            slot(key), current_strategy(slot, num_moves) and touch(slot)
+            methods. When set, information sets are looked up and the updates
+            of iterate are added there instead of to the table, which is then
+            only read (see coup/solver/parallel.py).
+
+    Methods:
+        run(iterations):
+            Run outcome sampling iterations, alternating the traversing
+            player.
+        iterate(traverser):
+            Sample one trajectory and update the tables. Returns the number
+            of the traverser's decisions on the trajectory.
+        checkpoint(path):
+            Save the table, see InfoSetTable.save.
+        from_checkpoint(path, **kwargs): CFRSolver
+            @staticmethod
+
+    The update is the one of outcome sampling MCCFR: for the traverser's
+    information set I at history h on the sampled terminal history z, action
+    a is credited u(z) * pi_opponent(h) / q(z) * (pi(ha -> z) - pi(h -> z))
+    where q(z) is the probability of sampling z and pi(h -> z) the
+    probability of both players' current strategies playing from h to z.
+"""
+
+
+class CFRSolver:
+    def __init__(
+        self, bits=20, epsilon=0.6, max_moves=400, seed=None, table=None, game=None
+    ):
+        self.table = table if table is not None else InfoSetTable(bits)
+        self.game = game if game is not None else CompactGame()
+        self.epsilon = epsilon
+        self.max_moves = max_moves
+        self.rng = random.Random(seed)
+        self.deltas = None
+
+    def run(self, iterations):
+        for _ in range(iterations):
+            self.iterate(self.table.iterations % 2)
+            self.table.iterations += 1
+
+    def iterate(self, traverser):
+        table = self.table
+        game = self.game
+        rng = self.rng
+        epsilon = self.epsilon
+        deltas = self.deltas
+        if deltas is None:
+            regrets, sums = table.regrets, table.strategy_sums
+            lookup = table
+        else:
+            regrets, sums = deltas.regrets, deltas.strategy_sums
+            lookup = deltas
+        state = game.deal(rng)
+        # Forward pass: the decisions of both players, as (slot, moves,
+        # sampled rank, current strategy, opponent reach) for the traverser
+        # and (None, ..., current strategy, None) for the opponent, with the
+        # reach of both players.
+        trajectory = []
+        reach = [1.0, 1.0]
+        sample_reach = 1.0
+        for _ in range(self.max_moves):
+            if game.is_over(state):
+                break
+            move = game.chance(state, rng)
+            if move is not None:
+                state = game.step(state, move)
+                continue
+            moves = game.moves(state)
+            if len(moves) == 1:
+                state = game.step(state, moves[0])
+                continue
+            seat = game.to_move(state)
+            slot = lookup.slot(game.key(state, seat))
+            sigma = lookup.current_strategy(slot, len(moves))
+            if seat == traverser:
+                explore = epsilon / len(moves)
+                policy = [explore + (1.0 - epsilon) * p for p in sigma]
+                rank = _sample(policy, rng)
+                trajectory.append((slot, len(moves), rank, sigma, reach[1 - seat]))
+            else:
+                policy = sigma
+                rank = _sample(policy, rng)
+                trajectory.append((None, len(moves), rank, sigma, None))
+                # Stochastically weighted averaging of the opponent's strategy.
+                weight = reach[seat] / sample_reach
+                start = slot * WIDTH
+                for index, p in enumerate(sigma):
+                    sums[start + index] += weight * p
+                if deltas is not None:
+                    deltas.touch(slot)
+            reach[seat] *= sigma[rank]
+            sample_reach *= policy[rank]
+            state = game.step(state, moves[rank])
+
+        if game.is_over(state):
+            utility = game.utility(state, traverser)
+        else:
+            utility = 0.0
+        utility /= sample_reach
+        # Backward pass, tail is the probability of both players playing
+        # from after the decision to the end.
+        tail = 1.0
+        decisions = 0
+        for slot, num_moves, rank, sigma, opponent_reach in reversed(trajectory):
+            sampled = sigma[rank]
+            if slot is None:
+                tail *= sampled
+                continue
+            decisions += 1
+            if deltas is not None:
+                deltas.touch(slot)
+            weight = utility * opponent_reach
+            start = slot * WIDTH
+            for index in range(num_moves):
+                if index == rank:
+                    regrets[start + index] += weight * tail * (1.0 - sampled)
+                else:
+                    regrets[start + index] -= weight * tail * sampled
+            tail *= sampled
+        return decisions
+
+    def checkpoint(self, path):
+        self.table.save(path)
+
+    @staticmethod
+    def from_checkpoint(path, **kwargs):
+        return CFRSolver(table=InfoSetTable.load(path), **kwargs)
+
+
+"""
+CFR Strategy Class
+
+    Plays the average strategy of an InfoSetTable in 2-player games, sampling
+    each move. Information sets that are not in the table are played
+    uniformly at random. The strategy methods come from CompactStrategy (see
+    coup/strategy.py).
+
+    Fields:
+        table: InfoSetTable
+        rng: random.Random
+
+    Methods:
+        __init__(table, seed=None):
+            table is an InfoSetTable or the path of a checkpoint.
+        policy(state, seat): (list of action ids, list of float)
+"""
+
+
+class CFRStrategy(CompactStrategy):
+    def __init__(self, table, seed=None):
+        if not isinstance(table, InfoSetTable):
+            table = InfoSetTable.load(table)
+        self.table = table
+        self.rng = random.Random(seed)
+
+    def policy(self, state, seat):
+        moves = list(iter_actions(legal_actions(state)))
+        slot = self.table.find(infoset_key(state, seat))
+        if slot < 0:
+            return moves, [1.0 / len(moves)] * len(moves)
+        return moves, self.table.average_strategy(slot, len(moves))
+
+    def choose_action_id(self, gamestate, state, seat, known):
+        if len(gamestate.players) != 2:
+            raise ValueError("CFRStrategy only plays 2-player games")
+        moves, probabilities = self.policy(state, seat)
+        return moves[_sample(probabilities, self.rng)]
+
+
+def _sample(probabilities, rng):
+    remaining = rng.random()
+    for index, p in enumerate(probabilities):
+        remaining -= p
+        if remaining < 0.0:
+            return index
+    return len(probabilities) - 1
+
+
+def _draw(state, rng):
+    """
+    Draw a card at a chance node, weighted by the copies left in the deck.
+    """
+    remaining = rng.randrange(sum(state[DECK : DECK + NUM_CHARACTERS]))
+    for character in range(NUM_CHARACTERS):
+        remaining -= state[DECK + character]
+        if remaining < 0:
+            return DRAW + character
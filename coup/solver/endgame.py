@@ -0,0 +1,356 @@
+import mmap
+from array import array
+from itertools import combinations, combinations_with_replacement
+
+from coup.compact import (
+    ACTIVE,
+    AMBASSADOR,
+    ASSASSIN,
+    ASSASSINATE,
+    CAPTAIN,
+    COINS,
+    CONTESSA,
+    COPIES_PER_CHARACTER,
+    COUP,
+    DUKE,
+    EXCHANGE,
+    FOREIGN_AID,
+    HIDDEN,
+    INCOME,
+    NUM_CHARACTERS,
+    NUM_PLAYERS,
+    PHASE,
+    PHASE_ACTION,
+    REVEALED,
+    STEAL,
+    TAX,
+)
+
+"""
+Exact 2-player endgame tablebase.
+
+    Solves every position of a 2-player game at the start of a turn by
+    retrograde analysis, for perfect information, honest play: both players
+    know both hands (as they often do late in a game, once cards have been
+    revealed and exchanged), nobody claims a character they do not hold, and
+    so nobody challenges. What is left is a game of chance and perfect
+    information that can be solved exactly: the player to move chooses the
+    action, the opponent chooses whether to block (if they can) and which
+    influence to lose, and the two cards drawn by an Exchange are a chance
+    node over the Court deck.
+
+    A position is the player to move and their opponent, each given by their
+    coins and their hidden and revealed influences; in a 2-player game these
+    also fix the deck. Coins are capped at coin_cap (COIN_CAP by default,
+    more than that only matters for a third Coup): the coins gained past the
+    cap are lost, and positions in which a player holds more than coin_cap
+    coins are not in the table. Positions are solved in layers of
+    decreasing total influence, each layer by value iteration, since coins
+    can cycle through Steals.
+
+    Functions:
+        solve(tolerance=1e-7, coin_cap=COIN_CAP): (array of float, bytearray)
+            The win probability of the player to move and their best action
+            type for every index (see position_index), NO_ACTION for indices
+            that are not positions.
+        build_tablebase(path, tolerance=1e-7, coin_cap=COIN_CAP):
+            Solve and write the tablebase file: MAGIC, the coin cap as a
+            uint32, then the float32 values and the action bytes.
+        position_index(mover, other, coin_cap=COIN_CAP): int
+            mover and other are (coins, hidden, revealed) with sorted tuples
+            of characters, or -1 if there is no such position.
+"""
+
+COIN_CAP = 12
+NO_ACTION = 255
+MAGIC = b"COUPEND2"
+
+# The hidden and revealed influences a live player of a 2-player game can
+# have.
+CONFIGS = [
+    (hand, ()) for hand in combinations_with_replacement(range(NUM_CHARACTERS), 2)
+]
+CONFIGS += [
+    ((hand,), (lost,))
+    for hand in range(NUM_CHARACTERS)
+    for lost in range(NUM_CHARACTERS)
+]
+CONFIG_INDEX = {config: index for index, config in enumerate(CONFIGS)}
+NUM_CONFIGS = len(CONFIGS)
+
+
+def position_index(mover, other, coin_cap=COIN_CAP):
+    mover_config = CONFIG_INDEX.get((mover[1], mover[2]))
+    other_config = CONFIG_INDEX.get((other[1], other[2]))
+    if mover_config is None or other_config is None:
+        return -1
+    if not (0 <= mover[0] <= coin_cap and 0 <= other[0] <= coin_cap):
+        return -1
+    if _deck(mover_config, other_config) is None:
+        return -1
+    return _index(mover_config, other_config, mover[0], other[0], coin_cap + 1)
+
+
+def _num_positions(coin_cap):
+    return NUM_CONFIGS * NUM_CONFIGS * (coin_cap + 1) * (coin_cap + 1)
+
+
+def _index(mover_config, other_config, mover_coins, other_coins, num_coins):
+    return (
+        (mover_config * NUM_CONFIGS + other_config) * num_coins + mover_coins
+    ) * num_coins + other_coins
+
+
+def _deck(mover_config, other_config):
+    """
+    The deck left by two player configurations, or None if they hold more
+    than three copies of a character between them.
+    """
+    deck = [COPIES_PER_CHARACTER] * NUM_CHARACTERS
+    for config in (CONFIGS[mover_config], CONFIGS[other_config]):
+        for cards in config:
+            for character in cards:
+                deck[character] -= 1
+    if min(deck) < 0:
+        return None
+    return deck
+
+
+def _exchanges(mover_config, other_config):
+    """
+    The outcomes of an Exchange: (probability, configurations the mover can
+    keep) for every pair of cards they can draw.
+    """
+    hand, revealed = CONFIGS[mover_config]
+    deck = _deck(mover_config, other_config)
+    size = sum(deck)
+    outcomes = []
+    for first, second in combinations_with_replacement(range(NUM_CHARACTERS), 2):
+        if first == second:
+            ways = deck[first] * (deck[first] - 1)
+        else:
+            ways = 2 * deck[first] * deck[second]
+        if not ways:
+            continue
+        pool = sorted(hand + (first, second))
+        keeps = {
+            CONFIG_INDEX[(keep, revealed)] for keep in combinations(pool, len(hand))
+        }
+        outcomes.append((ways / (size * (size - 1)), sorted(keeps)))
+    return outcomes
+
+
+def solve(tolerance=1e-7, coin_cap=COIN_CAP):
+    num_coins = coin_cap + 1
+    values = array("d", [0.5]) * _num_positions(coin_cap)
+    actions = bytearray([NO_ACTION]) * _num_positions(coin_cap)
+    layers = {2: [], 3: [], 4: []}
+    for mover_config in range(NUM_CONFIGS):
+        for other_config in range(NUM_CONFIGS):
+            if _deck(mover_config, other_config) is not None:
+                total = len(CONFIGS[mover_config][0]) + len(CONFIGS[other_config][0])
+                layers[total].append((mover_config, other_config))
+    for total in (2, 3, 4):
+        pairs = [_Pair(mover, other, coin_cap) for mover, other in layers[total]]
+        while True:
+            change = 0.0
+            for pair in pairs:
+                for mover_coins in range(num_coins):
+                    for other_coins in range(num_coins):
+                        index = _index(
+                            pair.mover, pair.other, mover_coins, other_coins, num_coins
+                        )
+                        value, action = pair.evaluate(values, mover_coins, other_coins)
+                        change = max(change, abs(value - values[index]))
+                        values[index] = value
+                        actions[index] = action
+            if change < tolerance:
+                break
+    return values, actions
+
+
+"""
+Pair Class
+
+    Helper for solve, the actions open to the player to move between a
+    mover and an other configuration, which do not depend on the coins, in a
+    table capped at coin_cap coins.
+
+    Methods:
+        evaluate(values, mover_coins, other_coins): (float, int)
+            The best value and action type, given the current values of the
+            positions it leads to.
+"""
+
+
+class _Pair:
+    def __init__(self, mover, other, coin_cap):
+        self.mover = mover
+        self.other = other
+        self.coin_cap = coin_cap
+        hand = CONFIGS[mover][0]
+        other_hand = CONFIGS[other][0]
+        self.tax = DUKE in hand
+        self.assassinate = ASSASSIN in hand
+        self.steal = CAPTAIN in hand
+        self.exchange = _exchanges(mover, other) if AMBASSADOR in hand else ()
+        self.blocks_foreign_aid = DUKE in other_hand
+        self.blocks_assassination = CONTESSA in other_hand
+        self.blocks_stealing = CAPTAIN in other_hand or AMBASSADOR in other_hand
+        # The configurations the other player can be left with by losing an
+        # influence, none if they lose the game.
+        if len(other_hand) == 1:
+            self.losses = ()
+        else:
+            self.losses = [
+                CONFIG_INDEX[((other_hand[1 - position],), (other_hand[position],))]
+                for position in range(2)
+            ]
+
+    def evaluate(self, values, mover_coins, other_coins):
+        mover, other = self.mover, self.other
+        cap = self.coin_cap
+        num_coins = cap + 1
+
+        def passed(mover_config, coins, other_coins):
+            # The turn passes, the value is one minus the opponent's.
+            return 1.0 - values[
+                _index(other, mover_config, other_coins, coins, num_coins)
+            ]
+
+        def loss(coins):
+            if not self.losses:
+                return 1.0
+            return min(
+                1.0 - values[_index(lost, mover, other_coins, coins, num_coins)]
+                for lost in self.losses
+            )
+
+        if mover_coins >= 10:
+            return loss(mover_coins - 7), COUP
+        best = passed(mover, min(mover_coins + 1, cap), other_coins)
+        action = INCOME
+        value = passed(mover, min(mover_coins + 2, cap), other_coins)
+        if self.blocks_foreign_aid:
+            value = min(value, passed(mover, mover_coins, other_coins))
+        if value > best:
+            best, action = value, FOREIGN_AID
+        if self.tax:
+            value = passed(mover, min(mover_coins + 3, cap), other_coins)
+            if value > best:
+                best, action = value, TAX
+        if self.steal and other_coins:
+            stolen = min(2, other_coins)
+            value = passed(
+                mover, min(mover_coins + stolen, cap), other_coins - stolen
+            )
+            if self.blocks_stealing:
+                value = min(value, passed(mover, mover_coins, other_coins))
+            if value > best:
+                best, action = value, STEAL
+        if self.assassinate and mover_coins >= 3:
+            value = loss(mover_coins - 3)
+            if self.blocks_assassination:
+                value = min(value, passed(mover, mover_coins - 3, other_coins))
+            if value > best:
+                best, action = value, ASSASSINATE
+        if mover_coins >= 7:
+            value = loss(mover_coins - 7)
+            if value > best:
+                best, action = value, COUP
+        if self.exchange:
+            value = 0.0
+            for probability, keeps in self.exchange:
+                value += probability * max(
+                    passed(keep, mover_coins, other_coins) for keep in keeps
+                )
+            if value > best:
+                best, action = value, EXCHANGE
+        return best, action
+
+
+def build_tablebase(path, tolerance=1e-7, coin_cap=COIN_CAP):
+    values, actions = solve(tolerance, coin_cap)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        array("I", [coin_cap]).tofile(f)
+        array("f", values).tofile(f)
+        f.write(actions)
+
+
+"""
+Tablebase Class
+
+    A solved tablebase file, memory-mapped so that opening it costs nothing
+    and every lookup is O(1).
+
+    Fields:
+        coin_cap: int
+        values: float32 memoryview
+        actions: memoryview of bytes
+
+    Methods:
+        __init__(path):
+        lookup(mover, other): (float, int) or None
+            The win probability of the player to move and their best action
+            type, mover and other as for position_index, or None if it is not
+            a position of the table (e.g. a player holds more than coin_cap
+            coins).
+        probe(state): (float, int) or None
+            For a compact 2-player state at the start of a turn: the win
+            probability of the active player and their best action id. None
+            for any other state and for positions outside the table.
+        close():
+"""
+
+
+class Tablebase:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(path + " is not an endgame tablebase")
+        start = len(MAGIC) + 4
+        self.coin_cap = array("I", self._map[len(MAGIC) : start])[0]
+        num_positions = _num_positions(self.coin_cap)
+        self._view = memoryview(self._map)
+        self.values = self._view[start : start + 4 * num_positions].cast("f")
+        self.actions = self._view[start + 4 * num_positions :]
+
+    def lookup(self, mover, other):
+        index = position_index(mover, other, self.coin_cap)
+        if index < 0:
+            return None
+        return self.values[index], self.actions[index]
+
+    def probe(self, state):
+        if state[NUM_PLAYERS] != 2 or state[PHASE] != PHASE_ACTION:
+            return None
+        mover = state[ACTIVE]
+        result = self.lookup(_player(state, mover), _player(state, 1 - mover))
+        if result is None:
+            return None
+        value, action = result
+        if action in (COUP, ASSASSINATE, STEAL):
+            action += 1 - mover
+        return value, action
+
+    def close(self):
+        self.values.release()
+        self.actions.release()
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+
+def _player(state, seat):
+    """
+    Helper function for Tablebase.probe, (coins, hidden, revealed) of seat.
+    """
+    hidden = HIDDEN + seat * NUM_CHARACTERS
+    revealed = REVEALED + seat * NUM_CHARACTERS
+    return (
+        state[COINS + seat],
+        tuple(c for c in range(NUM_CHARACTERS) for _ in range(state[hidden + c])),
+        tuple(c for c in range(NUM_CHARACTERS) for _ in range(state[revealed + c])),
+    )
@@ -0,0 +1,415 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from coup.simulate import game_seed
+from coup.solver.cfr import WIDTH, CFRSolver, InfoSetTable
+
+"""
+Parallel MCCFR.
+
+    run_parallel(iterations, workers=None, bits=20, epoch=5000, seed=0,
+                 table=None, checkpoint=None, epsilon=0.6): InfoSetTable
+        Run iterations of outcome sampling MCCFR (see coup/solver/cfr.py)
+        spread over worker processes and return the resulting table. table
+        is an InfoSetTable to continue from. If checkpoint is a path the
+        table is saved there after every epoch.
+
+    The table lives in shared memory (SharedTable) and is only read during
+    an epoch: every worker plays its share of the epoch's iterations against
+    the strategy of the table at the start of the epoch and adds its updates
+    to its own DeltaRegion, so no two processes ever write the same floats
+    and no locks are needed.
+
+    A worker never writes the shared table, not even its keys. An
+    information set missing from the table (or whose probe sequence is
+    full) gets a pending slot in the worker's region, past the slots of the
+    table, and is played uniformly for the rest of the epoch, as a new
+    entry of the table would be. At the end of the epoch the parent process
+    inserts the pending keys of every region into the table, in region
+    order, and then the deltas are merged into the table in parallel, each
+    merge task owning a range of table slots (the shards of the table by
+    information set hash), reading only the slots the workers touched and
+    following pending slots to where their keys were inserted. When an
+    insertion evicts a key, the updates of the epoch for the evicted key are
+    dropped rather than credited to the new one. A worker has as many
+    pending slots as the table has slots; past that (a table far too small
+    for the epoch) new information sets share one discard slot whose updates
+    are dropped.
+
+    The worker playing share w of epoch e is seeded with
+    game_seed(seed, e * workers + w), so a run is reproducible for a given
+    number of workers.
+"""
+
+
+def run_parallel(
+    iterations,
+    workers=None,
+    bits=20,
+    epoch=5000,
+    seed=0,
+    table=None,
+    checkpoint=None,
+    epsilon=0.6,
+):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if table is not None:
+        bits = table.bits
+    shared = SharedTable.create(bits, table)
+    regions = [DeltaRegion.create(bits) for _ in range(workers)]
+    names = (shared.name, [region.name for region in regions])
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(bits, names, epsilon),
+        ) as executor:
+            done = shared.table.iterations
+            epoch_index = 0
+            while done < iterations:
+                size = min(epoch, iterations - done)
+                cuts = [
+                    done + size * worker // workers for worker in range(workers + 1)
+                ]
+                shares = [
+                    (worker, epoch_index, cuts[worker], cuts[worker + 1], seed)
+                    for worker in range(workers)
+                ]
+                list(executor.map(_play_epoch, shares))
+                _insert_pending(shared.table, regions)
+                slots = shared.table.size
+                bounds = [
+                    (slots * shard // workers, slots * (shard + 1) // workers)
+                    for shard in range(workers)
+                ]
+                list(executor.map(_merge_range, bounds))
+                for region in regions:
+                    region.clear_touched()
+                done += size
+                epoch_index += 1
+                shared.table.iterations = done
+                if checkpoint is not None:
+                    shared.table.used = shared.count_used()
+                    shared.table.save(checkpoint)
+        return shared.copy()
+    finally:
+        for region in regions:
+            region.close(unlink=True)
+        shared.close(unlink=True)
+
+
+"""
+Shared Table Class
+
+    An InfoSetTable whose keys, regrets and strategy sums are views of one
+    shared memory block.
+
+    Fields:
+        name: str, the name of the shared memory block.
+        table: InfoSetTable
+
+    Methods:
+        create(bits, table=None): SharedTable
+            @staticmethod, allocate a new block, copying table if given.
+        attach(name, bits): SharedTable
+            @staticmethod, open an existing block in another process.
+        copy(): InfoSetTable
+            A table in ordinary arrays with the same contents.
+        count_used(): int
+        close(unlink=False):
+"""
+
+
+class SharedTable:
+    def __init__(self, memory, bits):
+        self.memory = memory
+        self.name = memory.name
+        size = 1 << bits
+        buffer = memory.buf
+        keys = buffer[: 8 * size].cast("Q")
+        regrets = buffer[8 * size : (8 + 4 * WIDTH) * size].cast("f")
+        strategy_sums = buffer[(8 + 4 * WIDTH) * size : _table_bytes(bits)].cast("f")
+        self.table = InfoSetTable.from_buffers(bits, keys, regrets, strategy_sums)
+
+    @staticmethod
+    def create(bits, table=None):
+        memory = shared_memory.SharedMemory(create=True, size=_table_bytes(bits))
+        shared = SharedTable(memory, bits)
+        if table is not None:
+            shared.table.keys[:] = table.keys
+            shared.table.regrets[:] = table.regrets
+            shared.table.strategy_sums[:] = table.strategy_sums
+            shared.table.used = table.used
+            shared.table.iterations = table.iterations
+        return shared
+
+    @staticmethod
+    def attach(name, bits):
+        return SharedTable(shared_memory.SharedMemory(name=name), bits)
+
+    def copy(self):
+        arrays = []
+        for typecode, view in (
+            ("Q", self.table.keys),
+            ("f", self.table.regrets),
+            ("f", self.table.strategy_sums),
+        ):
+            values = array(typecode)
+            values.frombytes(view.cast("B"))
+            arrays.append(values)
+        table = InfoSetTable.from_buffers(self.table.bits, *arrays)
+        table.used = self.count_used()
+        table.iterations = self.table.iterations
+        return table
+
+    def count_used(self):
+        return sum(1 for key in self.table.keys if key)
+
+    def close(self, unlink=False):
+        self.table.keys.release()
+        self.table.regrets.release()
+        self.table.strategy_sums.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _table_bytes(bits):
+    return (8 + 8 * WIDTH) << bits
+
+
+"""
+Delta Region Class
+
+    The updates of one worker during an epoch, in one shared memory block:
+    regret and strategy sum deltas for the slots of the table followed by as
+    many pending slots and the discard slot (see run_parallel), a byte per
+    slot marking the slots
+    touched, the list of those slots, and the keys of the pending slots with
+    the table slots the parent inserted them in.
+
+    Fields:
+        name: str
+        size: int, the number of slots of the table.
+        regrets, strategy_sums: float32 memoryviews
+        marks: uint8 memoryview
+        touched: int32 memoryview
+        count: int64 memoryview of length 1, the length of touched.
+        pending: int64 memoryview of length 1, the number of pending slots.
+        pending_keys: uint64 memoryview
+        pending_slots: int32 memoryview, the table slot of each pending key
+            after insertion, -1 if its updates are dropped (always for the
+            discard slot, the last one).
+        table: InfoSetTable or None, the shared table, read by slot and
+            current_strategy in a worker.
+
+    Methods:
+        create(bits): DeltaRegion
+            @staticmethod
+        attach(name, bits, table=None): DeltaRegion
+            @staticmethod
+        start_epoch():
+            Forget the pending slots of the previous epoch and clear the
+            discard slot.
+        slot(key): int
+            The slot of key in the table, else its pending slot (size plus
+            its index among the pending keys), taking one if needed, or the
+            discard slot once they are all taken.
+        current_strategy(slot, num_moves): list of float
+            Regret matching in the table, uniform for a pending slot.
+        touch(slot):
+            Record that slot has an update.
+        touched_slots(): memoryview
+        drop(slot):
+            Zero the deltas of a slot, e.g. a table slot whose key was
+            evicted.
+        clear_touched():
+            Forget the touched slots, once they have been merged.
+        close(unlink=False):
+"""
+
+
+class DeltaRegion:
+    def __init__(self, memory, bits, table=None):
+        self.memory = memory
+        self.name = memory.name
+        self.size = size = 1 << bits
+        self.table = table
+        self._pending_index = {}
+        buffer = memory.buf
+        position = 16
+        self.count = buffer[:8].cast("q")
+        self.pending = buffer[8:position].cast("q")
+        self.pending_keys = buffer[position : position + 8 * size].cast("Q")
+        position += 8 * size
+        deltas = 4 * WIDTH * (2 * size + 1)
+        self.regrets = buffer[position : position + deltas].cast("f")
+        position += deltas
+        self.strategy_sums = buffer[position : position + deltas].cast("f")
+        position += deltas
+        self.touched = buffer[position : position + 8 * size + 4].cast("i")
+        position += 8 * size + 4
+        self.pending_slots = buffer[position : position + 4 * size + 4].cast("i")
+        position += 4 * size + 4
+        self.marks = buffer[position : position + 2 * size + 1]
+
+    @staticmethod
+    def create(bits):
+        size = 16 + ((8 + 16 * WIDTH + 8 + 4 + 2) << bits) + 8 * WIDTH + 9
+        region = DeltaRegion(shared_memory.SharedMemory(create=True, size=size), bits)
+        region.pending_slots[region.size] = -1
+        return region
+
+    @staticmethod
+    def attach(name, bits, table=None):
+        return DeltaRegion(shared_memory.SharedMemory(name=name), bits, table)
+
+    def start_epoch(self):
+        self.pending[0] = 0
+        self._pending_index.clear()
+        discard = 2 * self.size
+        self.marks[discard] = 0
+        self.drop(discard)
+
+    def slot(self, key):
+        key = key or 1
+        slot = self.table.find(key)
+        if slot >= 0:
+            return slot
+        index = self._pending_index.get(key)
+        if index is None:
+            index = self.pending[0]
+            if index == self.size:
+                return 2 * self.size
+            self.pending[0] = index + 1
+            self.pending_keys[index] = key
+            self._pending_index[key] = index
+            # A pending slot dropped last epoch still holds its deltas.
+            self.marks[self.size + index] = 0
+            self.drop(self.size + index)
+        return self.size + index
+
+    def current_strategy(self, slot, num_moves):
+        if slot < self.size:
+            return self.table.current_strategy(slot, num_moves)
+        return [1.0 / num_moves] * num_moves
+
+    def touch(self, slot):
+        if not self.marks[slot]:
+            self.marks[slot] = 1
+            count = self.count[0]
+            self.touched[count] = slot
+            self.count[0] = count + 1
+
+    def touched_slots(self):
+        return self.touched[: self.count[0]]
+
+    def drop(self, slot):
+        for offset in range(slot * WIDTH, slot * WIDTH + WIDTH):
+            self.regrets[offset] = 0.0
+            self.strategy_sums[offset] = 0.0
+
+    def clear_touched(self):
+        self.count[0] = 0
+
+    def close(self, unlink=False):
+        for view in (
+            self.count,
+            self.pending,
+            self.pending_keys,
+            self.regrets,
+            self.strategy_sums,
+            self.touched,
+            self.pending_slots,
+            self.marks,
+        ):
+            view.release()
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _insert_pending(table, regions):
+    """
+    Insert the pending keys of every region into the table, between the
+    epoch and the merge, and record the slot of each. A key evicted by an
+    insertion loses the updates of the epoch, in every region.
+    """
+    placed = {}
+    for region in regions:
+        for index in range(region.pending[0]):
+            key = region.pending_keys[index]
+            slot = table.find(key)
+            if slot < 0:
+                used = table.used
+                slot = table.slot(key)
+                if table.used == used:
+                    for other in regions:
+                        other.drop(slot)
+                    for owner, owner_index in placed.pop(slot, ()):
+                        owner.pending_slots[owner_index] = -1
+            region.pending_slots[index] = slot
+            placed.setdefault(slot, []).append((region, index))
+
+
+_worker_solver = None
+_worker_shared = None
+_worker_regions = None
+
+
+def _init_worker(bits, names, epsilon):
+    """
+    Pool initializer, attach the shared table and every delta region once
+    per worker process.
+    """
+    global _worker_solver, _worker_shared, _worker_regions
+    table_name, region_names = names
+    _worker_shared = SharedTable.attach(table_name, bits)
+    _worker_regions = [
+        DeltaRegion.attach(name, bits, _worker_shared.table) for name in region_names
+    ]
+    _worker_solver = CFRSolver(table=_worker_shared.table, epsilon=epsilon)
+
+
+def _play_epoch(share):
+    worker, epoch_index, start, stop, seed = share
+    solver = _worker_solver
+    solver.rng.seed(game_seed(seed, epoch_index * len(_worker_regions) + worker))
+    solver.deltas = _worker_regions[worker]
+    solver.deltas.start_epoch()
+    for iteration in range(start, stop):
+        solver.iterate(iteration % 2)
+    solver.deltas = None
+
+
+def _merge_range(bounds):
+    """
+    Add the deltas of every worker for the table slots in [start, stop),
+    including the pending slots inserted there, to the table and zero them
+    again.
+    """
+    start, stop = bounds
+    table = _worker_shared.table
+    regrets, sums = table.regrets, table.strategy_sums
+    for region in _worker_regions:
+        delta_regrets, delta_sums, marks = (
+            region.regrets,
+            region.strategy_sums,
+            region.marks,
+        )
+        size, pending_slots = region.size, region.pending_slots
+        for touched in region.touched_slots():
+            slot = touched if touched < size else pending_slots[touched - size]
+            if not start <= slot < stop:
+                continue
+            marks[touched] = 0
+            delta = touched * WIDTH
+            for index in range(slot * WIDTH, slot * WIDTH + WIDTH):
+                regrets[index] += delta_regrets[delta]
+                sums[index] += delta_sums[delta]
+                delta_regrets[delta] = 0.0
+                delta_sums[delta] = 0.0
+                delta += 1
@@ -1,6 +1,20 @@
+from abc import ABC, abstractmethod
+
 from coup.influence import *
 from coup.action import *
-from random import choice, choices
+from coup.compact import (
+    LOSE,
+    PASS,
+    PHASE_LOSE,
+    PHASE_RESPONSE,
+    PHASE_RETURN,
+    RETURN,
+    TASK_EXCHANGE_RETURN,
+    TASK_LOSE,
+    TASK_REPLACE,
+    step,
+)
+from coup.deck import CHARACTERS
 
 """
 Honest Strategy Class
@@ -96,9 +110,9 @@ class HonestStrategy:
             return target_player.hidden_influences[0]
         if self._has_single_duke(target_player):
             for influence in target_player.hidden_influences:
-                if not isinstance(influence, Duke):
+                if influence != Duke:
                     return influence
-        return choice(target_player.hidden_influences)
+        return gamestate.rng.choice(target_player.hidden_influences)
 
     def player_exchange_strategy(self, gamestate):
         """
@@ -106,15 +120,12 @@ class HonestStrategy:
         these two cards in a new list of cards_to_return, and returns the
         remaining influence cards as the cards to keep.
         """
-        cards_to_keep = []
+        cards_to_keep = list(gamestate.get_active_player().hidden_influences)
         cards_to_return = []
-        player = gamestate.get_active_player()
         for _ in range(2):
-            card_to_return = choice(player.hidden_influences)
+            card_to_return = gamestate.rng.choice(cards_to_keep)
             cards_to_return.append(card_to_return)
-            player.hidden_influences.remove(card_to_return)
-        for card in player.hidden_influences:
-            cards_to_keep.append(card)
+            cards_to_keep.remove(card_to_return)
         return cards_to_keep, cards_to_return
 
     def _get_coup_target(self, gamestate):
@@ -140,18 +151,14 @@ class HonestStrategy:
         max_coin_players = [
             player for player in max_influence_players if player.coins == max_coins
         ]
-        return choice(max_coin_players)
+        return gamestate.rng.choice(max_coin_players)
 
     def _has_single_duke(self, player):
         """
         Returns true if one and only one of the player's hidden influences is a
         Duke.
         """
-        dukes = 0
-        for influence in player.hidden_influences:
-            if isinstance(influence, Duke):
-                dukes += 1
-        return dukes == 1
+        return player.hidden_influences.count(Duke) == 1
 
 
 """
@@ -175,8 +182,9 @@ Manual Input Strategy Class
                 - action: Action or None
             
             Description:
-                Print the game state then get a list of legal actions and ask
-                the user to choose one. Return the chosen action.
+                Print the game state then get a list of legal counteractions
+                and ask the user to choose one, or none. Return the chosen
+                counteraction.
         
         influence_loss_strategy:
             Inputs:
@@ -216,9 +224,7 @@ class ManualInputStrategy:
 
     def counteraction_strategy(self, gamestate, countering_player):
         gamestate.print_game_state(countering_player)
-        legal_actions = [
-            action for action in gamestate.get_legal_actions(countering_player)
-        ]
+        legal_actions = gamestate.get_legal_responses(countering_player)
         legal_actions.append(None)
         # Get the user's choice
         return self._get_user_choice(
@@ -236,21 +242,20 @@ class ManualInputStrategy:
             return target_player.hidden_influences[0]
 
     def player_exchange_strategy(self, gamestate):
-        gamestate.print_game_state()
         active_player = gamestate.get_active_player()
+        gamestate.print_game_state(active_player)
         # Get the user's choice
         print("Choose two of your influence cards to return to the deck.")
+        cards_to_keep = list(active_player.hidden_influences)
         first_card = self._get_user_choice(
-            active_player.hidden_influences, message="First influnce card to return."
+            cards_to_keep, message="First influnce card to return."
         )
+        cards_to_keep.remove(first_card)
         second_card = self._get_user_choice(
-            active_player.hidden_influences, message="Second influence card to return."
+            cards_to_keep, message="Second influence card to return."
         )
-        return [first_card, second_card], [
-            card
-            for card in active_player.hidden_influences
-            if card not in [first_card, second_card]
-        ]
+        cards_to_keep.remove(second_card)
+        return cards_to_keep, [first_card, second_card]
 
     def _get_user_choice(self, options, message="Choose an option:"):
         print(message)
@@ -262,3 +267,82 @@ class ManualInputStrategy:
 
         # Return the chosen option
         return options[choice]
+
+
+"""
+Compact Strategy Class
+    Abstract base class for strategies that decide on coup/compact.py states (search
+    and solver strategies). It implements the four strategy methods by
+    converting each decision to a compact state and asking
+    choose_action_id for a compact action id:
+
+        - action_strategy: the active player's PHASE_ACTION state.
+        - counteraction_strategy: a PHASE_RESPONSE state, PASS means None.
+        - influence_loss_strategy: a PHASE_LOSE state. If the loss comes from
+          a lost challenge, the challenged player's card replacement is still
+          pending and the card they proved to hold is passed on as known.
+          Hands holding a single kind of card need no decision.
+        - player_exchange_strategy: two PHASE_RETURN decisions, one per card
+          returned.
+
+    Methods:
+        choose_action_id(gamestate, state, seat, known): int
+            @abstractmethod, every subclass must implement it: return a
+            legal action id for seat in the compact state. known lists
+            (seat, character) pairs of cards that other players are known to
+            hold.
+"""
+
+
+class CompactStrategy(ABC):
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        seat = gamestate.players.index(player)
+        action_id = self.choose_action_id(gamestate, gamestate.to_compact(), seat, ())
+        return gamestate.build_action(action_id, player)
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        seat = gamestate.players.index(countering_player)
+        state = gamestate.to_compact(PHASE_RESPONSE, countering_player)
+        action_id = self.choose_action_id(gamestate, state, seat, ())
+        if action_id == PASS:
+            return None
+        return gamestate.build_action(action_id, countering_player)
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        hand = target_player.hidden_influences
+        if hand[0] == hand[-1]:
+            return hand[0]
+        seat = gamestate.players.index(target_player)
+        tasks = [(TASK_LOSE, target_player, 0)]
+        known = ()
+        resolving = gamestate.action_stack.resolving
+        if resolving is not None and resolving.code == Challenge.code:
+            challenged = gamestate.action_stack.peek()
+            if resolving.user is target_player and challenged is not None:
+                requirement = int(challenged.requirement)
+                tasks.append((TASK_REPLACE, challenged.user, requirement))
+                known = ((gamestate.players.index(challenged.user), requirement),)
+        state = gamestate.to_compact(PHASE_LOSE, target_player, tasks)
+        action_id = self.choose_action_id(gamestate, state, seat, known)
+        return CHARACTERS[action_id - LOSE]
+
+    def player_exchange_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        seat = gamestate.players.index(player)
+        state = gamestate.to_compact(
+            PHASE_RETURN, player, ((TASK_EXCHANGE_RETURN, player, 2),)
+        )
+        cards_to_keep = list(player.hidden_influences)
+        cards_to_return = []
+        for _ in range(2):
+            action_id = self.choose_action_id(gamestate, state, seat, ())
+            card = CHARACTERS[action_id - RETURN]
+            cards_to_keep.remove(card)
+            cards_to_return.append(card)
+            state = step(state, action_id)
+        return cards_to_keep, cards_to_return
+
+    @abstractmethod
+    def choose_action_id(self, gamestate, state, seat, known):
+        pass
@@ -0,0 +1,167 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from coup.simulate import run_games
+
+"""
+Tournament runner.
+
+    run_tournament(strategies, n, master_seed, workers=None, shard_size=500,
+                   cache=None): TournamentResult
+        Play n games between the given strategies (one seat per strategy, in
+        the order given) and return the aggregated counts. The games are split
+        into shards of consecutive game indices which are played by a pool of
+        worker processes. Every game is seeded from master_seed and its index
+        (see coup.simulate.game_seed) and the counts are plain sums, so the
+        result is identical whatever the number of workers. With workers=1 the
+        games are played in the calling process. With a cache (see
+        coup/cache.py) the counts of every shard are looked up before any game
+        is played and only the missing shards are played, then stored.
+
+    play_shard(strategies, master_seed, start, stop): tuple
+        Play games start..stop-1 and return their counts in the compact tuple
+        form used by TournamentResult.add_counts, this is what the workers
+        send back instead of pickled Player or GameState objects. A game that
+        ends without a winner counts towards the games and turns but gives no
+        seat a win.
+"""
+
+
+def run_tournament(
+    strategies, n, master_seed, workers=None, shard_size=500, cache=None
+):
+    shards = [
+        (start, min(start + shard_size, n)) for start in range(0, n, shard_size)
+    ]
+    result = TournamentResult(len(strategies))
+    if cache is not None:
+        keys = {
+            shard: cache.key("tournament", strategies, master_seed, *shard)
+            for shard in shards
+        }
+        missing = []
+        for shard in shards:
+            counts = cache.get(keys[shard])
+            if counts is None:
+                missing.append(shard)
+            else:
+                result.add_counts(counts)
+        shards = missing
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(shards) <= 1:
+        played = (
+            play_shard(strategies, master_seed, start, stop) for start, stop in shards
+        )
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(strategies, master_seed),
+        )
+        with executor:
+            played = list(executor.map(_play_worker_shard, shards))
+    for shard, counts in zip(shards, played):
+        result.add_counts(counts)
+        if cache is not None:
+            cache.put(keys[shard], counts)
+    return result
+
+
+def play_shard(strategies, master_seed, start, stop):
+    num_seats = len(strategies)
+    wins = [0] * num_seats
+    eliminated = [0] * num_seats
+    turns = 0
+    for game_result in run_games(
+        strategies, stop - start, master_seed, start=start
+    ):
+        if game_result.winner is not None:
+            wins[game_result.winner] += 1
+        turns += game_result.turns
+        for seat, _ in game_result.eliminations:
+            eliminated[seat] += 1
+    return stop - start, turns, tuple(wins), tuple(eliminated)
+
+
+_worker_strategies = None
+_worker_master_seed = None
+
+
+def _init_worker(strategies, master_seed):
+    """
+    Pool initializer, the strategies are pickled once per worker process
+    rather than once per shard.
+    """
+    global _worker_strategies, _worker_master_seed
+    _worker_strategies = strategies
+    _worker_master_seed = master_seed
+
+
+def _play_worker_shard(shard):
+    start, stop = shard
+    return play_shard(_worker_strategies, _worker_master_seed, start, stop)
+
+
+"""
+Tournament Result Class
+
+    Aggregated counts over a set of games, indexed by seat.
+
+    Fields:
+        games: int
+        turns: int
+            Total number of turns over all of the games.
+        wins: list of int
+            Games without a winner are not counted for any seat.
+        eliminated: list of int
+            Number of games in which each seat was knocked out.
+
+    Methods:
+        add_counts(counts):
+            Add the counts returned by play_shard.
+        merge(other):
+            Add the counts of another TournamentResult.
+        win_rate(seat): float
+        draws(): int
+            Number of games that ended without a winner.
+        mean_turns(): float
+"""
+
+
+class TournamentResult:
+    def __init__(self, num_seats):
+        self.games = 0
+        self.turns = 0
+        self.wins = [0] * num_seats
+        self.eliminated = [0] * num_seats
+
+    def add_counts(self, counts):
+        games, turns, wins, eliminated = counts
+        self.games += games
+        self.turns += turns
+        for seat in range(len(self.wins)):
+            self.wins[seat] += wins[seat]
+            self.eliminated[seat] += eliminated[seat]
+
+    def merge(self, other):
+        self.add_counts((other.games, other.turns, other.wins, other.eliminated))
+
+    def win_rate(self, seat):
+        if not self.games:
+            return 0.0
+        return self.wins[seat] / self.games
+
+    def draws(self):
+        return self.games - sum(self.wins)
+
+    def mean_turns(self):
+        if not self.games:
+            return 0.0
+        return self.turns / self.games
+
+    def __repr__(self):
+        return (
+            f"TournamentResult(games={self.games}, wins={self.wins}, "
+            f"mean_turns={self.mean_turns():.2f})"
+        )
@@ -0,0 +1,256 @@
+import random
+from array import array
+from itertools import combinations_with_replacement
+
+from coup.compact import (
+    COPIES_PER_CHARACTER,
+    MAX_PLAYERS,
+    NUM_ACTIONS,
+    NUM_CHARACTERS,
+    STACK_DEPTH,
+)
+
+"""
+Zobrist Table Class
+
+    The random 64 bit keys the hash of a game state is built from.
+
+    Fields:
+        coins: per seat, one key per coin count (counts of MAX_COINS or more
+            share the last key).
+        hidden: per seat, a dict from sorted hand tuple to key.
+        revealed: per seat, a dict from sorted tuple of revealed influences to
+            key.
+        active: one key per seat, for the player whose turn it is.
+        stack: one key per (stack depth, action id, user seat, succeeds).
+
+    Methods:
+        __init__(seed=0):
+"""
+
+MAX_COINS = 32
+MAX_HAND = 4
+MASK_64 = (1 << 64) - 1
+
+
+def _hands(max_size):
+    """
+    Helper function for ZobristTable, every sorted tuple of at most max_size
+    characters that a player can hold.
+    """
+    hands = []
+    for size in range(max_size + 1):
+        for hand in combinations_with_replacement(range(NUM_CHARACTERS), size):
+            if all(hand.count(c) <= COPIES_PER_CHARACTER for c in set(hand)):
+                hands.append(hand)
+    return hands
+
+
+class ZobristTable:
+    def __init__(self, seed=0):
+        rng = random.Random(seed)
+        key = lambda: rng.getrandbits(64)
+        hands = _hands(MAX_HAND)
+        self.coins = [[key() for _ in range(MAX_COINS)] for _ in range(MAX_PLAYERS)]
+        self.hidden = [{hand: key() for hand in hands} for _ in range(MAX_PLAYERS)]
+        self.revealed = [{hand: key() for hand in hands} for _ in range(MAX_PLAYERS)]
+        self.active = [key() for _ in range(MAX_PLAYERS)]
+        self.stack = [
+            [[(key(), key()) for _ in range(MAX_PLAYERS)] for _ in range(NUM_ACTIONS)]
+            for _ in range(STACK_DEPTH)
+        ]
+
+
+"""
+Zobrist Hash Class
+
+    Incrementally maintained hash of a GameState, covering the coins and the
+    hidden and revealed influences of every player, the turn order (which is
+    fixed by the active player and who is still alive) and the contents of
+    the action stack. The deck composition is covered too, since it is the
+    fifteen card Court minus every player's hidden and revealed influences.
+
+    Creating a ZobristHash attaches it to the game state, which then keeps it
+    up to date: the hash of a player is refreshed whenever an action they
+    took part in is played or resolved, which is O(1) per action, and the
+    active player and the stack (at most three entries) are folded in when
+    the value is read. Undoing and restoring positions refreshes every
+    player.
+
+    Fields:
+        gamestate: GameState
+        table: ZobristTable
+        player_hashes: list of int, the current contribution of each seat.
+
+    Methods:
+        value(): int
+            The hash of the current state.
+        refresh(player):
+            Recompute the contribution of one player.
+        refresh_all():
+        on_resolve(action):
+            Called by the ActionStack after an action resolves.
+        detach():
+            Stop maintaining the hash.
+
+    compute_hash(gamestate, table): int
+        Compute the same hash from scratch.
+"""
+
+
+class ZobristHash:
+    def __init__(self, gamestate, table=None):
+        self.gamestate = gamestate
+        self.table = table if table is not None else ZobristTable()
+        self.seats = {player: seat for seat, player in enumerate(gamestate.players)}
+        self.player_hashes = [0] * len(gamestate.players)
+        self.players_hash = 0
+        gamestate.zobrist = self
+        self.refresh_all()
+
+    def value(self):
+        gamestate = self.gamestate
+        value = self.players_hash
+        active = gamestate.get_active_player()
+        if active is not None:
+            value ^= self.table.active[self.seats[active]]
+        for depth, action in enumerate(gamestate.action_stack.actions):
+            value ^= self._stack_key(depth, action)
+        return value
+
+    def refresh(self, player):
+        seat = self.seats[player]
+        table = self.table
+        player_hash = (
+            table.coins[seat][min(player.coins, MAX_COINS - 1)]
+            ^ table.hidden[seat][player.hidden_influences]
+            ^ table.revealed[seat][player.revealed_influences]
+        )
+        self.players_hash ^= self.player_hashes[seat] ^ player_hash
+        self.player_hashes[seat] = player_hash
+
+    def refresh_all(self):
+        for player in self.gamestate.players:
+            self.refresh(player)
+
+    def on_resolve(self, action):
+        self.refresh(action.user)
+        if action.target is not None:
+            self.refresh(action.target)
+        # A resolved Challenge also changes the hand of the challenged player.
+        challenged = self.gamestate.action_stack.peek()
+        if challenged is not None:
+            self.refresh(challenged.user)
+
+    def detach(self):
+        self.gamestate.zobrist = None
+
+    def _stack_key(self, depth, action):
+        action_id = self.gamestate.get_action_id(action)
+        return self.table.stack[depth][action_id][self.seats[action.user]][
+            action.succeeds
+        ]
+
+
+def compute_hash(gamestate, table):
+    seats = {player: seat for seat, player in enumerate(gamestate.players)}
+    value = 0
+    for seat, player in enumerate(gamestate.players):
+        value ^= table.coins[seat][min(player.coins, MAX_COINS - 1)]
+        value ^= table.hidden[seat][player.hidden_influences]
+        value ^= table.revealed[seat][player.revealed_influences]
+    active = gamestate.get_active_player()
+    if active is not None:
+        value ^= table.active[seats[active]]
+    for depth, action in enumerate(gamestate.action_stack.actions):
+        action_id = gamestate.get_action_id(action)
+        value ^= table.stack[depth][action_id][seats[action.user]][action.succeeds]
+    return value
+
+
+"""
+Transposition Table Class
+
+    Fixed size table of search results keyed by Zobrist hash, allocated up
+    front as flat arrays (about 2 ** (bits + 1) * 20 bytes) and never grown.
+    Each bucket has two entries with a two-tier replacement policy: the first
+    keeps the result searched to the greatest depth, the second is always
+    replaced, so deep results survive while recent shallow ones are still
+    found.
+
+    Fields:
+        size: int, number of buckets.
+        hits, misses, stores: int, usage counters.
+
+    Methods:
+        __init__(bits=16):
+            Allocate 2 ** bits buckets.
+        probe(key): (depth, value, flag, move) or None
+        store(key, depth, value, flag, move=-1):
+            flag is one of EXACT, LOWER_BOUND, UPPER_BOUND and move a compact
+            action id (or -1).
+        clear():
+"""
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+EMPTY = -1
+
+
+class TranspositionTable:
+    def __init__(self, bits=16):
+        self.size = 1 << bits
+        self.mask = self.size - 1
+        entries = 2 * self.size
+        self.keys = array("Q", bytes(8 * entries))
+        self.depths = array("h", [EMPTY]) * entries
+        self.values = array("d", bytes(8 * entries))
+        self.flags = array("b", bytes(entries))
+        self.moves = array("b", [-1]) * entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def probe(self, key):
+        deep = 2 * (key & self.mask)
+        for slot in (deep, deep + 1):
+            if self.depths[slot] != EMPTY and self.keys[slot] == key:
+                self.hits += 1
+                return (
+                    self.depths[slot],
+                    self.values[slot],
+                    self.flags[slot],
+                    self.moves[slot],
+                )
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, move=-1):
+        key &= MASK_64
+        deep = 2 * (key & self.mask)
+        self.stores += 1
+        if self.keys[deep] == key or depth >= self.depths[deep]:
+            if self.keys[deep] != key and self.depths[deep] != EMPTY:
+                # The old deep entry gets a second chance in the other tier.
+                self._copy(deep, deep + 1)
+            slot = deep
+        else:
+            slot = deep + 1
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.values[slot] = value
+        self.flags[slot] = flag
+        self.moves[slot] = move
+
+    def clear(self):
+        for slot in range(2 * self.size):
+            self.depths[slot] = EMPTY
+        self.hits = self.misses = self.stores = 0
+
+    def _copy(self, source, destination):
+        self.keys[destination] = self.keys[source]
+        self.depths[destination] = self.depths[source]
+        self.values[destination] = self.values[source]
+        self.flags[destination] = self.flags[source]
+        self.moves[destination] = self.moves[source]
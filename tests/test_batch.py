@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from coup import compact
+from coup.batch import GameBatch, HonestBatchPolicy, run_batch
+from coup.simulate import run_games
+from coup.strategy import HonestStrategy
+
+
+class RecordingPolicy(HonestBatchPolicy):
+    """
+    HonestBatchPolicy that remembers the decisions of the last step, by game.
+    """
+
+    def __init__(self):
+        self.actions = {}
+        self.losses = {}
+
+    def choose_actions(self, batch, rows):
+        action, target = super().choose_actions(batch, rows)
+        for row, kind, seat in zip(rows, action, target):
+            self.actions[int(row)] = (int(kind), int(seat))
+        return action, target
+
+    def choose_losses(self, batch, rows, seat):
+        slot = super().choose_losses(batch, rows, seat)
+        for row, card in zip(rows, slot):
+            self.losses[int(row)] = (seat, int(card))
+        return slot
+
+
+def _follow(state, batch, row, kind, seat, loss):
+    """
+    Make the move of one game of the batch on its compact state: the action,
+    nobody responding, and the card its target chose to lose.
+    """
+    action_id = kind if kind in (compact.INCOME, compact.TAX) else kind + seat
+    assert compact.legal_actions(state) >> action_id & 1
+    state = compact.step(state, action_id)
+    while state[compact.PHASE] == compact.PHASE_RESPONSE:
+        state = compact.step(state, compact.PASS)
+    if state[compact.PHASE] == compact.PHASE_LOSE:
+        lost_seat, slot = loss
+        assert state[compact.TO_MOVE] == lost_seat
+        card = int(batch.cards[row, lost_seat, slot])
+        state = compact.step(state, compact.LOSE + card)
+    assert state[compact.PHASE] in (compact.PHASE_ACTION, compact.PHASE_GAME_OVER)
+    return state
+
+
+def _assert_same(state, batch, row):
+    for seat in range(batch.num_players):
+        assert state[compact.COINS + seat] == batch.coins[row, seat]
+        hidden = [0] * compact.NUM_CHARACTERS
+        for slot in range(2):
+            if batch.hidden[row, seat, slot]:
+                hidden[batch.cards[row, seat, slot]] += 1
+        start = compact.HIDDEN + seat * compact.NUM_CHARACTERS
+        assert list(state[start : start + compact.NUM_CHARACTERS]) == hidden
+    if batch.done[row]:
+        assert compact.winner(state) == batch.winner[row]
+    else:
+        assert state[compact.ACTIVE] == batch.active[row]
+
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 6])
+def test_lockstep_games_follow_the_compact_engine(num_players):
+    policies = [RecordingPolicy() for _ in range(num_players)]
+    batch = GameBatch(200, num_players, np.random.default_rng(num_players))
+    states = [
+        compact.new_state(batch.cards[row].tolist()) for row in range(batch.num_games)
+    ]
+    while not batch.done.all():
+        live = batch.rows[~batch.done]
+        for policy in policies:
+            policy.actions.clear()
+            policy.losses.clear()
+        batch.step(policies)
+        actions = {}
+        losses = {}
+        for policy in policies:
+            actions.update(policy.actions)
+            losses.update(policy.losses)
+        for row in live:
+            kind, seat = actions[row]
+            states[row] = _follow(states[row], batch, row, kind, seat, losses.get(row))
+            _assert_same(states[row], batch, row)
+
+
+def test_win_rates_match_the_object_engine():
+    strategies = [HonestStrategy() for _ in range(3)]
+    games = 4000
+    wins = [0] * 3
+    for result in run_games(strategies, games, 11):
+        wins[result.winner] += 1
+    batch = run_batch([HonestBatchPolicy() for _ in range(3)], 40000, 11)
+    assert batch.unfinished == 0
+    for seat in range(3):
+        # About four standard errors of the object engine's estimate.
+        assert abs(batch.win_rate(seat) - wins[seat] / games) < 0.03
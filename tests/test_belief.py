@@ -0,0 +1,99 @@
+import random
+from math import comb
+
+from coup.belief import BeliefState
+from coup.game import Game
+from coup.observer import GameObserver
+from coup.player import Player
+
+
+class RandomLegalStrategy:
+    """
+    Plays random legal moves, claiming, blocking and challenging often, so
+    that every kind of evidence reaches the belief states.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        return self.rng.choice(gamestate.get_legal_actions(player))
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        responses = gamestate.get_legal_responses(countering_player)
+        if responses and self.rng.random() < 0.4:
+            return self.rng.choice(responses)
+        return None
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return self.rng.choice(target_player.hidden_influences)
+
+    def player_exchange_strategy(self, gamestate):
+        keep = list(gamestate.get_active_player().hidden_influences)
+        returned = []
+        for _ in range(2):
+            card = self.rng.choice(keep)
+            keep.remove(card)
+            returned.append(card)
+        return keep, returned
+
+
+class TrueHandCheck(GameObserver):
+    """
+    Checks after every action and every turn that each belief state gives the
+    true hand of every opponent a nonzero posterior.
+    """
+
+    def __init__(self, beliefs):
+        self.beliefs = beliefs
+        self.checks = 0
+
+    def check(self, gamestate):
+        for belief in self.beliefs:
+            for player in gamestate.players:
+                if player is belief.viewer:
+                    continue
+                hand = tuple(sorted(int(card) for card in player.hidden_influences))
+                assert belief.hand_distribution(player).get(hand, 0.0) > 0.0
+                self.checks += 1
+
+    def on_action(self, gamestate, action):
+        self.check(gamestate)
+
+    def on_turn_end(self, gamestate):
+        self.check(gamestate)
+
+
+def test_true_hands_keep_a_nonzero_posterior():
+    rng = random.Random(0)
+    checks = 0
+    for game_index in range(300):
+        random.seed(game_index)
+        players = [Player(str(seat), RandomLegalStrategy(rng)) for seat in range(3)]
+        beliefs = [BeliefState(player) for player in players]
+        check = TrueHandCheck(beliefs)
+        # The check runs after the belief states have seen each event.
+        Game(players, observers=beliefs + [check]).play()
+        checks += check.checks
+    assert checks > 3000
+
+
+def test_first_posterior_counts_the_unseen_cards():
+    random.seed(1)
+    strategy = RandomLegalStrategy(random.Random(1))
+    players = [Player(str(seat), strategy) for seat in range(2)]
+    belief = BeliefState(players[0])
+    game = Game(players, observers=[belief])
+    belief.on_game_start(game.gamestate)
+    unseen = [3] * 5
+    for card in players[0].hidden_influences:
+        unseen[int(card)] -= 1
+    distribution = belief.hand_distribution(players[1])
+    assert abs(sum(distribution.values()) - 1.0) < 1e-12
+    for hand, p in distribution.items():
+        if hand[0] == hand[1]:
+            ways = comb(unseen[hand[0]], 2)
+        else:
+            ways = unseen[hand[0]] * unseen[hand[1]]
+        assert abs(p - ways / comb(13, 2)) < 1e-12
@@ -0,0 +1,82 @@
+import importlib
+import os
+import sys
+
+from coup.cache import MatchupCache, strategy_key
+from coup.parametric import ParametricStrategy
+from coup.strategy import HonestStrategy
+from coup.tournament import run_tournament
+
+STRATEGY_SOURCE = """
+DEFAULT_RATE = {rate}
+
+
+class RatedStrategy:
+    def __init__(self, rate=None):
+        self.rate = DEFAULT_RATE if rate is None else rate
+
+    def __repr__(self):
+        return "RatedStrategy()" if self.rate == DEFAULT_RATE else repr(self.rate)
+"""
+
+
+def _load(tmp_path, rate):
+    (tmp_path / "rated_strategy.py").write_text(STRATEGY_SOURCE.format(rate=rate))
+    sys.modules.pop("rated_strategy", None)
+    importlib.invalidate_caches()
+    return importlib.import_module("rated_strategy").RatedStrategy()
+
+
+def test_key_covers_module_level_defaults(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    first = strategy_key(_load(tmp_path, 0.25))
+    second = strategy_key(_load(tmp_path, 0.875))
+    assert first is not None and second is not None
+    assert first != second
+    sys.modules.pop("rated_strategy", None)
+
+
+def test_key_depends_on_parameters():
+    assert strategy_key(ParametricStrategy()) == strategy_key(ParametricStrategy())
+    assert strategy_key(ParametricStrategy()) != strategy_key(
+        ParametricStrategy({"bluff_tax": 0.5})
+    )
+
+
+def test_tournament_reuses_cached_shards(tmp_path):
+    strategies = [HonestStrategy(), ParametricStrategy({"challenge_rate": 1.0})]
+    cache = MatchupCache(str(tmp_path))
+    played = run_tournament(strategies, 200, 7, workers=1, shard_size=50, cache=cache)
+    assert (cache.hits, len(cache)) == (0, 4)
+    cached = run_tournament(strategies, 200, 7, workers=1, shard_size=50, cache=cache)
+    assert cache.hits == 4
+    uncached = run_tournament(strategies, 200, 7, workers=1, shard_size=50)
+    for result in (cached, uncached):
+        assert (result.games, result.turns, result.wins) == (
+            played.games,
+            played.turns,
+            played.wins,
+        )
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = MatchupCache(str(tmp_path), max_entries=2)
+    keys = [
+        cache.key("test", [HonestStrategy()], 0, start, start + 1)
+        for start in range(3)
+    ]
+    cache.put(keys[0], [0])
+    cache.put(keys[1], [1])
+    assert cache.get(keys[0]) == [0]
+    cache.put(keys[2], [2])
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == [0]
+    assert cache.get(keys[2]) == [2]
+    leftovers = [
+        name
+        for _, _, names in os.walk(str(tmp_path))
+        for name in names
+        if name.endswith(".tmp")
+    ]
+    assert leftovers == []
+    assert len(MatchupCache(str(tmp_path))) == 2
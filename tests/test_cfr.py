@@ -0,0 +1,128 @@
+import random
+
+from coup.solver.cfr import CFRSolver, CompactGame
+
+"""
+Outcome sampling MCCFR against Kuhn poker, whose equilibrium is known: the
+first player's value is -1/18 and the exploitability of the average strategy
+goes to 0.
+
+A Kuhn state is (cards, history): the two cards dealt from J, Q, K (0, 1, 2)
+and the moves so far, "p" (check or fold) and "b" (bet or call).
+"""
+
+TERMINAL = ("pp", "bp", "bb", "pbp", "pbb")
+
+
+class KuhnGame:
+    def deal(self, rng):
+        return tuple(rng.sample(range(3), 2)), ""
+
+    def chance(self, state, rng):
+        return None
+
+    def is_over(self, state):
+        return state[1] in TERMINAL
+
+    def moves(self, state):
+        return ["p", "b"]
+
+    def to_move(self, state):
+        return len(state[1]) % 2
+
+    def key(self, state, seat):
+        return _key(state[0][seat], state[1])
+
+    def step(self, state, move):
+        return state[0], state[1] + move
+
+    def utility(self, state, seat):
+        return _payoff(state[0], state[1], seat)
+
+
+def _key(card, history):
+    return (card + 1) * 100 + int("1" + history.replace("p", "2").replace("b", "3"))
+
+
+def _payoff(cards, history, seat):
+    if history == "bp":
+        return 1.0 if seat == 0 else -1.0
+    if history == "pbp":
+        return -1.0 if seat == 0 else 1.0
+    stake = 2.0 if "b" in history else 1.0
+    return stake if cards[seat] > cards[1 - seat] else -stake
+
+
+def _average(table, card, history):
+    slot = table.find(_key(card, history))
+    if slot < 0:
+        return [0.5, 0.5]
+    return table.average_strategy(slot, 2)
+
+
+def _best_response(table, seat, card, history, weights):
+    """
+    The value to seat, holding card, of playing a best response from history
+    on, weights giving the probability of each card of the opponent.
+    """
+    if history in TERMINAL:
+        return sum(
+            weight * _payoff(_cards(seat, card, other), history, seat)
+            for other, weight in weights.items()
+        )
+    if len(history) % 2 == seat:
+        return max(
+            _best_response(table, seat, card, history + move, weights)
+            for move in "pb"
+        )
+    value = 0.0
+    for rank, move in enumerate("pb"):
+        reached = {
+            other: weight * _average(table, other, history)[rank]
+            for other, weight in weights.items()
+        }
+        value += _best_response(table, seat, card, history + move, reached)
+    return value
+
+
+def _cards(seat, card, other):
+    return (card, other) if seat == 0 else (other, card)
+
+
+def _value(table, cards, history=""):
+    """
+    The value to the first player of both playing the average strategy.
+    """
+    if history in TERMINAL:
+        return _payoff(cards, history, 0)
+    seat = len(history) % 2
+    strategy = _average(table, cards[seat], history)
+    return sum(
+        p * _value(table, cards, history + move) for p, move in zip(strategy, "pb")
+    )
+
+
+def _exploitability(table):
+    total = 0.0
+    for seat in range(2):
+        for card in range(3):
+            weights = {other: 1 / 6 for other in range(3) if other != card}
+            total += _best_response(table, seat, card, "", weights)
+    return total / 2
+
+
+def test_kuhn_poker_converges_to_equilibrium():
+    solver = CFRSolver(bits=10, seed=1, game=KuhnGame())
+    solver.run(100000)
+    deals = [(a, b) for a in range(3) for b in range(3) if a != b]
+    value = sum(_value(solver.table, cards) for cards in deals) / len(deals)
+    assert abs(value + 1 / 18) < 0.01
+    assert _exploitability(solver.table) < 0.02
+
+
+def test_coup_iterations_fill_the_table():
+    solver = CFRSolver(bits=12, seed=0, game=CompactGame())
+    solver.run(50)
+    assert solver.table.iterations == 50
+    assert any(solver.table.keys)
+    assert any(solver.table.strategy_sums)
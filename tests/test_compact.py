@@ -0,0 +1,215 @@
+import random
+
+import pytest
+
+from coup import compact
+from coup.action import (
+    Assassinate,
+    BlockAssassination,
+    BlockForeignAid,
+    BlockStealingAmbassador,
+    BlockStealingCaptain,
+    Challenge,
+    Coup,
+    Exchange,
+    ForeignAid,
+    Income,
+    Steal,
+    Tax,
+)
+from coup.deck import CountedDeck, Deck
+from coup.game import Game
+from coup.observer import GameObserver
+from coup.player import Player
+
+"""
+Cross-checks of the compact engine (coup/compact.py) against the object engine.
+
+    A CompactMirror plays random games through Game while stepping a compact
+    state along with every decision and every card drawn from the deck, and
+    checks at each step that both engines offer the same moves. At the end of
+    every turn the coins, influences and deck composition of the two are
+    compared, and the winners at the end of the game. With check_is_legal it
+    also compares GameState.legal_action_mask of every player with the is_legal
+    methods of the action classes at every decision.
+"""
+
+UNTARGETED = (Tax, Exchange, Income, ForeignAid)
+TARGETED = (Assassinate, Coup, Steal)
+RESPONSES = (
+    BlockAssassination,
+    BlockForeignAid,
+    BlockStealingAmbassador,
+    BlockStealingCaptain,
+    Challenge,
+)
+
+
+def _counts(cards):
+    counts = [0] * compact.NUM_CHARACTERS
+    for card in cards:
+        counts[int(card)] += 1
+    return counts
+
+
+def _is_legal_mask(gamestate, player):
+    """
+    The legal actions of the player as a bitmask, asking the is_legal method
+    of every action class.
+    """
+    mask = 0
+    for action in UNTARGETED + RESPONSES:
+        if action.is_legal(gamestate, player):
+            mask |= 1 << action.code
+    for seat, target in enumerate(gamestate.players):
+        if target is player:
+            continue
+        for action in TARGETED:
+            if action.is_legal(gamestate, player, target):
+                mask |= 1 << (action.code + seat)
+    return mask
+
+
+class CompactMirror:
+    """
+    Plays random legal moves and makes the same moves on a compact state.
+    """
+
+    def __init__(self, rng, check_is_legal=False):
+        self.rng = rng
+        self.check_is_legal = check_is_legal
+        self.state = None
+        self.players = None
+        self.positions = 0
+
+    def start(self, game):
+        gamestate = game.gamestate
+        self.players = gamestate.players
+        self.state = compact.new_state(
+            [
+                [int(card) for card in player.hidden_influences]
+                for player in self.players
+            ]
+        )
+        deck_draw = gamestate.deck.draw_card
+
+        def draw_card():
+            card = deck_draw()
+            assert self.state[compact.PHASE] == compact.PHASE_DRAW
+            self.state = compact.step(self.state, compact.DRAW + int(card))
+            return card
+
+        gamestate.deck.draw_card = draw_card
+
+    def compare_is_legal(self, gamestate):
+        if not self.check_is_legal:
+            return
+        for player in gamestate.players:
+            assert gamestate.legal_action_mask(player) == _is_legal_mask(
+                gamestate, player
+            )
+        self.positions += 1
+
+    def action_strategy(self, gamestate):
+        self.compare_is_legal(gamestate)
+        player = gamestate.get_active_player()
+        assert self.state[compact.PHASE] == compact.PHASE_ACTION
+        assert self.state[compact.ACTIVE] == self.players.index(player)
+        mask = gamestate.legal_action_mask(player)
+        assert mask == compact.legal_actions(self.state)
+        action_id = self.rng.choice(list(compact.iter_actions(mask)))
+        self.state = compact.step(self.state, action_id)
+        return gamestate.build_action(action_id, player)
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        self.compare_is_legal(gamestate)
+        mask = gamestate.legal_response_mask(countering_player)
+        seat = self.players.index(countering_player)
+        if (
+            self.state[compact.PHASE] != compact.PHASE_RESPONSE
+            or self.state[compact.TO_MOVE] != seat
+        ):
+            assert mask == 0
+            return None
+        assert mask == compact.legal_actions(self.state) & ~(1 << compact.PASS)
+        action_id = self.rng.choice(list(compact.iter_actions(mask)) + [None] * 2)
+        if action_id is None:
+            self.state = compact.step(self.state, compact.PASS)
+            return None
+        self.state = compact.step(self.state, action_id)
+        return gamestate.build_action(action_id, countering_player)
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        seat = self.players.index(target_player)
+        if (
+            self.state[compact.PHASE] != compact.PHASE_LOSE
+            or self.state[compact.TO_MOVE] != seat
+        ):
+            # The compact engine skips the choice when every card is the same.
+            assert len(set(map(int, target_player.hidden_influences))) == 1
+            return target_player.hidden_influences[0]
+        card = self.rng.choice(target_player.hidden_influences)
+        self.state = compact.step(self.state, compact.LOSE + int(card))
+        return card
+
+    def player_exchange_strategy(self, gamestate):
+        keep = list(gamestate.get_active_player().hidden_influences)
+        returned = []
+        for _ in range(2):
+            assert self.state[compact.PHASE] == compact.PHASE_RETURN
+            card = self.rng.choice(keep)
+            keep.remove(card)
+            returned.append(card)
+            self.state = compact.step(self.state, compact.RETURN + int(card))
+        return keep, returned
+
+
+class CompareTurns(GameObserver):
+    def __init__(self, mirror):
+        self.mirror = mirror
+
+    def on_turn_end(self, gamestate):
+        state = self.mirror.state
+        for seat, player in enumerate(gamestate.players):
+            hidden = compact.HIDDEN + compact.NUM_CHARACTERS * seat
+            revealed = compact.REVEALED + compact.NUM_CHARACTERS * seat
+            assert state[compact.COINS + seat] == player.coins
+            assert list(state[hidden : hidden + compact.NUM_CHARACTERS]) == _counts(
+                player.hidden_influences
+            )
+            assert list(
+                state[revealed : revealed + compact.NUM_CHARACTERS]
+            ) == _counts(player.revealed_influences)
+        assert list(compact.chance_weights(state)) == gamestate.deck.composition()
+        if gamestate.is_game_over():
+            assert compact.is_terminal(state)
+        else:
+            active = gamestate.get_active_player()
+            assert state[compact.ACTIVE] == gamestate.players.index(active)
+
+
+def _play(deck_class, num_players, games, check_is_legal=False):
+    mirror = CompactMirror(random.Random(num_players), check_is_legal)
+    for game_index in range(games):
+        random.seed(game_index)
+        players = [Player(str(seat), mirror) for seat in range(num_players)]
+        game = Game(players, observers=[CompareTurns(mirror)], deck=deck_class())
+        mirror.start(game)
+        winner = game.play()
+        assert compact.winner(mirror.state) == players.index(winner)
+    return mirror.positions
+
+
+@pytest.mark.parametrize("deck_class", [Deck, CountedDeck])
+@pytest.mark.parametrize("num_players", [2, 3, 4, 6])
+def test_compact_engine_follows_the_object_engine(deck_class, num_players):
+    _play(deck_class, num_players, 100)
+
+
+def test_legal_action_mask_agrees_with_is_legal():
+    positions = sum(
+        _play(deck_class, num_players, 150, check_is_legal=True)
+        for deck_class in (Deck, CountedDeck)
+        for num_players in (2, 3, 4, 6)
+    )
+    assert positions > 10000
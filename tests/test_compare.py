@@ -0,0 +1,88 @@
+import random
+
+from coup.compare import (
+    A_BETTER,
+    B_BETTER,
+    EQUIVALENT,
+    INCONCLUSIVE,
+    SPRT,
+    _play_task,
+    compare,
+)
+from coup.parametric import ParametricStrategy
+from coup.strategy import HonestStrategy
+
+STRONG = {
+    "challenge_rate": 1.0,
+    "bluff_tax": 0.3,
+    "assassinate_rate": 1.0,
+    "keep_contessa": 0.8,
+}
+
+
+def _sequential(rule, rng, edge, split=0.6, batch=50, max_deals=5000):
+    """
+    Run rule on synthetic deals: split one game each with probability split,
+    else swept by strategy_a with probability 1/2 + edge.
+    """
+    outcomes = [0] * 5
+    for _ in range(max_deals // batch):
+        for _ in range(batch):
+            if rng.random() < split:
+                outcomes[2] += 1
+            elif rng.random() < 0.5 + edge:
+                outcomes[4] += 1
+            else:
+                outcomes[0] += 1
+        decision = rule.decide(outcomes)
+        if decision != INCONCLUSIVE:
+            return decision
+    return INCONCLUSIVE
+
+
+def test_sprt_error_rates_hold_on_correlated_deals():
+    rng = random.Random(1)
+    rule = SPRT(0.05, 0.05, 0.05)
+    null = [_sequential(rule, rng, 0.0) for _ in range(200)]
+    false_differences = sum(decision in (A_BETTER, B_BETTER) for decision in null)
+    assert false_differences / len(null) <= 0.1
+    # A game win rate of 0.55 (delta) when 40% of the deals are sweeps.
+    shifted = [_sequential(rule, rng, 0.125) for _ in range(200)]
+    assert sum(decision == A_BETTER for decision in shifted) / len(shifted) >= 0.9
+
+
+def test_deals_pair_their_games():
+    strategies = (HonestStrategy(), ParametricStrategy(STRONG))
+    wins_a, wins_b, outcomes = _play_task((strategies, 3, 10, 60))
+    assert sum(outcomes) == 50
+    assert wins_a + wins_b <= 100
+    assert wins_a - wins_b == sum(
+        count * (index - 2) for index, count in enumerate(outcomes)
+    )
+
+
+def test_identical_strategies_are_equivalent():
+    result = compare(HonestStrategy(), HonestStrategy(), seed=1, batch_size=50)
+    assert result.decision == EQUIVALENT
+    assert result.games == 100
+
+
+def test_stronger_strategy_is_found_whatever_the_workers():
+    one = compare(ParametricStrategy(STRONG), HonestStrategy(), seed=2, batch_size=50)
+    two = compare(
+        ParametricStrategy(STRONG), HonestStrategy(), seed=2, batch_size=50, workers=2
+    )
+    assert one.decision == A_BETTER
+    assert (one.games, one.wins_a, one.outcomes) == (
+        two.games,
+        two.wins_a,
+        two.outcomes,
+    )
+
+
+def test_game_limit_is_never_exceeded():
+    strategies = (HonestStrategy(), ParametricStrategy(STRONG))
+    for max_games, games in ((1, 0), (5, 4), (7, 6), (8, 8)):
+        result = compare(*strategies, seed=3, batch_size=2, max_games=max_games)
+        assert result.decision == INCONCLUSIVE
+        assert (result.games, result.deals) == (games, games // 2)
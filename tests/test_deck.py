@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+
+import pytest
+
+from coup.deck import CHARACTERS, COPIES_PER_CHARACTER, CountedDeck, Deck
+from coup.influence import Ambassador, Captain, Duke
+
+
+def _pair_probability(first, second):
+    """
+    The probability of drawing first then second from a full Court.
+    """
+    size = COPIES_PER_CHARACTER * len(CHARACTERS)
+    left = COPIES_PER_CHARACTER - (first == second)
+    return COPIES_PER_CHARACTER / size * left / (size - 1)
+
+
+@pytest.mark.parametrize("deck_class", [Deck, CountedDeck])
+def test_draws_are_uniform_over_the_remaining_court(deck_class):
+    samples = 30000
+    deck = deck_class(random.Random(1))
+    pairs = Counter()
+    for _ in range(samples):
+        deck.reset()
+        pairs[tuple(deck.draw_cards(2))] += 1
+    assert len(pairs) == len(CHARACTERS) ** 2
+    for (first, second), count in pairs.items():
+        p = _pair_probability(first, second)
+        # Four standard errors of the frequency.
+        assert abs(count / samples - p) < 4 * (p * (1 - p) / samples) ** 0.5
+
+
+def test_returned_cards_can_be_drawn_again():
+    deck = CountedDeck(random.Random(2))
+    deck.set_state((0, 0, 0, 0, 0))
+    assert deck.size == 0
+    deck.return_card(Captain)
+    assert deck.draw_card() is Captain
+    deck.return_cards([Duke, Ambassador, Duke])
+    assert deck.composition() == [2, 0, 0, 1, 0]
+    assert sorted(deck.draw_cards(3)) == [Duke, Duke, Ambassador]
+    assert deck.size == 0
+
+
+def test_counts_follow_draws_returns_and_resets():
+    deck = CountedDeck(random.Random(3))
+    drawn = deck.draw_cards(6)
+    assert deck.size == sum(deck.composition()) == 9
+    for character in CHARACTERS:
+        assert deck.composition()[character] + drawn.count(character) == 3
+    deck.return_cards(drawn[:2])
+    state = deck.get_state()
+    assert deck.size == sum(state) == 11
+    deck.draw_cards(11)
+    deck.set_state(state)
+    assert (deck.get_state(), deck.size) == (state, 11)
+    deck.reset()
+    assert deck.composition() == [COPIES_PER_CHARACTER] * len(CHARACTERS)
+    assert deck.size == 15
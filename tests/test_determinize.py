@@ -0,0 +1,106 @@
+import random
+from collections import Counter
+from itertools import permutations
+
+from coup import compact
+from coup.determinize import DeterminizationSampler
+
+"""
+A position small enough to enumerate: five unseen cards (two Dukes, an
+Assassin, a Captain and a Contessa) dealt as a hand of two to the first
+opponent and a hand of one to the second, the other two staying in the deck.
+Every order of the five cards is equally likely, so the probability of a
+world is the share of the orders that deal it, times the likelihoods of its
+hands, normalized.
+"""
+
+UNSEEN = [2, 1, 1, 0, 1]
+SIZES = (2, 1)
+LIKELIHOODS = [
+    {(0, 0): 1.0, (0, 1): 0.3, (0, 2): 0.3, (0, 4): 0.3, (1, 2): 0.1},
+    None,
+]
+
+
+def _posterior(likelihoods=(None, None)):
+    cards = [c for c in range(compact.NUM_CHARACTERS) for _ in range(UNSEEN[c])]
+    weights = Counter()
+    for order in permutations(cards):
+        world = (tuple(sorted(order[:2])), (order[2],))
+        weight = 1.0
+        for hand, likelihood in zip(world, likelihoods):
+            if likelihood is not None:
+                weight *= likelihood.get(hand, 0.0)
+        weights[world] += weight
+    total = sum(weights.values())
+    return {world: weight / total for world, weight in weights.items() if weight}
+
+
+def _frequencies(worlds):
+    counts = Counter(worlds)
+    return {world: count / len(worlds) for world, count in counts.items()}
+
+
+def test_worlds_are_weighted_by_the_ways_to_deal_them():
+    worlds, cumulative = DeterminizationSampler().worlds(UNSEEN, SIZES)
+    weights = [b - a for a, b in zip([0.0] + cumulative, cumulative)]
+    enumerated = {
+        world: weight / cumulative[-1] for world, weight in zip(worlds, weights)
+    }
+    expected = _posterior()
+    assert enumerated.keys() == expected.keys()
+    for world, p in expected.items():
+        assert abs(enumerated[world] - p) < 1e-12
+
+
+def test_samples_follow_the_posterior():
+    samples = 40000
+    for likelihoods in ([None, None], LIKELIHOODS):
+        sampler = DeterminizationSampler(random.Random(2))
+        drawn = _frequencies(sampler.sample(UNSEEN, SIZES, samples, likelihoods))
+        expected = _posterior(likelihoods)
+        assert set(drawn) <= set(expected)
+        for world, p in expected.items():
+            # Four standard errors of the frequency.
+            tolerance = 4 * (p * (1 - p) / samples) ** 0.5 + 1e-9
+            assert abs(drawn.get(world, 0.0) - p) < tolerance
+
+
+def test_shuffled_deals_of_many_opponents_are_uniform():
+    unseen = [1, 1, 1, 1, 0]
+    sizes = (1, 1, 1, 1)
+    samples = 24000
+    sampler = DeterminizationSampler(random.Random(3))
+    drawn = _frequencies(sampler.sample(unseen, sizes, samples))
+    assert len(drawn) == 24
+    for p in drawn.values():
+        assert abs(p - 1 / 24) < 4 * (1 / 24 * 23 / 24 / samples) ** 0.5
+
+
+def test_sampled_states_keep_the_deck_composition():
+    rng = random.Random(4)
+    sampler = DeterminizationSampler(random.Random(5))
+    for _ in range(20):
+        state = compact.deal(4, rng)
+        seat = rng.randrange(4)
+        own = compact.HIDDEN + seat * compact.NUM_CHARACTERS
+        other = (seat + 1) % 4
+        start = compact.HIDDEN + other * compact.NUM_CHARACTERS
+        held = [c for c in range(compact.NUM_CHARACTERS) if state[start + c]]
+        known = [(other, held[0])]
+        for sampled in sampler.sample_states(state, seat, 50, known=known):
+            assert sampled[own : own + compact.NUM_CHARACTERS] == (
+                state[own : own + compact.NUM_CHARACTERS]
+            )
+            for character in range(compact.NUM_CHARACTERS):
+                total = sum(
+                    sampled[compact.HIDDEN + s * compact.NUM_CHARACTERS + character]
+                    for s in range(4)
+                )
+                assert total + sampled[compact.DECK + character] == (
+                    compact.COPIES_PER_CHARACTER
+                )
+            for s in range(4):
+                start_s = compact.HIDDEN + s * compact.NUM_CHARACTERS
+                assert sum(sampled[start_s : start_s + compact.NUM_CHARACTERS]) == 2
+            assert sampled[start + held[0]] > 0
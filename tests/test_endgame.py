@@ -0,0 +1,113 @@
+from array import array
+
+import pytest
+
+from coup import compact
+from coup.compact import ASSASSIN, ASSASSINATE, CAPTAIN, COUP, DUKE
+from coup.solver import endgame
+from coup.solver.endgame import (
+    COIN_CAP,
+    Tablebase,
+    build_tablebase,
+    position_index,
+    solve,
+)
+
+"""
+Positions of a table capped at 7 coins whose values can be worked out by
+hand, each player holding a single influence:
+
+    WIN_BY_COUP: the mover can Coup now and must, since the other player
+        holds an Assassin and 3 coins and would assassinate them next turn.
+    LOST: the same position the other way round, the mover cannot knock the
+        other player out this turn and loses the next.
+    WIN_BY_ASSASSINATION: the other player would Coup next turn, the mover
+        holds an Assassin, 3 coins, and the other player no Contessa.
+"""
+
+SMALL_CAP = 7
+MOVER = (7, (DUKE,), (CAPTAIN,))
+ASSASSIN_PLAYER = (3, (ASSASSIN,), (CAPTAIN,))
+WIN_BY_COUP = (MOVER, ASSASSIN_PLAYER)
+LOST = ((0,) + MOVER[1:], ASSASSIN_PLAYER)
+WIN_BY_ASSASSINATION = ((3, (ASSASSIN,), (DUKE,)), (7, (DUKE,), (DUKE,)))
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    """
+    The solved small table and the tablebase file built from it, solved once
+    since solving takes a few seconds.
+    """
+    solved = solve(tolerance=1e-2, coin_cap=SMALL_CAP)
+    path = str(tmp_path_factory.mktemp("endgame") / "endgame.bin")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(endgame, "solve", lambda tolerance, coin_cap: solved)
+        build_tablebase(path, coin_cap=SMALL_CAP)
+    tablebase = Tablebase(path)
+    yield solved, tablebase
+    tablebase.close()
+
+
+def _state(active, players):
+    """
+    A compact 2-player state at the start of the turn of seat active.
+    """
+    state = list(compact.new_state([[], []]))
+    state[compact.ACTIVE] = active
+    for seat, (coins, hidden, revealed) in enumerate(players):
+        state[compact.COINS + seat] = coins
+        for character in hidden:
+            state[compact.HIDDEN + seat * compact.NUM_CHARACTERS + character] += 1
+        for character in revealed:
+            state[compact.REVEALED + seat * compact.NUM_CHARACTERS + character] += 1
+    return tuple(state)
+
+
+def test_solved_values_match_hand_computed_positions(tables):
+    (values, actions), _ = tables
+    win = position_index(*WIN_BY_COUP, coin_cap=SMALL_CAP)
+    assert (values[win], actions[win]) == (1.0, COUP)
+    assert values[position_index(*LOST, coin_cap=SMALL_CAP)] == 0.0
+    assassination = position_index(*WIN_BY_ASSASSINATION, coin_cap=SMALL_CAP)
+    assert (values[assassination], actions[assassination]) == (1.0, ASSASSINATE)
+
+
+def test_tablebase_file_holds_the_solved_table(tables):
+    (values, actions), tablebase = tables
+    assert tablebase.coin_cap == SMALL_CAP
+    assert tablebase.values.tolist() == array("f", values).tolist()
+    assert bytes(tablebase.actions) == bytes(actions)
+    assert tablebase.lookup(*WIN_BY_COUP) == (1.0, COUP)
+
+
+def test_probe_targets_the_other_seat(tables):
+    _, tablebase = tables
+    mover, other = WIN_BY_ASSASSINATION
+    assert tablebase.probe(_state(0, (mover, other))) == (1.0, ASSASSINATE + 1)
+    assert tablebase.probe(_state(1, (other, mover))) == (1.0, ASSASSINATE)
+    assert tablebase.probe(_state(1, LOST[::-1]))[0] == 0.0
+
+
+def test_positions_outside_the_table_are_refused(tables):
+    _, tablebase = tables
+    mover, other = WIN_BY_COUP
+    rich = (SMALL_CAP + 1,) + mover[1:]
+    assert tablebase.lookup(rich, other) is None
+    assert tablebase.probe(_state(0, (rich, other))) is None
+    assert position_index((COIN_CAP + 1,) + mover[1:], other) == -1
+    assert position_index(mover, other) >= 0
+    three_players = compact.new_state([[DUKE], [ASSASSIN], [CAPTAIN]])
+    assert tablebase.probe(three_players) is None
+    responding = list(_state(0, WIN_BY_COUP))
+    responding[compact.PHASE] = compact.PHASE_RESPONSE
+    assert tablebase.probe(tuple(responding)) is None
+    # Four Dukes between the two players.
+    assert position_index((0, (DUKE, DUKE), ()), (0, (DUKE, DUKE), ())) == -1
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"NOTATABLE" + bytes(64))
+    with pytest.raises(ValueError):
+        Tablebase(str(path))
@@ -0,0 +1,101 @@
+import random
+
+from coup.action import (
+    RESPONSE_MASKS,
+    RESPONSES,
+    BlockAssassination,
+    BlockForeignAid,
+    BlockStealingAmbassador,
+    BlockStealingCaptain,
+    Challenge,
+)
+from coup.compact import iter_actions
+from coup.game import Game
+from coup.player import Player
+
+ALL_RESPONSES = (
+    BlockAssassination,
+    BlockForeignAid,
+    BlockStealingAmbassador,
+    BlockStealingCaptain,
+    Challenge,
+)
+
+
+def _is_legal_responses(gamestate, player):
+    """
+    The counteractions of the player as a bitmask, asking the is_legal method
+    of every response class.
+    """
+    mask = 0
+    for response in ALL_RESPONSES:
+        if response.is_legal(gamestate, player):
+            mask |= 1 << response.code
+    return mask
+
+
+class PolledPlayers:
+    """
+    Plays random legal moves and checks every time it is asked for a
+    counteraction that the player has one, that the response table agrees
+    with the is_legal methods for every player and that the players asked
+    before this one against the same action had no counteraction or passed.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.polls = 0
+        self.top = None
+        self.asked = []
+
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        return self.rng.choice(gamestate.get_legal_actions(player))
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        top = gamestate.action_stack.peek()
+        if top is not self.top:
+            self.top = top
+            self.asked = []
+        for player in gamestate.players:
+            mask = gamestate.legal_response_mask(player)
+            assert mask == _is_legal_responses(gamestate, player)
+            assert mask & ~RESPONSE_MASKS[top.code] == 0
+        assert gamestate.legal_response_mask(countering_player)
+        # Players are polled in seat order, skipping those with nothing to
+        # play and whoever made the action on top of the stack.
+        for player in gamestate.players:
+            if player is countering_player:
+                break
+            if player is not top.user and gamestate.legal_response_mask(player):
+                assert player in self.asked
+        self.asked.append(countering_player)
+        self.polls += 1
+        responses = gamestate.get_legal_responses(countering_player)
+        return self.rng.choice(responses + [None] * 3)
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return self.rng.choice(target_player.hidden_influences)
+
+    def player_exchange_strategy(self, gamestate):
+        cards = list(gamestate.get_active_player().hidden_influences)
+        self.rng.shuffle(cards)
+        return cards[2:], cards[:2]
+
+
+def test_response_table_lists_each_pending_action_type():
+    assert RESPONSE_MASKS.keys() == RESPONSES.keys()
+    for code, responses in RESPONSES.items():
+        assert list(iter_actions(RESPONSE_MASKS[code])) == sorted(
+            response.code for response in responses
+        )
+
+
+def test_only_players_with_a_counteraction_are_polled():
+    rng = random.Random(8)
+    strategy = PolledPlayers(rng)
+    for game in range(150):
+        random.seed(game)
+        players = [Player(str(seat), strategy) for seat in range(rng.randint(2, 6))]
+        Game(players).play()
+    assert strategy.polls > 3000
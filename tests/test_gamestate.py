@@ -0,0 +1,238 @@
+import pickle
+import random
+
+import pytest
+
+from coup.action import Action, Assassinate, Coup
+from coup.compact import PASS, iter_actions
+from coup.deck import CountedDeck, Deck
+from coup.game import Game
+from coup.gamestate import GameState
+from coup.player import Player
+from coup.snapshot import Snapshot
+from coup.zobrist import ZobristHash, ZobristTable, compute_hash
+
+
+class RandomChoices:
+    """
+    Answers the influence loss and exchange questions asked while the action
+    stack resolves; the moves themselves are made with GameState.apply.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def action_strategy(self, gamestate):
+        return None
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        return None
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return self.rng.choice(target_player.hidden_influences)
+
+    def player_exchange_strategy(self, gamestate):
+        keep = list(gamestate.get_active_player().hidden_influences)
+        returned = []
+        for _ in range(2):
+            card = self.rng.choice(keep)
+            keep.remove(card)
+            returned.append(card)
+        return keep, returned
+
+
+class LazyMoves:
+    """
+    Plays random legal moves, checking at every decision that the move
+    generator builds no Action objects and that the actions built from its
+    mask are exactly the legal moves.
+    """
+
+    def __init__(self, rng, built):
+        self.rng = rng
+        self.built = built
+        self.decisions = 0
+
+    def _choose(self, gamestate, player, mask_method, list_method):
+        count = len(self.built)
+        mask = mask_method(player)
+        assert len(self.built) == count
+        actions = list_method(player)
+        assert len(self.built) == count + len(actions)
+        ids = [gamestate.get_action_id(action) for action in actions]
+        assert ids == list(iter_actions(mask))
+        for action_id, action in zip(ids, actions):
+            rebuilt = gamestate.build_action(action_id, player)
+            assert (type(rebuilt), rebuilt.user, rebuilt.target) == (
+                type(action),
+                action.user,
+                action.target,
+            )
+        self.decisions += 1
+        return actions
+
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        actions = self._choose(
+            gamestate,
+            player,
+            gamestate.legal_action_mask,
+            gamestate.get_legal_actions,
+        )
+        return self.rng.choice(actions)
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        actions = self._choose(
+            gamestate,
+            countering_player,
+            gamestate.legal_response_mask,
+            gamestate.get_legal_responses,
+        )
+        return self.rng.choice(actions + [None] * 2)
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return self.rng.choice(target_player.hidden_influences)
+
+    def player_exchange_strategy(self, gamestate):
+        cards = list(gamestate.get_active_player().hidden_influences)
+        self.rng.shuffle(cards)
+        return cards[2:], cards[:2]
+
+
+def _state(gamestate):
+    return (
+        gamestate.turn_number,
+        tuple(gamestate.player_turn_tracker),
+        tuple(
+            (player.coins, player.hidden_influences, player.revealed_influences)
+            for player in gamestate.players
+        ),
+        gamestate.deck.get_state(),
+        tuple((action, action.succeeds) for action in gamestate.action_stack.actions),
+    )
+
+
+def _new_game(rng, deck_class, num_players):
+    players = [Player(str(seat), RandomChoices(rng)) for seat in range(num_players)]
+    return GameState(players, deck=deck_class())
+
+
+def _random_response(gamestate, rng, skip=None):
+    for player in gamestate.players:
+        mask = gamestate.legal_response_mask(player)
+        if player is not skip and mask and rng.random() < 0.5:
+            action_id = rng.choice(list(iter_actions(mask)))
+            return gamestate.build_action(action_id, player)
+    return None
+
+
+@pytest.mark.parametrize("deck_class", [Deck, CountedDeck])
+def test_undo_restores_every_position(deck_class):
+    rng = random.Random(3)
+    table = ZobristTable(1)
+    for game in range(150):
+        random.seed(game)
+        gamestate = _new_game(rng, deck_class, rng.randint(2, 5))
+        ZobristHash(gamestate, table)
+        records = []
+        states = []
+
+        def apply(move):
+            states.append(_state(gamestate))
+            records.append(move())
+            assert gamestate.zobrist.value() == compute_hash(gamestate, table)
+
+        while not gamestate.is_game_over():
+            player = gamestate.get_active_player()
+            mask = gamestate.legal_action_mask(player) & ((1 << PASS) - 1)
+            action_id = rng.choice(list(iter_actions(mask)))
+            action = gamestate.build_action(action_id, player)
+            apply(lambda: gamestate.apply(action))
+            response = _random_response(gamestate, rng)
+            if response is not None:
+                apply(lambda: gamestate.apply(response))
+                second = _random_response(gamestate, rng, response.user)
+                if second is not None:
+                    apply(lambda: gamestate.apply(second))
+            apply(gamestate.apply_resolution)
+        while records:
+            gamestate.undo(records.pop())
+            assert _state(gamestate) == states.pop()
+            assert gamestate.zobrist.value() == compute_hash(gamestate, table)
+
+
+def test_unaffordable_action_disqualifies_and_undoes():
+    gamestate = _new_game(random.Random(0), Deck, 2)
+    player, target = gamestate.players
+    player.coins = 2
+    before = _state(gamestate)
+    record = gamestate.apply(Assassinate(player, target))
+    assert player.coins == 2
+    assert player.hidden_influences == ()
+    assert not player.is_alive()
+    gamestate.undo(record)
+    assert _state(gamestate) == before
+
+
+def test_paid_cost_is_refunded_by_undo():
+    gamestate = _new_game(random.Random(0), Deck, 3)
+    player, target, _ = gamestate.players
+    player.coins = 8
+    before = _state(gamestate)
+    record = gamestate.apply(Coup(player, target))
+    assert player.coins == 1
+    gamestate.undo(record)
+    assert _state(gamestate) == before
+
+
+@pytest.mark.parametrize("deck_class", [Deck, CountedDeck])
+def test_snapshot_restores_into_another_game(deck_class):
+    rng = random.Random(5)
+    for game in range(50):
+        random.seed(game)
+        num_players = rng.randint(2, 5)
+        gamestate = _new_game(rng, deck_class, num_players)
+        copy = _new_game(rng, deck_class, num_players)
+        while not gamestate.is_game_over():
+            player = gamestate.get_active_player()
+            mask = gamestate.legal_action_mask(player) & ((1 << PASS) - 1)
+            action_id = rng.choice(list(iter_actions(mask)))
+            gamestate.apply(gamestate.build_action(action_id, player))
+            snapshot = pickle.loads(pickle.dumps(gamestate.snapshot()))
+            copy.restore(snapshot)
+            assert copy.snapshot() == gamestate.snapshot()
+            gamestate.apply_resolution()
+
+
+def test_snapshot_of_another_deck_kind_is_refused():
+    cards = _new_game(random.Random(0), Deck, 2)
+    counts = _new_game(random.Random(1), CountedDeck, 2)
+    for source, target in ((cards, counts), (counts, cards)):
+        before = _state(target)
+        with pytest.raises(ValueError):
+            target.restore(source.snapshot())
+        assert _state(target) == before
+
+
+def test_snapshot_bytes_are_little_endian():
+    snapshot = Snapshot([1, 258])
+    assert snapshot.to_bytes() == b"\x01\x00\x02\x01"
+    assert Snapshot.from_bytes(snapshot.to_bytes()) == snapshot
+
+
+def test_actions_are_built_only_once_chosen(monkeypatch):
+    built = []
+    init = Action.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(self)
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(Action, "__init__", counting_init)
+    rng = random.Random(6)
+    strategy = LazyMoves(rng, built)
+    for game in range(100):
+        random.seed(game)
+        players = [Player(str(seat), strategy) for seat in range(rng.randint(2, 6))]
+        Game(players).play()
+    assert strategy.decisions > 3000
@@ -0,0 +1,126 @@
+import random
+
+from coup import compact
+from coup.action import Assassinate, Income, Tax
+from coup.deck import CHARACTERS, FULL_DECK, CountedDeck, Deck
+from coup.game import Game
+from coup.influence import (
+    Ambassador,
+    Assassin,
+    Captain,
+    Character,
+    Contessa,
+    Duke,
+)
+from coup.observer import GameObserver
+from coup.player import Player, add_influences, remove_influence
+from coup.strategy import HonestStrategy
+
+
+class RandomLegalStrategy:
+    """
+    Plays random legal moves, challenging and exchanging often enough to
+    replace and return cards.
+    """
+
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        return random.choice(gamestate.get_legal_actions(player))
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        responses = gamestate.get_legal_responses(countering_player)
+        if responses and random.random() < 0.4:
+            return random.choice(responses)
+        return None
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return random.choice(target_player.hidden_influences)
+
+    def player_exchange_strategy(self, gamestate):
+        cards = list(gamestate.get_active_player().hidden_influences)
+        random.shuffle(cards)
+        return cards[2:], cards[:2]
+
+
+class SortedHands(GameObserver):
+    """
+    Checks after every event that each hand is a sorted tuple of interned
+    characters.
+    """
+
+    def __init__(self):
+        self.checks = 0
+
+    def check(self, gamestate):
+        for player in gamestate.players:
+            for hand in (player.hidden_influences, player.revealed_influences):
+                assert type(hand) is tuple and list(hand) == sorted(hand)
+                assert all(card is CHARACTERS[card] for card in hand)
+            self.checks += 1
+
+    def on_action(self, gamestate, action):
+        self.check(gamestate)
+
+    def on_influence_lost(self, gamestate, player, influence):
+        self.check(gamestate)
+
+    def on_influence_replaced(self, gamestate, player, influence):
+        self.check(gamestate)
+
+    def on_exchange(self, gamestate, player):
+        self.check(gamestate)
+
+    def on_turn_end(self, gamestate):
+        self.check(gamestate)
+
+
+def test_characters_are_the_compact_character_codes():
+    aliases = (Duke, Assassin, Captain, Ambassador, Contessa)
+    codes = (
+        compact.DUKE,
+        compact.ASSASSIN,
+        compact.CAPTAIN,
+        compact.AMBASSADOR,
+        compact.CONTESSA,
+    )
+    assert CHARACTERS == tuple(Character) == aliases
+    assert [int(character) for character in aliases] == list(codes)
+    assert [str(character) for character in aliases] == [
+        "Duke",
+        "Assassin",
+        "Captain",
+        "Ambassador",
+        "Contessa",
+    ]
+    assert Character(2) is Captain
+
+
+def test_decks_hold_the_interned_characters():
+    assert all(card is CHARACTERS[card] for card in FULL_DECK)
+    for deck in (Deck(random.Random(0)), CountedDeck(random.Random(0))):
+        for card in deck.draw_cards(15):
+            assert card is CHARACTERS[card]
+
+
+def test_hands_are_sorted_hashable_tuples():
+    hand = add_influences((), (Contessa, Duke))
+    assert hand == (Duke, Contessa)
+    assert add_influences(hand, [Assassin, Duke]) == (Duke, Duke, Assassin, Contessa)
+    assert remove_influence((Duke, Duke, Assassin), Duke) == (Duke, Assassin)
+    cache = {hand: 1}
+    assert cache[add_influences((Contessa,), (Duke,))] == 1
+    player = Player("0", HonestStrategy())
+    player.hidden_influences = hand
+    target = Player("1", HonestStrategy())
+    assert player.satisfies_action_requirement(Tax(player))
+    assert not player.satisfies_action_requirement(Assassinate(player, target))
+    assert player.satisfies_action_requirement(Income(player))
+
+
+def test_hands_stay_sorted_through_whole_games():
+    observer = SortedHands()
+    for seed in range(20):
+        random.seed(seed)
+        players = [Player(str(seat), RandomLegalStrategy()) for seat in range(4)]
+        Game(players, observers=[observer], deck=CountedDeck()).play()
+    assert observer.checks > 1000
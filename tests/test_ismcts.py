@@ -0,0 +1,60 @@
+import random
+from time import perf_counter
+
+from coup.belief import BeliefState
+from coup.compact import legal_actions
+from coup.game import Game
+from coup.ismcts import ISMCTSStrategy
+from coup.player import Player
+from coup.strategy import HonestStrategy
+
+
+class CheckedISMCTS(ISMCTSStrategy):
+    """
+    Records how long every decision took and checks that it is legal.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.times = []
+
+    def choose_action_id(self, gamestate, state, seat, known):
+        start = perf_counter()
+        action_id = super().choose_action_id(gamestate, state, seat, known)
+        self.times.append(perf_counter() - start)
+        assert legal_actions(state) >> action_id & 1
+        return action_id
+
+
+def _play(strategy, games, num_players=3, with_belief=False):
+    for game_index in range(games):
+        random.seed(game_index)
+        players = [Player("search", strategy)] + [
+            Player(str(seat), HonestStrategy()) for seat in range(1, num_players)
+        ]
+        observers = []
+        if with_belief:
+            strategy.belief = BeliefState(players[0])
+            observers.append(strategy.belief)
+        Game(players, observers=observers).play()
+
+
+def test_small_budget_searches_choose_legal_moves():
+    strategy = CheckedISMCTS(iterations=30, seed=1)
+    _play(strategy, 10)
+    assert len(strategy.times) > 20
+
+
+def test_searches_with_a_belief_state_choose_legal_moves():
+    strategy = CheckedISMCTS(iterations=30, seed=2)
+    _play(strategy, 5, num_players=2, with_belief=True)
+    assert strategy.times
+
+
+def test_time_limit_bounds_a_decision():
+    time_limit = 0.05
+    strategy = CheckedISMCTS(iterations=10**9, time_limit=time_limit, seed=3)
+    _play(strategy, 1, num_players=2)
+    assert max(strategy.times) >= time_limit
+    # The deadline is checked after every batch of BATCH_SIZE iterations.
+    assert max(strategy.times) < time_limit + 0.5
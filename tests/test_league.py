@@ -0,0 +1,38 @@
+from coup.league import League, _play_match
+from coup.simulate import GameResult
+from coup.strategy import HonestStrategy
+
+
+def test_winnerless_games_count_as_played_but_not_won():
+    league = League()
+    league.update(("a", "b", "c"), [(0, 2, 1), ()])
+    assert league.games == {"a": 2, "b": 2, "c": 2}
+    assert league.wins == {
+        "a": {"b": 1, "c": 1},
+        "b": {"a": 0, "c": 0},
+        "c": {"a": 0, "b": 1},
+    }
+    assert league.ratings["a"] > league.ratings["c"] > league.ratings["b"]
+
+
+def test_match_placements_skip_games_without_a_winner(monkeypatch):
+    def run_games(strategies, num_games, seed):
+        yield GameResult(0, 1, 10, ((2, 4), (0, 9)), (2, 2, 2), (0, 3, 0))
+        yield GameResult(1, None, 3, ((0, 3), (1, 3), (2, 3)), (2, 2, 2), (0, 0, 0))
+
+    monkeypatch.setattr("coup.league.run_games", run_games)
+    strategies = (HonestStrategy(),) * 3
+    assert _play_match((strategies, 0, 2)) == [(1, 0, 2), ()]
+
+
+def test_played_seatings_are_skipped_and_saved(tmp_path):
+    pool = {"honest": HonestStrategy(), "other": HonestStrategy()}
+    league = League(seed=4)
+    assert league.run(pool, seats=2, games=20) == 2
+    assert league.run(pool, seats=2, games=20) == 0
+    assert league.games == {"honest": 40, "other": 40}
+    path = str(tmp_path / "league.json")
+    league.save(path)
+    loaded = League.load(path)
+    assert loaded.ratings == league.ratings
+    assert loaded.played == league.played
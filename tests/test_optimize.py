@@ -0,0 +1,112 @@
+import random
+
+from coup.action import Coup
+from coup.influence import Duke
+from coup.cache import MatchupCache
+from coup.optimize import evolve, fitness
+from coup.parametric import DEFAULTS, ParametricStrategy
+from coup.simulate import run_games
+from coup.strategy import HonestStrategy
+
+
+class SideBySide:
+    """
+    Plays HonestStrategy and asks ParametricStrategy with the default
+    parameters the same questions, on a spare rng so that the game is not
+    disturbed, checking that it makes the same decisions up to HonestStrategy's
+    random tie breaks.
+    """
+
+    def __init__(self):
+        self.honest = HonestStrategy()
+        self.parametric = ParametricStrategy()
+        self.spare = random.Random(0)
+        self.decisions = 0
+
+    def _ask(self, gamestate, question, *args):
+        rng = gamestate.rng
+        gamestate.rng = self.spare
+        try:
+            return getattr(self.parametric, question)(gamestate, *args)
+        finally:
+            gamestate.rng = rng
+
+    def action_strategy(self, gamestate):
+        expected = self.honest.action_strategy(gamestate)
+        chosen = self._ask(gamestate, "action_strategy")
+        assert type(chosen) is type(expected)
+        if type(expected) is Coup:
+            # Both break ties between the targets with the most influences,
+            # then coins, at random.
+            assert (
+                len(chosen.target.hidden_influences),
+                chosen.target.coins,
+            ) == (len(expected.target.hidden_influences), expected.target.coins)
+        self.decisions += 1
+        return expected
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        assert self._ask(gamestate, "counteraction_strategy", countering_player) is None
+        return None
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        expected = self.honest.influence_loss_strategy(gamestate, target_player)
+        chosen = self._ask(gamestate, "influence_loss_strategy", target_player)
+        hand = target_player.hidden_influences
+        if len(hand) == 1 or hand.count(Duke) == 1:
+            assert chosen == expected
+        else:
+            assert chosen in hand
+        self.decisions += 1
+        return expected
+
+    def player_exchange_strategy(self, gamestate):
+        raise AssertionError("HonestStrategy never exchanges")
+
+
+def test_default_parameters_play_like_honest_strategy():
+    for num_players in (2, 3, 4, 6):
+        strategy = SideBySide()
+        run_games([strategy] * num_players, 100, num_players)
+        assert strategy.decisions > 1000
+
+
+def test_default_vector_round_trips():
+    strategy = ParametricStrategy.from_vector(ParametricStrategy().vector())
+    assert strategy.params == DEFAULTS
+    assert repr(strategy) == "ParametricStrategy({})"
+
+
+def test_evolution_keeps_the_best_vector():
+    opponents = [HonestStrategy()]
+    options = dict(generations=3, population=4, parents=2, blocks=2, block_size=10)
+    best, best_fitness, history = evolve(opponents, seed=5, **options)
+    assert len(history) == 3
+    # The parents are scored on the same deals every generation, so the best
+    # fitness never goes down.
+    assert history == sorted(history)
+    assert best_fitness == history[-1]
+    start = fitness(ParametricStrategy().vector(), opponents, 5, 2, 10)
+    assert best_fitness >= start
+    assert fitness(best, opponents, 5, 2, 10) == best_fitness
+    assert evolve(opponents, seed=5, workers=2, **options) == (
+        best,
+        best_fitness,
+        history,
+    )
+
+
+def test_later_searches_reuse_the_matchup_cache(tmp_path, monkeypatch):
+    opponents = [HonestStrategy()]
+    options = dict(generations=2, population=3, parents=2, blocks=2, block_size=5)
+    cache = MatchupCache(str(tmp_path))
+    first = evolve(opponents, seed=1, cache=cache, **options)
+    assert cache.hits == 0 and len(cache) > 0
+
+    def play_block(task):
+        raise AssertionError("a cached block was played again")
+
+    monkeypatch.setattr("coup.optimize._play_block", play_block)
+    cache = MatchupCache(str(tmp_path))
+    assert evolve(opponents, seed=1, cache=cache, **options) == first
+    assert cache.misses == 0
@@ -0,0 +1,56 @@
+import math
+
+from coup.solver.cfr import CFRSolver, InfoSetTable
+from coup.solver.parallel import DeltaRegion, run_parallel
+
+
+def test_workers_only_write_their_delta_region():
+    table = CFRSolver(bits=12, seed=0).table
+    CFRSolver(table=table, seed=0).run(20)
+    keys, regrets, sums = (
+        list(table.keys),
+        list(table.regrets),
+        list(table.strategy_sums),
+    )
+    region = DeltaRegion.create(12)
+    try:
+        region.table = table
+        region.start_epoch()
+        solver = CFRSolver(table=table, seed=1)
+        solver.deltas = region
+        for iteration in range(50):
+            solver.iterate(iteration % 2)
+        assert list(table.keys) == keys
+        assert list(table.regrets) == regrets
+        assert list(table.strategy_sums) == sums
+        assert region.pending[0] > 0
+        assert any(region.regrets)
+    finally:
+        region.close(unlink=True)
+
+
+def test_parallel_runs_are_reproducible():
+    first = run_parallel(400, workers=2, bits=12, epoch=100, seed=3)
+    second = run_parallel(400, workers=2, bits=12, epoch=100, seed=3)
+    assert first.iterations == 400
+    assert first.used > 0
+    assert first.keys == second.keys
+    assert first.regrets == second.regrets
+    assert first.strategy_sums == second.strategy_sums
+
+
+def test_full_table_evicts_without_corrupting():
+    table = run_parallel(200, workers=2, bits=6, epoch=50, seed=1)
+    keys = [key for key in table.keys if key]
+    assert len(keys) == len(set(keys))
+    assert all(math.isfinite(value) for value in table.regrets)
+    assert all(math.isfinite(value) for value in table.strategy_sums)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "table.bin")
+    table = run_parallel(200, workers=2, bits=10, epoch=100, seed=2, checkpoint=path)
+    loaded = InfoSetTable.load(path)
+    assert loaded.iterations == 200
+    assert loaded.keys == table.keys
+    assert loaded.regrets == table.regrets
@@ -0,0 +1,216 @@
+import builtins
+import os
+import random
+
+import pytest
+
+from coup.action import Assassinate
+from coup.compact import PASS
+from coup.observer import GameObserver
+from coup.record import (
+    DISQUALIFIED,
+    SEED_BYTES,
+    GameRecord,
+    RecordReader,
+    RecordWriter,
+    has_seat,
+    list_shards,
+)
+from coup.simulate import run_games
+
+
+class RandomLegalStrategy:
+    """
+    Plays random legal moves, responding often enough to record challenges,
+    blocks and exchanges.
+    """
+
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        return random.choice(gamestate.get_legal_actions(player))
+
+    def counteraction_strategy(self, gamestate, countering_player):
+        responses = gamestate.get_legal_responses(countering_player)
+        if responses and random.random() < 0.4:
+            return random.choice(responses)
+        return None
+
+    def influence_loss_strategy(self, gamestate, target_player):
+        return random.choice(target_player.hidden_influences)
+
+    def player_exchange_strategy(self, gamestate):
+        cards = list(gamestate.get_active_player().hidden_influences)
+        random.shuffle(cards)
+        return cards[2:], cards[:2]
+
+
+class RecklessStrategy(RandomLegalStrategy):
+    """
+    Now and then assassinates without the coins for it, and is disqualified.
+    """
+
+    def action_strategy(self, gamestate):
+        player = gamestate.get_active_player()
+        if player.coins < Assassinate.cost and random.random() < 0.3:
+            targets = [
+                other
+                for other in gamestate.players
+                if other is not player and other.is_alive()
+            ]
+            return Assassinate(player, random.choice(targets))
+        return super().action_strategy(gamestate)
+
+
+class TurnStates(GameObserver):
+    def __init__(self):
+        self.states = []
+
+    def on_turn_end(self, gamestate):
+        self.states.append(gamestate.to_compact())
+
+
+def _record(directory, num_players, games, seed, strategies=None):
+    observer = TurnStates()
+    if strategies is None:
+        strategies = [RandomLegalStrategy() for _ in range(num_players)]
+    with RecordWriter(directory) as writer:
+        results = run_games(
+            strategies,
+            games,
+            seed,
+            observers=[observer],
+            writer=writer,
+        )
+    return results, observer.states
+
+
+def test_replay_reproduces_every_turn(tmp_path):
+    directory = str(tmp_path)
+    played = [
+        _record(directory, num_players, 60, num_players)
+        for num_players in (2, 3, 4, 6)
+    ]
+    with RecordReader(directory) as reader:
+        assert len(reader) == 240
+        index = 0
+        for results, states in played:
+            position = 0
+            for result in results:
+                record = reader[index]
+                index += 1
+                assert record.seed == result.seed
+                observer = TurnStates()
+                game = record.replay(observers=[observer])
+                count = len(observer.states)
+                assert observer.states == states[position : position + count]
+                position += count
+                winner = game.gamestate.get_winner()
+                assert game.gamestate.players.index(winner) == result.winner
+            assert position == len(states)
+
+
+def test_index_is_extended_after_an_append(tmp_path):
+    directory = str(tmp_path)
+    _record(directory, 2, 20, 1)
+    with RecordReader(directory) as reader:
+        assert len(reader) == 20
+    _record(directory, 3, 5, 2)
+    with RecordReader(directory) as reader:
+        assert len(reader) == 25
+        assert reader[24].num_players == 3
+
+
+def test_stale_index_of_a_rewritten_shard_is_rebuilt(tmp_path):
+    directory = str(tmp_path)
+    _record(directory, 2, 20, 1)
+    with RecordReader(directory) as reader:
+        assert len(reader) == 20
+    for path in list_shards(directory):
+        os.remove(path)
+    _record(directory, 4, 30, 3)
+    with RecordReader(directory) as reader:
+        assert len(reader) == 30
+        assert all(record.num_players == 4 for record in reader)
+
+
+def test_index_is_kept_in_memory_on_read_only_storage(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    _record(directory, 2, 10, 1)
+
+    def read_only_open(path, mode="r", *args, **kwargs):
+        if "w" in mode and str(path).endswith(".idx"):
+            raise PermissionError(path)
+        return builtins.open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr("coup.record.open", read_only_open, raising=False)
+    with RecordReader(directory) as reader:
+        assert len(reader) == 10
+        reader[9].replay()
+    assert not any(name.endswith(".idx") for name in os.listdir(directory))
+
+
+def _offsets(record):
+    """
+    The position in record.data of every event.
+    """
+    offsets = []
+    position = SEED_BYTES + 1 + record.num_players
+    for code, _ in record.events():
+        offsets.append(position)
+        position += 2 if has_seat(code) else 1
+    return offsets
+
+
+def test_disqualifications_are_recorded_and_replayed(tmp_path):
+    directory = str(tmp_path)
+    strategies = [RecklessStrategy(), RandomLegalStrategy(), RandomLegalStrategy()]
+    results, states = _record(directory, 3, 60, 4, strategies)
+    disqualified = 0
+    with RecordReader(directory) as reader:
+        position = 0
+        for result, record in zip(results, reader):
+            observer = TurnStates()
+            game = record.replay(observers=[observer])
+            count = len(observer.states)
+            assert observer.states == states[position : position + count]
+            position += count
+            winner = game.gamestate.get_winner()
+            assert game.gamestate.players.index(winner) == result.winner
+            events = list(record.events())
+            for number, (code, seat) in enumerate(events):
+                if code != DISQUALIFIED:
+                    continue
+                disqualified += 1
+                assert events[number - 1][0] < PASS
+                # Stopping at the action leaves the player in the game,
+                # stopping at the event after it does not.
+                before = record.replay(stop=number - 1).gamestate.players[seat]
+                assert before.is_alive()
+                after = record.replay(stop=number).gamestate.players[seat]
+                assert not after.is_alive() and not after.hidden_influences
+    assert disqualified > 5
+
+
+def test_replay_refuses_a_disqualification_that_does_not_match(tmp_path):
+    directory = str(tmp_path)
+    strategies = [RecklessStrategy(), RandomLegalStrategy(), RandomLegalStrategy()]
+    _record(directory, 3, 30, 4, strategies)
+    missing = 0
+    with RecordReader(directory) as reader:
+        for record in reader:
+            data = bytes(record.data)
+            offsets = _offsets(record)
+            # The first action is always affordable, seat 0 starts with the
+            # coins for an Assassinate.
+            first = offsets[0] + 1
+            changed = data[:first] + bytes((DISQUALIFIED, 0)) + data[first:]
+            with pytest.raises(ValueError, match="does not match"):
+                GameRecord(record.index, changed).replay()
+            for offset, (code, _) in zip(offsets, record.events()):
+                if code == DISQUALIFIED:
+                    # Without the event the disqualification is unexplained.
+                    changed = data[:offset] + data[offset + 2 :]
+                    with pytest.raises(ValueError, match="does not match"):
+                        GameRecord(record.index, changed).replay()
+                    missing += 1
+    assert missing > 0
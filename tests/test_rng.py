@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+
+from coup.deck import CountedDeck
+from coup.rng import RandomStream
+from coup.simulate import run_games, run_paired_games
+from coup.strategy import HonestStrategy
+
+
+def _values(stream, count=20):
+    return [stream.randrange(1 << 30) for _ in range(count)]
+
+
+def test_integer_seed_matches_pcg64():
+    generator = np.random.PCG64(7)
+    expected = [(value * 1000) >> 64 for value in generator.random_raw(10).tolist()]
+    stream = RandomStream(7)
+    assert [stream.randrange(1000) for _ in range(10)] == expected
+
+
+def test_substreams_nest():
+    stream = RandomStream(11)
+    worker = stream.substream(2)
+    game = worker.substream(5)
+    assert _values(game) == _values(RandomStream((11, 2, 5)))
+    assert _values(worker.substream(5)) != _values(worker.substream(6))
+    assert _values(stream.substream(2)) == _values(RandomStream(11).substream(2))
+
+
+def test_jump_and_start_game():
+    values = _values(RandomStream(9), 3000)
+    stream = RandomStream(9)
+    stream.jump(1234)
+    assert _values(stream, 100) == values[1234:1334]
+    first = RandomStream(9)
+    first.start_game(3)
+    second = RandomStream(9)
+    second.start_game(8)
+    second.start_game(3)
+    assert _values(first) == _values(second)
+
+
+def test_runs_give_the_deck_its_rng_back():
+    strategies = [HonestStrategy(), HonestStrategy()]
+    rng = random.Random(4)
+    deck = CountedDeck(rng)
+    run_games(strategies, 3, 0, deck=deck, streams=True)
+    assert deck.rng is rng
+    run_paired_games(strategies, 3, 0, deck=deck)
+    assert deck.rng is rng
+
+
+def test_streamed_games_do_not_depend_on_the_split():
+    strategies = [HonestStrategy() for _ in range(3)]
+    whole = run_games(strategies, 20, 4, streams=True)
+    split = [run_games(strategies, 1, 4, start=i, streams=True)[0] for i in range(20)]
+    assert [(r.winner, r.turns) for r in whole] == [(r.winner, r.turns) for r in split]
@@ -0,0 +1,129 @@
+import random
+
+from coup.game import Game
+from coup.observer import GameObserver, PrintObserver
+from coup.player import Player
+from coup.simulate import ResultRecorder, run_games, run_paired_games
+from coup.strategy import HonestStrategy
+
+
+class Outcome(GameObserver):
+    """
+    Keeps what a GameResult should report, worked out independently of the
+    ResultRecorder.
+    """
+
+    def __init__(self):
+        self.outcomes = []
+        self.coins = []
+
+    def on_game_start(self, gamestate):
+        self.coins = [player.coins for player in gamestate.players]
+
+    def on_turn_end(self, gamestate):
+        self.coins = [
+            max(most, player.coins)
+            for most, player in zip(self.coins, gamestate.players)
+        ]
+
+    def on_game_over(self, gamestate, winner):
+        players = gamestate.players
+        self.outcomes.append(
+            (
+                players.index(winner),
+                gamestate.turn_number,
+                tuple(self.coins),
+                tuple(player.coins for player in players),
+                tuple(not player.is_alive() for player in players),
+            )
+        )
+
+
+def _summary(results):
+    return [
+        (
+            result.seed,
+            result.winner,
+            result.turns,
+            result.eliminations,
+            result.max_coins,
+            result.final_coins,
+        )
+        for result in results
+    ]
+
+
+def test_results_describe_each_game():
+    outcome = Outcome()
+    strategies = [HonestStrategy() for _ in range(4)]
+    results = run_games(strategies, 50, 3, observers=[outcome])
+    assert len(results) == 50
+    for result, (winner, turns, max_coins, final_coins, lost) in zip(
+        results, outcome.outcomes
+    ):
+        assert (result.winner, result.turns) == (winner, turns)
+        assert (result.max_coins, result.final_coins) == (max_coins, final_coins)
+        eliminated = [seat for seat, _ in result.eliminations]
+        assert sorted(eliminated) == [seat for seat in range(4) if lost[seat]]
+        assert winner not in eliminated
+        knocked_out = [turn for _, turn in result.eliminations]
+        assert knocked_out == sorted(knocked_out) and knocked_out[-1] == turns
+
+
+def test_games_are_reproducible_and_can_be_sharded():
+    strategies = [HonestStrategy() for _ in range(3)]
+    whole = _summary(run_games(strategies, 20, 9))
+    assert whole == _summary(run_games(strategies, 20, 9))
+    shards = run_games(strategies, 8, 9) + run_games(strategies, 12, 9, start=8)
+    assert _summary(shards) == whole
+    assert len({result[0] for result in whole}) == 20
+
+
+def test_global_random_state_is_restored():
+    random.seed(12)
+    expected = [random.random() for _ in range(3)]
+    for run in (run_games, run_paired_games):
+        random.seed(12)
+        run([HonestStrategy(), HonestStrategy()], 5, 1)
+        assert [random.random() for _ in range(3)] == expected
+
+
+def test_recorder_reports_a_game_without_a_winner():
+    players = [Player(str(seat), HonestStrategy()) for seat in range(2)]
+    game = Game(players)
+    recorder = ResultRecorder()
+    recorder.on_game_start(game.gamestate)
+    recorder.on_game_over(game.gamestate, None)
+    result = recorder.result(7)
+    assert (result.seed, result.winner, result.final_coins) == (7, None, (3, 3))
+
+
+def test_print_observer_reports_the_game(capsys):
+    results = run_games([HonestStrategy(), HonestStrategy()], 1, 5, [PrintObserver()])
+    printed = capsys.readouterr().out.splitlines()
+    assert printed[-1] == f"The winner is Player {results[0].winner}!"
+    assert len(printed) > results[0].turns
+    PrintObserver().on_game_over(None, None)
+    assert capsys.readouterr().out == "The game ended without a winner.\n"
+
+
+def test_paired_games_play_every_seating_of_each_deal():
+    strategies = [HonestStrategy() for _ in range(3)]
+    results = run_paired_games(strategies, 4, 2, start=3)
+    assert len(results) == 4 * 6
+    for deal in range(4):
+        games = results[6 * deal : 6 * deal + 6]
+        assert len({result.seed for result in games}) == 1
+        assert sorted(result.seating for result in games) == sorted(
+            {result.seating for result in games}
+        )
+        # The same strategy in every seat, with common random numbers every
+        # seating plays the same game, so the win goes to whoever sits in the
+        # winning seat.
+        seat = games[0].seating.index(games[0].winner)
+        for result in games:
+            assert result.winner == result.seating[seat]
+            assert result.turns == games[0].turns
+    assert _summary(run_paired_games(strategies, 1, 2, start=5)) == _summary(
+        results[12:18]
+    )
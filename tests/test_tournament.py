@@ -0,0 +1,18 @@
+from coup.simulate import GameResult
+from coup.strategy import HonestStrategy
+from coup.tournament import TournamentResult, play_shard
+
+
+def test_games_without_a_winner_are_not_counted_as_wins(monkeypatch):
+    def run_games(strategies, num_games, master_seed, start=0):
+        for index in range(num_games):
+            winner = None if index % 2 else 1
+            yield GameResult(index, winner, 10, ((0, 5),), (2, 2), (0, 0))
+
+    monkeypatch.setattr("coup.tournament.run_games", run_games)
+    counts = play_shard([HonestStrategy(), HonestStrategy()], 0, 0, 4)
+    assert counts == (4, 40, (0, 2), (4, 0))
+    result = TournamentResult(2)
+    result.add_counts(counts)
+    assert result.draws() == 2
+    assert result.win_rate(1) == 0.5
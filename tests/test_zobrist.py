@@ -0,0 +1,144 @@
+import random
+
+from coup.action import BlockForeignAid, ForeignAid, Income
+from coup.compact import PASS, iter_actions
+from coup.deck import CountedDeck
+from coup.gamestate import GameState
+from coup.player import Player
+from coup.zobrist import (
+    EXACT,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    TranspositionTable,
+    ZobristHash,
+    ZobristTable,
+    compute_hash,
+)
+
+
+class NoChoices:
+    def influence_loss_strategy(self, gamestate, target_player):
+        return target_player.hidden_influences[0]
+
+
+def _new_game(seed, num_players=2):
+    random.seed(seed)
+    players = [Player(str(seat), NoChoices()) for seat in range(num_players)]
+    gamestate = GameState(players, deck=CountedDeck())
+    ZobristHash(gamestate, ZobristTable(1))
+    return gamestate
+
+
+def _turn(gamestate, move):
+    """
+    Play one turn of the active player, Income or a Foreign Aid that the
+    next player blocks.
+    """
+    player = gamestate.get_active_player()
+    gamestate.apply(move(player))
+    if move is ForeignAid:
+        players = gamestate.players
+        blocker = players[(players.index(player) + 1) % len(players)]
+        gamestate.apply(BlockForeignAid(blocker))
+    gamestate.apply_resolution()
+
+
+def _key(gamestate):
+    """
+    What the hash covers, by seat, so that positions of different games can
+    be compared.
+    """
+    players = gamestate.players
+    active = gamestate.get_active_player()
+    return (
+        players.index(active) if active is not None else -1,
+        tuple(
+            (player.coins, player.hidden_influences, player.revealed_influences)
+            for player in players
+        ),
+        tuple(
+            (
+                gamestate.get_action_id(action),
+                players.index(action.user),
+                action.succeeds,
+            )
+            for action in gamestate.action_stack.actions
+        ),
+    )
+
+
+def test_move_orders_reaching_the_same_position_hash_alike():
+    first = _new_game(1)
+    for move in (Income, ForeignAid, ForeignAid, Income):
+        _turn(first, move)
+    second = _new_game(1)
+    for move in (ForeignAid, Income, Income, ForeignAid):
+        _turn(second, move)
+    assert [player.coins for player in first.players] == [4, 4]
+    assert _key(first) == _key(second)
+    assert first.zobrist.value() == second.zobrist.value()
+    _turn(second, Income)
+    assert first.zobrist.value() != second.zobrist.value()
+
+
+def test_distinct_positions_get_distinct_hashes():
+    rng = random.Random(2)
+    positions = {}
+
+    def check(gamestate):
+        value = gamestate.zobrist.value()
+        assert value == compute_hash(gamestate, gamestate.zobrist.table)
+        key = (len(gamestate.players), _key(gamestate))
+        assert positions.setdefault(value, key) == key
+
+    for game in range(100):
+        gamestate = _new_game(game, rng.randint(2, 4))
+        while not gamestate.is_game_over():
+            player = gamestate.get_active_player()
+            mask = gamestate.legal_action_mask(player) & ((1 << PASS) - 1)
+            # Only the unchallengeable moves, so that nobody has to respond.
+            actions = [
+                gamestate.build_action(action_id, player)
+                for action_id in iter_actions(mask)
+            ]
+            gamestate.apply(
+                rng.choice([action for action in actions if not action.challengeable])
+            )
+            check(gamestate)
+            gamestate.apply_resolution()
+            check(gamestate)
+    assert len(positions) > 1000
+
+
+def test_probe_finds_what_was_stored():
+    table = TranspositionTable(bits=4)
+    assert table.probe(12345) is None
+    table.store(12345, 3, 0.25, EXACT, 7)
+    assert table.probe(12345) == (3, 0.25, EXACT, 7)
+    table.store(12345, 1, -0.5, UPPER_BOUND)
+    assert table.probe(12345) == (1, -0.5, UPPER_BOUND, -1)
+    assert (table.hits, table.misses, table.stores) == (2, 1, 2)
+    table.clear()
+    assert table.probe(12345) is None
+    assert (table.hits, table.misses, table.stores) == (0, 1, 0)
+
+
+def test_buckets_keep_the_deepest_and_the_latest_result():
+    table = TranspositionTable(bits=2)
+    sizes = [len(table.keys), len(table.depths)]
+    # All of these keys fall in bucket 1.
+    deep, shallow, newer, deeper = (1 + 4 * n for n in range(1, 5))
+    table.store(deep, 5, 1.0, EXACT)
+    table.store(shallow, 2, 2.0, LOWER_BOUND)
+    assert table.probe(deep)[0] == 5 and table.probe(shallow)[0] == 2
+    # The second entry is always replaced, the deep one stays.
+    table.store(newer, 1, 3.0, EXACT)
+    assert table.probe(shallow) is None
+    assert table.probe(deep)[0] == 5 and table.probe(newer)[0] == 1
+    # A deeper result takes the first entry, the old deep one moves down.
+    table.store(deeper, 9, 4.0, EXACT)
+    assert table.probe(newer) is None
+    assert table.probe(deeper)[0] == 9 and table.probe(deep)[0] == 5
+    for key in range(10000):
+        table.store(key * 7919, key % 13, 0.0, EXACT)
+    assert [len(table.keys), len(table.depths)] == sizes